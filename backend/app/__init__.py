@@ -1,12 +1,46 @@
+import logging
+import os
+
 from flask import Flask
 from flask_cors import CORS
 
-def create_app():
+def configure_logging():
+    """Log to stderr at LOG_LEVEL (default INFO), for the serving entry points"""
+    logging.basicConfig(
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s',
+    )
+
+def create_app(warm_up=False, profiler=None):
+    """Build the API app.
+
+    Loads the model and the food catalog (once per process). `warm_up`
+    also exercises the prediction path and fills the meal plan cache
+    before returning; with warm_up='background' that runs in a thread
+    while the app already serves, and /api/ready answers 503 until it is
+    done. Do not use 'background' in a process that forks workers
+    afterwards: threads do not survive the fork.
+
+    `profiler` is a RequestProfiler to sample request stacks with; by
+    default one is configured from the PROFILE_* environment variables,
+    and requests are not profiled unless they enable it.
+    """
     app = Flask(__name__)
     CORS(app)
     
+    from .profiler import RequestProfiler
+    profiler = profiler or RequestProfiler.from_env()
+    if profiler is not None:
+        profiler.init_app(app)
+    
     # Register blueprints
-    from .routes import api_bp
-    app.register_blueprint(api_bp)
+    from . import routes
+    app.register_blueprint(routes.api_bp)
+    routes.load_state()
+    
+    if warm_up == 'background':
+        routes.warm_up_in_background()
+    elif warm_up:
+        routes.warm_up()
     
-    return app
\ No newline at end of file
+    return app
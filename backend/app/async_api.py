@@ -0,0 +1,288 @@
+"""
+asyncio serving mode for many concurrent, mostly idle connections.
+
+Serves the /api/predict, /api/health and /api/report contracts of the
+Flask blueprint (plus /api/ready and /api/metrics) on aiohttp, with the
+same model, food recommender and metrics:
+
+    python -m app.async_api --port 5000 --workers 4 --max-in-flight 64
+
+Every connection is a coroutine, so slow clients and keep-alive
+connections cost no thread while they wait. Health, readiness and metrics
+are answered on the event loop. Prediction and PDF rendering are CPU-bound
+and run on a bounded thread pool of `--workers` threads.
+
+At most `--max-in-flight` predict and report requests are admitted at a
+time; the others are answered right away with 503, a Retry-After header
+and a `retry_after` field instead of queueing without bound.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from aiohttp import web
+
+from . import routes
+from .metrics import REGISTRY
+from .model_loader import predict_diabetes
+from .serialization import dumps
+from .utils import validate_input_data
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_RETRY_AFTER = 1
+
+REJECTED = REGISTRY.counter(
+    'requests_rejected_total', 'Requests refused with 503 by the async server in-flight limit', ('endpoint',)
+)
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightLimit:
+    """Admission control for the executor-bound endpoints.
+
+    Only touched from the event loop, so a plain counter is enough.
+    """
+
+    def __init__(self, limit, retry_after=DEFAULT_RETRY_AFTER):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def stats(self):
+        return {'limit': self.limit, 'active': self.active, 'admitted': self.admitted, 'rejected': self.rejected}
+
+
+LIMIT = web.AppKey('limit', InFlightLimit)
+EXECUTOR = web.AppKey('executor', ThreadPoolExecutor)
+
+# Endpoint names, as in the Flask app, for the shared request metrics
+ENDPOINTS = {'/api/predict': 'api.predict', '/api/report': 'api.report', '/api/health': 'api.health',
+             '/api/ready': 'api.readiness', '/api/metrics': 'api.metrics'}
+LIMITED = {'api.predict', 'api.report'}
+
+
+def json_response(body, status=200):
+    return web.Response(text=dumps(body), status=status, content_type='application/json')
+
+
+@web.middleware
+async def serve(request, handler):
+    """CORS, the in-flight limit and the request metrics of the Flask app"""
+    if request.method == 'OPTIONS':
+        return web.Response(headers={
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+            'Access-Control-Allow-Headers': request.headers.get('Access-Control-Request-Headers', '*'),
+        })
+
+    endpoint = ENDPOINTS.get(request.path)
+    if endpoint is None:
+        # Unrouted paths (mostly 404s) stay out of the per-endpoint metrics
+        try:
+            response = await handler(request)
+        except web.HTTPException as e:
+            e.headers['Access-Control-Allow-Origin'] = '*'
+            raise
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    limit = request.app[LIMIT]
+    limited = endpoint in LIMITED
+    if limited:
+        if limit.active >= limit.limit:
+            limit.rejected += 1
+            REJECTED.inc((endpoint,))
+            response = json_response({'error': 'Server busy', 'retry_after': limit.retry_after}, 503)
+            response.headers['Retry-After'] = str(limit.retry_after)
+            response.headers['Access-Control-Allow-Origin'] = '*'
+            return response
+        limit.active += 1
+        limit.admitted += 1
+
+    started = perf_counter()
+    status = 500
+    routes.IN_FLIGHT.inc((endpoint,))
+    try:
+        response = await handler(request)
+        status = response.status
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+    except web.HTTPException as e:
+        # Routing errors such as 405
+        status = e.status
+        e.headers['Access-Control-Allow-Origin'] = '*'
+        raise
+    finally:
+        routes.IN_FLIGHT.dec((endpoint,))
+        if limited:
+            limit.active -= 1
+        routes.REQUEST_SECONDS.observe((endpoint,), perf_counter() - started)
+        routes.REQUESTS.inc((endpoint, str(status)))
+
+
+async def _json_body(request):
+    """The JSON object in the request body; empty when it is missing or malformed"""
+    try:
+        data = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _predict(model, data):
+    """Executor side of /api/predict: the encoded assessment of one patient"""
+    timer = routes.STAGE_SECONDS.timer('predict')
+    prediction, probability = predict_diabetes(model, data)
+    timer.lap('model')
+    return _assess(model, data, prediction, probability, timer)
+
+
+async def _predict_batched(executor, model, data):
+    """/api/predict with the micro-batcher: wait for the batch on the event loop,
+    so more requests than executor threads can share one model call"""
+    timer = routes.STAGE_SECONDS.timer('predict')
+    batcher = routes.predict_batcher
+    try:
+        prediction, probability = await asyncio.wait_for(
+            asyncio.wrap_future(batcher.submit(model, data)), batcher.timeout
+        )
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Prediction not scored within {batcher.timeout} s") from None
+    timer.lap('model')
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, _assess, model, data, prediction, probability, timer
+    )
+
+
+def _assess(model, data, prediction, probability, timer):
+    body = dumps(routes.build_assessment(model, data, prediction, probability, encoded_meal_plan=True, timer=timer))
+    timer.lap('encode')
+    return body
+
+
+def _report(data):
+    """Executor side of /api/report: the PDF bytes for one patient"""
+    from .report_renderer import render_report
+    return render_report(**routes.report_inputs(routes.model_manager.current, data))
+
+
+async def _cache_call(executor, method, *args):
+    """Call a predict cache method; with a shared tier it does sqlite I/O, so on the executor"""
+    if routes.predict_cache.shared is None:
+        return method(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, method, *args)
+
+
+async def predict(request):
+    data = await _json_body(request)
+    executor = request.app[EXECUTOR]
+    cache = routes.predict_cache
+    # Everything from validation on, as in the Flask view: a field of the
+    # wrong type fails validation with an exception, which is a JSON 500
+    try:
+        if not validate_input_data(data):
+            return json_response({'error': 'Invalid input data'}, 400)
+        model = routes.model_manager.current
+        if cache is not None:
+            key, cached = await _cache_call(executor, cache.get, data, routes.response_versions(model))
+            if cached is not None:
+                return web.Response(text=cached, content_type='application/json')
+        if routes.predict_batcher is not None:
+            body = await _predict_batched(executor, model, data)
+        else:
+            body = await asyncio.get_running_loop().run_in_executor(executor, _predict, model, data)
+        if cache is not None:
+            await _cache_call(executor, cache.put, key, body)
+    except Exception as e:
+        return json_response({'error': 'Prediction failed', 'message': str(e)}, 500)
+    return web.Response(text=body, content_type='application/json')
+
+
+async def report(request):
+    data = await _json_body(request)
+    try:
+        if not validate_input_data(data):
+            return json_response({'error': 'Invalid input data'}, 400)
+        pdf = await asyncio.get_running_loop().run_in_executor(request.app[EXECUTOR], _report, data)
+    except Exception as e:
+        return json_response({'error': 'Failed to generate report', 'message': str(e)}, 500)
+    return web.Response(body=pdf, content_type='application/pdf', headers={
+        'Content-Disposition': 'attachment; filename=diabetes_report.pdf',
+    })
+
+
+async def health(request):
+    return json_response({**routes.health_status(), 'async_limit': request.app[LIMIT].stats()})
+
+
+async def readiness(request):
+    if not routes.ready:
+        return json_response({'status': 'warming_up'}, 503)
+    return json_response({'status': 'ready'})
+
+
+async def metrics(request):
+    return web.Response(text=REGISTRY.render(), headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+
+def create_async_app(max_in_flight=DEFAULT_MAX_IN_FLIGHT, workers=None, retry_after=DEFAULT_RETRY_AFTER,
+                     warm_up=False):
+    """Build the aiohttp app; loads the model and food catalog like create_app.
+
+    `workers` threads (default: one per CPU core) run predictions and PDF
+    renders; the pool is shut down with the app. With MODEL_WATCH_INTERVAL
+    set, new registry versions are followed in the background as well.
+    """
+    routes.load_state()
+    if warm_up:
+        routes.warm_up()
+
+    app = web.Application(middlewares=[serve])
+    app[LIMIT] = InFlightLimit(max_in_flight, retry_after)
+    app[EXECUTOR] = ThreadPoolExecutor(workers or os.cpu_count(), thread_name_prefix='async-api')
+
+    watch_interval = os.environ.get('MODEL_WATCH_INTERVAL')
+    if watch_interval:
+        routes.model_manager.start_watcher(float(watch_interval))
+
+    async def shutdown_executor(app):
+        if watch_interval:
+            routes.model_manager.stop_watcher()
+        app[EXECUTOR].shutdown(wait=False, cancel_futures=True)
+    app.on_cleanup.append(shutdown_executor)
+
+    app.router.add_post('/api/predict', predict)
+    app.router.add_post('/api/report', report)
+    app.router.add_get('/api/health', health)
+    app.router.add_get('/api/ready', readiness)
+    app.router.add_get('/api/metrics', metrics)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the API on asyncio (aiohttp)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=None, help='executor threads (default: CPU count)')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help='predict and report requests admitted at once; the rest get 503')
+    parser.add_argument('--retry-after', type=int, default=DEFAULT_RETRY_AFTER, help='seconds, sent with 503s')
+    parser.add_argument('--backlog', type=int, default=2048, help='listen backlog for connection bursts')
+    args = parser.parse_args(argv)
+
+    from . import configure_logging
+    configure_logging()
+    workers = args.workers or os.cpu_count()
+    app = create_async_app(args.max_in_flight, workers, args.retry_after, warm_up=True)
+    logger.info("Async API on %s:%s, %s executor threads, max %s in flight",
+                args.host, args.port, workers, args.max_in_flight)
+    web.run_app(app, host=args.host, port=args.port, backlog=args.backlog, print=None, access_log=None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Offline risk scoring for large patient extracts.
+
+Reads a CSV or Parquet file in the column layout of ml/data/diabetes.csv
+(or with the API field names) in fixed-size chunks, scores every chunk
+with one model call in a pool of worker processes and appends the results
+to a CSV or Parquet output as chunks finish, in input order:
+
+    python -m app.batch_score extract.csv -o scored.parquet --workers 4
+
+Input columns are kept; valid, prediction, probability, risk_level,
+risk_factors, calories, protein and carbs are added. Rows that fail
+validation keep their columns and get valid=False with empty results.
+Parquet output has one schema for every chunk: feature columns are
+float64 (cells that are not numbers become null), other input columns
+strings, and the result columns have fixed types.
+Peak memory is bounded by chunk size times the number of chunks in flight.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .model_loader import FEATURE_NAMES, load_model, predict_diabetes_matrix
+from .rules import RISK_FACTORS, RISK_LEVEL, nutrition_targets, risk_factor_matrix
+from .utils import REQUIRED_FIELDS, validate_input_matrix
+
+CHUNK_SIZE = 50_000
+
+# Dataset column name -> API field name
+COLUMN_TO_FIELD = dict(zip(FEATURE_NAMES, REQUIRED_FIELDS))
+
+# Every combination of risk factors, indexed by a bitmask over rules.RISK_FACTORS
+RISK_FACTOR_LABELS = np.array([
+    ';'.join(rule.field for bit, rule in enumerate(RISK_FACTORS) if code >> bit & 1)
+    for code in range(1 << len(RISK_FACTORS))
+], dtype=object)
+RISK_FACTOR_BITS = 1 << np.arange(len(RISK_FACTORS))
+
+RESULT_COLUMNS = ('valid', 'prediction', 'probability', 'risk_level', 'risk_factors', 'calories', 'protein', 'carbs')
+
+_model = None
+
+
+def feature_values(chunk):
+    """(n_rows, 8) float matrix in REQUIRED_FIELDS order; non-numbers become NaN"""
+    columns = chunk.rename(columns=COLUMN_TO_FIELD)
+    return np.column_stack([
+        pd.to_numeric(columns[field], errors='coerce').to_numpy(dtype=float) for field in REQUIRED_FIELDS
+    ])
+
+
+def score_chunk(model, chunk):
+    """Return chunk with the result columns appended"""
+    values = feature_values(chunk)
+    valid = validate_input_matrix(values)
+    features = values[valid]
+    columns = dict(zip(REQUIRED_FIELDS, features.T))
+
+    predictions, probabilities = predict_diabetes_matrix(model, features)
+    diabetic_prob = probabilities[:, 1]
+    risk_level = RISK_LEVEL(diabetic_prob)
+    factor_codes = risk_factor_matrix(columns) @ RISK_FACTOR_BITS
+    calories, protein, carbs = nutrition_targets(
+        columns['bmi'], columns['age'], columns['glucose'], predictions == 1
+    )
+
+    results = {
+        'prediction': (predictions, 'Int64'),
+        'probability': (diabetic_prob, 'float64'),
+        'risk_level': (risk_level, 'object'),
+        'risk_factors': (RISK_FACTOR_LABELS[factor_codes], 'object'),
+        'calories': (calories, 'Int64'),
+        'protein': (protein, 'Int64'),
+        'carbs': (carbs, 'Int64'),
+    }
+    scored = chunk.copy()
+    scored['valid'] = valid
+    for name, (column, dtype) in results.items():
+        full = pd.Series(None, index=chunk.index, dtype=dtype)
+        full[valid] = column
+        scored[name] = full
+    return scored
+
+
+def _init_worker():
+    # Forked workers inherit the parent's model; spawned ones load their own
+    global _model
+    if _model is None:
+        _model = load_model()
+
+
+def _score_in_worker(chunk):
+    return score_chunk(_model, chunk)
+
+
+def read_chunks(path, chunk_size):
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def parquet_schema(columns):
+    """Arrow schema of the scored output, independent of the types pandas infers per chunk"""
+    import pyarrow as pa
+    results = {
+        'valid': pa.bool_(), 'prediction': pa.int64(), 'probability': pa.float64(),
+        'risk_level': pa.string(), 'risk_factors': pa.string(),
+        'calories': pa.int64(), 'protein': pa.int64(), 'carbs': pa.int64(),
+    }
+    features = {*COLUMN_TO_FIELD, *REQUIRED_FIELDS}
+    return pa.schema([
+        (column, results.get(column, pa.float64() if column in features else pa.string())) for column in columns
+    ])
+
+
+def conform(chunk, schema):
+    """chunk with its input columns converted to the types of `schema`"""
+    import pyarrow as pa
+    chunk = chunk.copy()
+    for field in schema:
+        if field.name in RESULT_COLUMNS:
+            continue
+        column = chunk[field.name]
+        if field.type == pa.float64():
+            chunk[field.name] = pd.to_numeric(column, errors='coerce').astype(float)
+        else:
+            chunk[field.name] = column.astype(object).where(column.notna(), None).map(
+                lambda value: value if value is None else str(value)
+            )
+    return chunk
+
+
+class ResultWriter:
+    """Appends scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith('.parquet')
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                self._schema = parquet_schema(chunk.columns)
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            table = pa.Table.from_pandas(conform(chunk, self._schema), schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            first = self._writer is None
+            chunk.to_csv(self.path, mode='w' if first else 'a', header=first, index=False)
+            self._writer = True
+
+    def close(self):
+        if self.parquet and self._writer is not None:
+            self._writer.close()
+
+
+def score_file(input_path, output_path, chunk_size=CHUNK_SIZE, workers=None, progress=None):
+    """Score input_path into output_path; returns (rows, valid rows)"""
+    global _model
+    _model = load_model()
+    workers = os.cpu_count() if workers is None else workers
+    rows = valid = 0
+    writer = ResultWriter(output_path)
+
+    def write(scored):
+        nonlocal rows, valid
+        writer.write(scored)
+        rows += len(scored)
+        valid += int(scored['valid'].sum())
+        if progress:
+            progress(rows, valid)
+
+    try:
+        if workers <= 1:
+            for chunk in read_chunks(input_path, chunk_size):
+                write(score_chunk(_model, chunk))
+            return rows, valid
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            # Keep a bounded number of chunks in flight and write them in order
+            pending = deque()
+            for chunk in read_chunks(input_path, chunk_size):
+                pending.append(pool.submit(_score_in_worker, chunk))
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+        return rows, valid
+    finally:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='input .csv or .parquet')
+    parser.add_argument('-o', '--output', required=True, help='output .csv or .parquet')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='1 scores in this process')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def progress(rows, valid):
+        elapsed = time.perf_counter() - started
+        print(f"\r{rows:,} rows ({rows - valid:,} invalid), {rows / elapsed:,.0f} rows/s", end='', file=sys.stderr)
+
+    rows, valid = score_file(args.input, args.output, args.chunk_size, args.workers, progress)
+    elapsed = time.perf_counter() - started
+    print(f"\n{rows:,} rows scored into {args.output} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
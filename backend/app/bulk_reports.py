@@ -0,0 +1,249 @@
+"""
+Assessment reports for a whole roster of patients.
+
+A roster is a CSV file with one column per input field (plus an optional
+patient_id column) or NDJSON with one /api/predict payload per line. Rows
+are read, scored and rendered in batches, so memory use does not grow
+with the roster:
+
+    python -m app.bulk_reports roster.csv -o reports.zip
+    python -m app.bulk_reports roster.ndjson -o reports.pdf
+
+A combined PDF is the exception: reportlab holds every page until the
+file is saved. Over HTTP it is limited to BULK_PDF_MAX_ROWS roster rows
+(default 1000, about a second of rendering and a few MB); larger rosters
+get the streamed ZIP.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from itertools import islice
+
+from .model_loader import predict_diabetes_batch
+from .report_renderer import draw_report, generated_timestamp, new_canvas
+from .rules import RISK_LEVEL
+from .utils import REQUIRED_FIELDS, calculate_nutrition_needs, validate_input_batch
+
+BATCH_SIZE = 256
+
+# Roster rows accepted for a combined PDF over HTTP
+COMBINED_PDF_MAX_ROWS = 1000
+
+
+class RosterTooLargeError(Exception):
+    """Raised when a roster has more rows than a combined PDF may hold"""
+
+
+def combined_pdf_max_rows():
+    return int(os.environ.get('BULK_PDF_MAX_ROWS', COMBINED_PDF_MAX_ROWS))
+
+
+def report_args(recommender, data, prediction, probability):
+    """Everything render_report needs for one scored patient, as plain JSON types"""
+    diabetic_prob = probability[1] if isinstance(probability, list) else probability
+    risk_level = RISK_LEVEL(diabetic_prob)
+    nutrition = calculate_nutrition_needs(
+        data['bmi'], data['age'], data['glucose'], prediction == 1
+    )
+    daily_meal_plan = recommender.get_daily_meal_plan(data, risk_level, "Vegetarian")
+    return {
+        'data': {field: data[field] for field in REQUIRED_FIELDS},
+        'prediction': int(prediction),
+        'probability': probability,
+        'nutrition': nutrition,
+        'daily_meal_plan': daily_meal_plan,
+    }
+
+
+def _parse_number(value):
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def read_roster(lines, fmt):
+    """Yield patient payloads from an iterable of text lines"""
+    if fmt == 'csv':
+        for row in csv.DictReader(lines):
+            yield {
+                key: value if key == 'patient_id' else _parse_number(value or '')
+                for key, value in row.items() if key is not None
+            }
+    else:
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+
+def roster_format(filename=None, mimetype=None):
+    """'csv' or 'ndjson', from a file extension or a MIME type"""
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if filename and filename.lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def iter_reports(model, recommender, rows, batch_size=BATCH_SIZE):
+    """Yield (row number, patient_id, report args or None) for every roster row.
+
+    Each batch is validated at once and scored with a single model call;
+    meal plans come from the recommender's plan cache.
+    """
+    rows = iter(rows)
+    start = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        valid = validate_input_batch(batch)
+        predictions = iter(predict_diabetes_batch(model, [row for row, ok in zip(batch, valid) if ok]))
+        for offset, (row, ok) in enumerate(zip(batch, valid)):
+            patient_id = row.get('patient_id') if isinstance(row, dict) else None
+            args = report_args(recommender, row, *next(predictions)) if ok else None
+            yield start + offset + 1, patient_id, args
+        start += len(batch)
+
+
+def _entry_name(number, patient_id):
+    if patient_id:
+        safe = re.sub(r'[^A-Za-z0-9._-]+', '_', str(patient_id)).strip('._')
+        if safe:
+            return f'{number:05d}-{safe}.pdf'
+    return f'{number:05d}.pdf'
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only stream whose contents are drained by the response generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _skipped_text(skipped):
+    lines = [f'row {number}: invalid input data' for number in skipped]
+    return '\n'.join(lines) + '\n'
+
+
+def stream_zip(reports):
+    """Yield a ZIP archive with one PDF per valid patient, entry by entry.
+
+    Invalid rows are listed in skipped.txt at the end of the archive.
+    """
+    buffer = _ChunkBuffer()
+    generated_at = generated_timestamp()
+    skipped = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for number, patient_id, args in reports:
+            if args is None:
+                skipped.append(number)
+                continue
+            pdf = io.BytesIO()
+            doc = new_canvas(pdf)
+            draw_report(doc, **args, generated_at=generated_at)
+            doc.save()
+            archive.writestr(_entry_name(number, patient_id), pdf.getvalue())
+            yield buffer.drain()
+        if skipped:
+            archive.writestr('skipped.txt', _skipped_text(skipped))
+    yield buffer.drain()
+
+
+def write_combined_pdf(reports, out, max_rows=None):
+    """Draw every valid patient into one PDF, each starting on a new page.
+
+    reportlab keeps the page objects until save(), so this grows with the
+    page count (a few KB per patient); stream_zip stays flat. With
+    `max_rows`, raises RosterTooLargeError at the first row past it,
+    before anything is saved.
+    """
+    doc = new_canvas(out)
+    generated_at = generated_timestamp()
+    skipped = []
+    for number, patient_id, args in reports:
+        if max_rows is not None and number > max_rows:
+            raise RosterTooLargeError(f"a combined PDF holds at most {max_rows} roster rows")
+        if args is None:
+            skipped.append(number)
+            continue
+        draw_report(doc, **args, generated_at=generated_at)
+        doc.showPage()
+    if skipped:
+        text = doc.beginText(40, 720)
+        text.setFont('Helvetica', 10)
+        text.textLines('Skipped roster rows\n\n' + _skipped_text(skipped))
+        doc.drawText(text)
+        doc.showPage()
+    doc.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('roster', help='CSV or NDJSON roster, - for stdin (NDJSON)')
+    parser.add_argument('-o', '--output', required=True, help='output .zip or .pdf')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='roster format (default: from extension)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from .food_recommender import FoodRecommender
+    from .model_loader import load_model
+
+    model = load_model()
+    recommender = FoodRecommender()
+    fmt = args.format or roster_format(args.roster)
+    started = time.perf_counter()
+    count = 0
+
+    source = sys.stdin if args.roster == '-' else open(args.roster, newline='', encoding='utf-8')
+    with source, open(args.output, 'wb') as out:
+        def counted():
+            nonlocal count
+            for item in iter_reports(model, recommender, read_roster(source, fmt), args.batch_size):
+                count += 1
+                if count % 1000 == 0:
+                    print(f"{count} rows", file=sys.stderr)
+                yield item
+
+        if args.output.lower().endswith('.pdf'):
+            write_combined_pdf(counted(), out)
+        else:
+            for chunk in stream_zip(counted()):
+                out.write(chunk)
+
+    elapsed = time.perf_counter() - started
+    print(f"{count} rows -> {args.output} in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
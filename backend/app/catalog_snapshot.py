@@ -0,0 +1,331 @@
+"""
+Validated, memory-mapped snapshot of the shipped food catalog.
+
+`python -m app.catalog_snapshot` checks the schema and value ranges of
+ml/data/indian_food_weighted_220.csv and compiles it, followed by
+FOOD_DATABASE, into one binary file:
+
+    FOODCAT\\0 | header length (uint64) | JSON header | columns, 64-byte aligned
+
+The header holds the labels of the string columns, the dtype and offset of
+every column and the sha256 of the CSV and FOOD_DATABASE the snapshot was
+built from. Loading maps the file read-only and wraps each column with
+np.frombuffer, so no column data is read up front and every worker process
+shares the same pages. A snapshot that does not match the CSV any more, or
+that cannot be read, raises CatalogError instead of serving other foods.
+
+Every CSV row is keyed by a hash of its fields. A rebuild takes the encoded
+values of rows whose key is already in the previous snapshot and only
+parses and validates the rows that were added or edited.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from .food_catalog import (
+    CSV_COLUMNS, DECIMAL_COLUMNS, FOOD_DATA_PATH, FOOD_DATABASE, INDIAN_FOOD, INTEGER_COLUMNS, STRING_COLUMNS,
+    FoodCatalog,
+)
+
+SNAPSHOT_PATH = Path(__file__).resolve().parents[1] / 'model' / 'food_catalog.snapshot'
+
+MAGIC = b'FOODCAT\x00'
+FORMAT_VERSION = 1
+ALIGN = 64
+
+RISK_LEVELS = ('Low', 'Moderate', 'High')
+DIET_TYPES = ('Vegetarian', 'Non-Vegetarian')
+# Allowed values of the categorical CSV columns
+CODES = {'risk': RISK_LEVELS, 'diet_type': DIET_TYPES}
+# Inclusive (low, high) bounds of the numeric CSV columns, None for no bound
+VALUE_RANGES = {
+    'priority': (0, None),
+    'weight_g': (1, None),
+    'calories': (0, None),
+    'protein_g': (0, None),
+    'fiber_g': (0, None),
+    'gi_index': (0, 100),
+}
+# Problems listed in a CatalogError message
+MAX_REPORTED = 20
+# The curated foods are part of every snapshot's source digest
+DATABASE_JSON = json.dumps(FOOD_DATABASE, sort_keys=True).encode('utf-8')
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogError(Exception):
+    """Raised when the food catalog or its snapshot cannot be served"""
+
+
+def source_digest(csv_path=FOOD_DATA_PATH):
+    """Hex sha256 of the CSV bytes and FOOD_DATABASE, what a snapshot is built from"""
+    digest = hashlib.sha256(Path(csv_path).read_bytes())
+    digest.update(DATABASE_JSON)
+    return digest.hexdigest()
+
+
+def row_key(fields):
+    """64-bit content hash of one CSV row, its fields in CSV_COLUMNS order"""
+    digest = hashlib.blake2b('\x1f'.join(fields).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def read_rows(csv_path):
+    """(line number, fields in CSV_COLUMNS order) of every CSV row.
+
+    Raises CatalogError for a missing or unknown column, or a row with the
+    wrong number of fields.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        missing = [column for column in CSV_COLUMNS if column not in header]
+        unknown = [column for column in header if column not in CSV_COLUMNS]
+        if missing or unknown:
+            raise CatalogError(f"{csv_path}: missing columns {missing}, unknown columns {unknown}")
+        positions = [header.index(column) for column in CSV_COLUMNS]
+        rows, problems = [], []
+        for fields in reader:
+            if not fields:
+                continue
+            if len(fields) != len(header):
+                problems.append(f"line {reader.line_num}: {len(fields)} fields, expected {len(header)}")
+                continue
+            rows.append((reader.line_num, [fields[position] for position in positions]))
+    _raise_problems(csv_path, problems)
+    return rows
+
+
+def _raise_problems(csv_path, problems):
+    if problems:
+        listed = '\n  '.join(problems[:MAX_REPORTED])
+        more = f"\n  ... and {len(problems) - MAX_REPORTED} more" if len(problems) > MAX_REPORTED else ''
+        raise CatalogError(f"{csv_path}: {len(problems)} problem{'s' if len(problems) > 1 else ''}\n  {listed}{more}")
+
+
+def _number(text, whole):
+    value = int(text) if whole else float(text)
+    if not math.isfinite(value):
+        raise ValueError(text)
+    return value
+
+
+def parse_rows(csv_path, rows):
+    """Validated columns of `rows`, ready for FoodCatalog.from_columns.
+
+    Raises CatalogError listing every value that is missing, not a number,
+    out of its range or not one of the known codes.
+    """
+    columns = {column: [] for column in CSV_COLUMNS}
+    problems = []
+    for line, fields in rows:
+        for column, text in zip(CSV_COLUMNS, fields):
+            if column in INTEGER_COLUMNS or column in DECIMAL_COLUMNS:
+                low, high = VALUE_RANGES.get(column, (None, None))
+                try:
+                    value = _number(text, column in INTEGER_COLUMNS)
+                except ValueError:
+                    kind = 'a whole number' if column in INTEGER_COLUMNS else 'a number'
+                    problems.append(f"line {line}: {column} {text!r} is not {kind}")
+                    value = None
+                else:
+                    if (low is not None and value < low) or (high is not None and value > high):
+                        bounds = f"{low}-{high}" if high is not None else f">= {low}"
+                        problems.append(f"line {line}: {column} {text} is outside {bounds}")
+            else:
+                value = text or None
+                if column in CODES and value not in CODES[column]:
+                    problems.append(f"line {line}: {column} {text!r} is not one of {', '.join(CODES[column])}")
+                elif column == 'title' and value is None:
+                    problems.append(f"line {line}: title is empty")
+            columns[column].append(value)
+    _raise_problems(csv_path, problems)
+    return columns
+
+
+def _previous_rows(path):
+    """(CSV rows catalog, row keys) of the snapshot at `path`, or (None, no keys)"""
+    if not Path(path).exists():
+        return None, np.zeros(0, dtype=np.uint64)
+    try:
+        header, arrays = _open(path)
+    except CatalogError as e:
+        logger.warning("Rebuilding the whole food catalog: %s", e)
+        return None, np.zeros(0, dtype=np.uint64)
+    keys = arrays.get('row_key')
+    if keys is None or len(keys) > header['size']:
+        logger.warning("Rebuilding the whole food catalog: %s has no valid row keys", path)
+        return None, np.zeros(0, dtype=np.uint64)
+    return _catalog(header, arrays).take(np.arange(len(keys))), keys
+
+
+def build_snapshot(csv_path=FOOD_DATA_PATH, path=SNAPSHOT_PATH):
+    """Validate the CSV and write its snapshot to `path`, replacing it atomically.
+
+    Rows already in the previous snapshot at `path` are reused as they are;
+    only new or edited rows are parsed and validated. Returns counts of the
+    rows and of those reused, for logging.
+    """
+    digest = source_digest(csv_path)
+    rows = read_rows(csv_path)
+    if not rows:
+        raise CatalogError(f"{csv_path}: no foods")
+    keys = np.array([row_key(fields) for _, fields in rows], dtype=np.uint64)
+
+    previous, previous_keys = _previous_rows(path)
+    position = {key: row for row, key in enumerate(previous_keys.tolist())}
+    source = np.array([position.get(key, -1) for key in keys.tolist()], dtype=np.intp)
+    reused, fresh = np.flatnonzero(source >= 0), np.flatnonzero(source < 0)
+
+    # Reused rows first, then the parsed ones, then back in CSV order
+    parts = []
+    if len(reused):
+        parts.append(previous.take(source[reused]))
+    if len(fresh):
+        parts.append(FoodCatalog.from_columns(parse_rows(csv_path, [rows[i] for i in fresh.tolist()]), INDIAN_FOOD))
+    order = np.empty(len(rows), dtype=np.intp)
+    order[reused] = np.arange(len(reused))
+    order[fresh] = len(reused) + np.arange(len(fresh))
+    foods = FoodCatalog.concat(parts).take(order)
+
+    catalog = FoodCatalog.concat([foods, FoodCatalog.from_food_database()])
+    _write(catalog, keys, digest, Path(path))
+    return {'rows': len(rows), 'reused': len(reused), 'parsed': len(fresh)}
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _write(catalog, keys, digest, path):
+    arrays = {f'codes.{column}': catalog.codes[column] for column in STRING_COLUMNS}
+    arrays.update({f'integers.{column}': catalog.integers[column] for column in INTEGER_COLUMNS})
+    arrays.update({f'decimals.{column}': catalog.decimals[column][0] for column in DECIMAL_COLUMNS})
+    arrays['row_key'] = keys
+
+    specs, offset = {}, 0
+    for name, values in arrays.items():
+        specs[name] = {'dtype': values.dtype.str, 'offset': offset, 'length': len(values)}
+        offset = _aligned(offset + values.nbytes)
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'source_digest': digest,
+        'size': len(catalog),
+        'labels': catalog.labels,
+        'scales': {column: catalog.decimals[column][1] for column in DECIMAL_COLUMNS},
+        'arrays': specs,
+    }, ensure_ascii=False).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f'.{path.name}-', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, values in arrays.items():
+                f.seek(data_start + specs[name]['offset'])
+                f.write(np.ascontiguousarray(values).tobytes())
+            f.truncate(data_start + offset)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _open(path):
+    """(header, {name: read-only array}) of a snapshot; CatalogError if it is unreadable"""
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise CatalogError(f"Cannot read food catalog snapshot {path}: {e}") from e
+    if buffer[:len(MAGIC)] != MAGIC or len(buffer) < len(MAGIC) + 8:
+        raise CatalogError(f"{path} is not a food catalog snapshot")
+    (length,) = struct.unpack_from('<Q', buffer, len(MAGIC))
+    if len(MAGIC) + 8 + length > len(buffer):
+        raise CatalogError(f"{path} is truncated")
+    try:
+        header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + length])
+        if header['format'] != FORMAT_VERSION:
+            raise CatalogError(f"{path} has snapshot format {header['format']!r}, expected {FORMAT_VERSION}")
+        data_start = _aligned(len(MAGIC) + 8 + length)
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            start = data_start + spec['offset']
+            if start + dtype.itemsize * spec['length'] > len(buffer):
+                raise CatalogError(f"{path} is truncated")
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=spec['length'], offset=start)
+        expected = [f'{kind}.{column}' for kind, columns in
+                    (('codes', STRING_COLUMNS), ('integers', INTEGER_COLUMNS), ('decimals', DECIMAL_COLUMNS))
+                    for column in columns]
+        if any(name not in arrays or len(arrays[name]) != header['size'] for name in expected):
+            raise CatalogError(f"{path} does not hold every catalog column")
+    except (ValueError, KeyError, TypeError) as e:
+        raise CatalogError(f"{path} has a corrupt header: {e!r}") from e
+    return header, arrays
+
+
+def _catalog(header, arrays):
+    labels = {column: [sys.intern(label) for label in header['labels'][column]] for column in STRING_COLUMNS}
+    return FoodCatalog(
+        header['size'],
+        {column: arrays[f'codes.{column}'] for column in STRING_COLUMNS},
+        labels,
+        {column: arrays[f'integers.{column}'] for column in INTEGER_COLUMNS},
+        {column: (arrays[f'decimals.{column}'], header['scales'][column]) for column in DECIMAL_COLUMNS},
+    )
+
+
+def load_snapshot(path=SNAPSHOT_PATH, csv_path=FOOD_DATA_PATH):
+    """The catalog memory-mapped from the snapshot at `path`.
+
+    Raises CatalogError when the snapshot is missing, unreadable, or was
+    built from another version of `csv_path` or FOOD_DATABASE.
+    """
+    header, arrays = _open(path)
+    if header.get('source_digest') != source_digest(csv_path):
+        raise CatalogError(
+            f"Food catalog snapshot {path} is stale: {csv_path} or FOOD_DATABASE changed since it was "
+            f"built. Rebuild it with `python -m app.catalog_snapshot`."
+        )
+    return _catalog(header, arrays)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate the food catalog CSV and compile its snapshot')
+    parser.add_argument('--csv', type=Path, default=FOOD_DATA_PATH)
+    parser.add_argument('--output', type=Path, default=SNAPSHOT_PATH)
+    parser.add_argument('--check', action='store_true', help='only check that the snapshot is up to date')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.check:
+            catalog = load_snapshot(args.output, args.csv)
+            print(f"{args.output} is up to date ({len(catalog)} foods)")
+            return 0
+        started = perf_counter()
+        stats = build_snapshot(args.csv, args.output)
+    except CatalogError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Validated {stats['rows']} rows ({stats['parsed']} parsed, {stats['reused']} reused) "
+          f"and wrote {args.output} in {(perf_counter() - started) * 1e3:.1f} ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
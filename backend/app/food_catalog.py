@@ -0,0 +1,394 @@
+"""
+One food catalog for the Indian food CSV and the curated FOOD_DATABASE.
+
+Both sources are loaded into a `FoodCatalog`: a structure of arrays with
+one NumPy array per column instead of one object per food.
+
+- Strings (titles, regions, icons, ...) are interned once per distinct
+  value in a sorted label list and stored per row as small integer codes;
+  a missing value has code -1.
+- Whole numbers use the smallest integer dtype that holds the column.
+- Decimal columns (protein, fiber, carbs) are stored as scaled integers
+  when every value has at most three decimals, so decoding them gives back
+  exactly the float64 values that were loaded.
+
+Rows keep the order they were loaded in, one source after the other, and
+`select(source)` returns the rows of one source as their own catalog. The
+curated foods keep their meal and GI band, and their row order per
+(meal, GI band), by load order and by protein, is computed once.
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+
+FOOD_DATA_PATH = Path(__file__).parent.parent.parent / 'ml' / 'data' / 'indian_food_weighted_220.csv'
+
+logger = logging.getLogger(__name__)
+
+# Catalog titles carry the portion size, e.g. "Bajra Roti (266g)"
+PORTION_SUFFIX = re.compile(r'\s*\(\d+(\.\d+)?\s*g\)\s*$')
+
+INDIAN_FOOD = 'indian_food'
+CURATED = 'curated'
+
+STRING_COLUMNS = ('title', 'examples', 'benefit', 'icon', 'diet_type', 'region', 'risk', 'meal', 'gi_band', 'source')
+INTEGER_COLUMNS = ('priority', 'weight_g', 'calories', 'gi_index')
+DECIMAL_COLUMNS = ('protein_g', 'fiber_g', 'carbs_g')
+# Columns of the CSV, in file order
+CSV_COLUMNS = ('title', 'examples', 'benefit', 'icon', 'diet_type', 'region', 'risk',
+               'priority', 'weight_g', 'calories', 'protein_g', 'fiber_g', 'gi_index')
+
+# Curated foods per meal and GI band, with whole-number nutrition values
+FOOD_DATABASE = {
+    'breakfast': {
+        'low_gi': [
+            {'name': 'Steel-cut oats with berries', 'calories': 250, 'protein': 8, 'carbs': 45, 'gi': 42, 'fiber': 8},
+            {'name': 'Greek yogurt with almonds', 'calories': 200, 'protein': 15, 'carbs': 12, 'gi': 35, 'fiber': 2},
+            {'name': 'Vegetable omelet (2 eggs)', 'calories': 220, 'protein': 18, 'carbs': 8, 'gi': 15, 'fiber': 3},
+            {'name': 'Avocado toast (whole grain)', 'calories': 280, 'protein': 12, 'carbs': 30, 'gi': 45, 'fiber': 12},
+        ],
+        'moderate_gi': [
+            {'name': 'Whole grain toast with jam', 'calories': 300, 'protein': 8, 'carbs': 55, 'gi': 65, 'fiber': 6},
+            {'name': 'Banana smoothie', 'calories': 250, 'protein': 6, 'carbs': 50, 'gi': 62, 'fiber': 4},
+            {'name': 'Oatmeal with honey', 'calories': 280, 'protein': 10, 'carbs': 48, 'gi': 58, 'fiber': 5},
+        ]
+    },
+    'lunch': {
+        'low_gi': [
+            {'name': 'Grilled chicken salad', 'calories': 350, 'protein': 35, 'carbs': 15, 'gi': 25, 'fiber': 8},
+            {'name': 'Quinoa bowl with vegetables', 'calories': 400, 'protein': 16, 'carbs': 45, 'gi': 35, 'fiber': 10},
+            {'name': 'Lentil soup with vegetables', 'calories': 300, 'protein': 18, 'carbs': 35, 'gi': 30, 'fiber': 12},
+            {'name': 'Salmon with broccoli', 'calories': 380, 'protein': 32, 'carbs': 12, 'gi': 20, 'fiber': 6},
+        ],
+        'moderate_gi': [
+            {'name': 'Brown rice with chicken', 'calories': 450, 'protein': 28, 'carbs': 55, 'gi': 55, 'fiber': 4},
+            {'name': 'Whole wheat pasta primavera', 'calories': 400, 'protein': 14, 'carbs': 65, 'gi': 50, 'fiber': 6},
+            {'name': 'Sweet potato with protein', 'calories': 420, 'protein': 25, 'carbs': 50, 'gi': 48, 'fiber': 8},
+        ]
+    },
+    'dinner': {
+        'low_gi': [
+            {'name': 'Grilled fish with asparagus', 'calories': 320, 'protein': 30, 'carbs': 10, 'gi': 15, 'fiber': 5},
+            {'name': 'Turkey meatballs with zucchini', 'calories': 350, 'protein': 28, 'carbs': 18, 'gi': 25, 'fiber': 6},
+            {'name': 'Beef stir-fry with vegetables', 'calories': 380, 'protein': 32, 'carbs': 20, 'gi': 30, 'fiber': 8},
+            {'name': 'Chicken curry with cauliflower', 'calories': 340, 'protein': 30, 'carbs': 15, 'gi': 20, 'fiber': 7},
+        ],
+        'moderate_gi': [
+            {'name': 'Chicken with brown rice', 'calories': 450, 'protein': 30, 'carbs': 50, 'gi': 55, 'fiber': 4},
+            {'name': 'Lean beef with quinoa', 'calories': 420, 'protein': 35, 'carbs': 40, 'gi': 45, 'fiber': 6},
+            {'name': 'Fish with sweet potato', 'calories': 400, 'protein': 28, 'carbs': 45, 'gi': 48, 'fiber': 8},
+        ]
+    },
+    'snacks': {
+        'low_gi': [
+            {'name': 'Almonds (1 oz)', 'calories': 160, 'protein': 6, 'carbs': 6, 'gi': 15, 'fiber': 4},
+            {'name': 'Apple with peanut butter', 'calories': 180, 'protein': 8, 'carbs': 20, 'gi': 38, 'fiber': 5},
+            {'name': 'Greek yogurt (plain)', 'calories': 100, 'protein': 17, 'carbs': 6, 'gi': 35, 'fiber': 0},
+            {'name': 'Hummus with vegetables', 'calories': 120, 'protein': 5, 'carbs': 15, 'gi': 25, 'fiber': 6},
+        ],
+        'moderate_gi': [
+            {'name': 'Whole grain crackers', 'calories': 140, 'protein': 3, 'carbs': 22, 'gi': 55, 'fiber': 3},
+            {'name': 'Banana', 'calories': 105, 'protein': 1, 'carbs': 27, 'gi': 62, 'fiber': 3},
+            {'name': 'Granola bar', 'calories': 150, 'protein': 4, 'carbs': 25, 'gi': 60, 'fiber': 2},
+        ]
+    }
+}
+# FOOD_DATABASE keys -> catalog columns
+CURATED_FIELDS = {'name': 'title', 'calories': 'calories', 'protein': 'protein_g',
+                  'carbs': 'carbs_g', 'gi': 'gi_index', 'fiber': 'fiber_g'}
+
+INTEGER_TYPES = (np.uint8, np.int8, np.int16, np.int32, np.int64)
+DECIMAL_SCALES = (1, 10, 100, 1000)
+
+
+def _smallest_int(values, types=INTEGER_TYPES):
+    """values as the first integer dtype that holds them all"""
+    if len(values) == 0:
+        return np.zeros(0, dtype=types[0])
+    low, high = values.min(), values.max()
+    for dtype in types:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    raise ValueError("Values do not fit in 64 bits")
+
+
+def factorize(values):
+    """(codes, distinct values) in first-seen order; None and NaN get code -1.
+
+    A dict lookup per value, as fast as pandas.factorize on object arrays
+    without importing pandas on the serving path.
+    """
+    index = {}
+    codes = np.array([index.setdefault(value, len(index)) for value in values], dtype=np.int64)
+    present = np.array([not (value is None or value != value) for value in index], dtype=bool)
+    if present.all():
+        return codes, list(index)
+    remap = np.where(present, np.cumsum(present) - 1, -1)
+    return remap[codes], [value for value, keep in zip(index, present) if keep]
+
+
+def _encode_strings(values):
+    """(codes, labels) of a string column: sorted interned labels, -1 when missing"""
+    codes, uniques = factorize(values)
+    names = [str(label) for label in uniques]
+    order = sorted(range(len(names)), key=names.__getitem__)
+    rank = np.empty(len(order) + 1, dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    rank[-1] = -1
+    labels = [sys.intern(names[code]) for code in order]
+    return _smallest_int(rank[codes], (np.int8, np.int16, np.int32)), labels
+
+
+def _encode_decimals(values):
+    """(stored values, scale): scaled integers that decode exactly, else float64.
+
+    Missing values are stored as the dtype's minimum.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    for scale in DECIMAL_SCALES:
+        scaled = np.round(values[present] * scale)
+        if np.array_equal(scaled / scale, values[present]):
+            stored = _smallest_int(np.r_[scaled, 0].astype(np.int64), (np.int16, np.int32, np.int64))[:-1]
+            missing = np.iinfo(stored.dtype).min
+            if len(stored) and stored.min() == missing:
+                continue
+            out = np.full(len(values), missing, dtype=stored.dtype)
+            out[present] = stored
+            return out, scale
+    return values, None
+
+
+class FoodCatalog:
+    """Structure-of-arrays food catalog.
+
+    `codes[column]` and `labels[column]` hold the string columns, `integers`
+    the whole-number columns and `decimals[column]` a (stored, scale) pair;
+    use `column()` and `strings()` to read them decoded.
+    """
+
+    def __init__(self, size, codes, labels, integers, decimals):
+        self.size = size
+        self.codes = codes
+        self.labels = labels
+        self.integers = integers
+        self.decimals = decimals
+        self._first_rows = None
+        self._build_orders()
+
+    @classmethod
+    def from_columns(cls, columns, source):
+        """Catalog from a dict of equally long columns.
+
+        Absent string and decimal columns are missing, absent whole-number
+        columns are 0.
+        """
+        size = len(next(iter(columns.values())))
+        codes, labels = {}, {}
+        for column in STRING_COLUMNS:
+            values = [source] * size if column == 'source' else columns.get(column, [None] * size)
+            codes[column], labels[column] = _encode_strings(values)
+        integers = {
+            column: _smallest_int(np.asarray(columns.get(column, np.zeros(size)), dtype=np.int64))
+            for column in INTEGER_COLUMNS
+        }
+        decimals = {column: _encode_decimals(columns.get(column, np.full(size, np.nan))) for column in DECIMAL_COLUMNS}
+        return cls(size, codes, labels, integers, decimals)
+
+    @classmethod
+    def from_frame(cls, food_data, source=INDIAN_FOOD):
+        """Catalog from a DataFrame in the CSV layout"""
+        return cls.from_columns({column: food_data[column].to_numpy() for column in food_data.columns}, source)
+
+    @classmethod
+    def from_food_database(cls, database=FOOD_DATABASE):
+        """Catalog of the curated foods, with their meal and GI band"""
+        columns = {column: [] for column in [*CURATED_FIELDS.values(), 'meal', 'gi_band']}
+        for meal, bands in database.items():
+            for gi_band, foods in bands.items():
+                for food in foods:
+                    for field, column in CURATED_FIELDS.items():
+                        columns[column].append(food.get(field, np.nan if column in DECIMAL_COLUMNS else None))
+                    columns['meal'].append(meal)
+                    columns['gi_band'].append(gi_band)
+        return cls.from_columns(columns, CURATED)
+
+    @classmethod
+    def concat(cls, catalogs):
+        """Rows of every catalog, in order, with merged labels"""
+        codes, labels = {}, {}
+        for column in STRING_COLUMNS:
+            labels[column] = sorted(set().union(*(catalog.labels[column] for catalog in catalogs)))
+            position = {label: code for code, label in enumerate(labels[column])}
+            parts = []
+            for catalog in catalogs:
+                remap = np.array([position[label] for label in catalog.labels[column]] + [-1], dtype=np.int64)
+                parts.append(remap[catalog.codes[column]])
+            codes[column] = _smallest_int(np.concatenate(parts), (np.int8, np.int16, np.int32))
+        integers = {
+            column: _smallest_int(np.concatenate([catalog.integers[column] for catalog in catalogs]).astype(np.int64))
+            for column in INTEGER_COLUMNS
+        }
+        decimals = {
+            column: _encode_decimals(np.concatenate([catalog.column(column) for catalog in catalogs]))
+            for column in DECIMAL_COLUMNS
+        }
+        return cls(sum(len(catalog) for catalog in catalogs), codes, labels, integers, decimals)
+
+    def select(self, source):
+        """The rows of one source as a catalog of their own, labels trimmed to those rows"""
+        rows = np.flatnonzero(self.codes['source'] == self.labels['source'].index(source)) \
+            if source in self.labels['source'] else np.zeros(0, dtype=np.intp)
+        return self.take(rows)
+
+    def take(self, rows):
+        """The given rows, in that order, as a catalog of their own with labels trimmed to them"""
+        rows = np.asarray(rows, dtype=np.intp)
+        codes, labels = {}, {}
+        for column in STRING_COLUMNS:
+            selected = self.codes[column][rows]
+            used = np.unique(selected[selected >= 0])
+            remap = np.full(len(self.labels[column]) + 1, -1, dtype=np.int64)
+            remap[used] = np.arange(len(used))
+            codes[column] = _smallest_int(remap[selected], (np.int8, np.int16, np.int32))
+            labels[column] = [self.labels[column][code] for code in used.tolist()]
+        integers = {column: values[rows] for column, values in self.integers.items()}
+        decimals = {column: (stored[rows], scale) for column, (stored, scale) in self.decimals.items()}
+        return FoodCatalog(len(rows), codes, labels, integers, decimals)
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name, rows=None):
+        """A numeric column (decimals as float64, NaN when missing)"""
+        if name in self.integers:
+            values = self.integers[name]
+            return values if rows is None else values[rows]
+        stored, scale = self.decimals[name]
+        if rows is not None:
+            stored = stored[rows]
+        if scale is None:
+            return stored
+        values = stored / scale
+        values[stored == np.iinfo(stored.dtype).min] = np.nan
+        return values
+
+    def strings(self, name, rows=None):
+        """A string column as a list, None when missing"""
+        codes = self.codes[name] if rows is None else self.codes[name][rows]
+        labels = self.labels[name] + [None]
+        return [labels[code] for code in codes.tolist()]
+
+    def rows_for(self, titles):
+        """First row with each title; KeyError for unknown titles"""
+        if self._first_rows is None:
+            codes, first = np.unique(self.codes['title'], return_index=True)
+            self._first_rows = dict(zip(codes.tolist(), first.tolist()))
+        labels = self.labels['title']
+        rows = []
+        for title in titles:
+            code = bisect_left(labels, title)
+            if code == len(labels) or labels[code] != title or code not in self._first_rows:
+                raise KeyError(title)
+            rows.append(self._first_rows[code])
+        return np.array(rows, dtype=np.intp)
+
+    def derived_codes(self, name, transform):
+        """(codes, labels) of `transform` applied to a string column, e.g. dish names from titles"""
+        transformed = [transform(label) for label in self.labels[name]]
+        label_codes, labels = _encode_strings(transformed)
+        remap = np.r_[label_codes.astype(np.int64), -1]
+        return _smallest_int(remap[self.codes[name]], (np.int8, np.int16, np.int32)), labels
+
+    def to_frame(self):
+        """The catalog as a DataFrame in the CSV layout"""
+        import pandas as pd
+        columns = {}
+        for column in CSV_COLUMNS:
+            columns[column] = self.strings(column) if column in self.codes else self.column(column)
+        return pd.DataFrame(columns)
+
+    def _build_orders(self):
+        """Rows per (meal, GI band): in load order and by protein, highest first"""
+        self.orders = {}
+        meal, band = self.codes['meal'], self.codes['gi_band']
+        protein = self.column('protein_g')
+        for meal_code, meal_label in enumerate(self.labels['meal']):
+            for band_code, band_label in enumerate(self.labels['gi_band']):
+                rows = np.flatnonzero((meal == meal_code) & (band == band_code))
+                if len(rows):
+                    by_protein = rows[np.argsort(-protein[rows], kind='stable')]
+                    self.orders[meal_label, band_label] = (rows, by_protein)
+
+    def digest(self):
+        """Hash of the decoded contents; the same for equal catalogs in any process"""
+        digest = hashlib.blake2b(digest_size=8)
+        for column in STRING_COLUMNS:
+            strings = ('' if value is None else value for value in self.strings(column))
+            digest.update(('\x1f'.join(strings) + '\x1e').encode('utf-8'))
+        for column in (*INTEGER_COLUMNS, *DECIMAL_COLUMNS):
+            digest.update(np.ascontiguousarray(self.column(column), dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays and the interned labels"""
+        arrays = [*self.codes.values(), *self.integers.values(), *(stored for stored, _ in self.decimals.values())]
+        labels = {id(label): sys.getsizeof(label) for column in self.labels.values() for label in column}
+        return sum(array.nbytes for array in arrays) + sum(labels.values()) \
+            + sum(sys.getsizeof(column) for column in self.labels.values())
+
+
+def load_catalog(path=FOOD_DATA_PATH, food_data=None):
+    """Catalog of the CSV at `path` (or the `food_data` frame) followed by FOOD_DATABASE"""
+    if food_data is None:
+        import pandas as pd
+        food_data = pd.read_csv(path)
+    return FoodCatalog.concat([FoodCatalog.from_frame(food_data), FoodCatalog.from_food_database()])
+
+
+# The loaded default catalog and the state of the files it was loaded from
+_default = {'files': None, 'catalog': None}
+_default_lock = threading.Lock()
+
+
+def _file_state(*paths):
+    """(inode, size, mtime) of each path, None for a missing one"""
+    states = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            states.append(None)
+        else:
+            states.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(states)
+
+
+def default_catalog():
+    """The shipped catalog, memory-mapped from its snapshot.
+
+    Loaded once per process and again whenever the CSV or the snapshot
+    file changes, so a reload sees an edited catalog. The snapshot is built
+    on first use when there is none; a stale or invalid one raises
+    CatalogError (see app.catalog_snapshot).
+    """
+    from . import catalog_snapshot
+    csv_path, snapshot_path = FOOD_DATA_PATH, catalog_snapshot.SNAPSHOT_PATH
+    with _default_lock:
+        files = _file_state(csv_path, snapshot_path)
+        if files != _default['files']:
+            if not snapshot_path.exists():
+                logger.warning("No food catalog snapshot at %s, building it", snapshot_path)
+                catalog_snapshot.build_snapshot(csv_path, snapshot_path)
+                files = _file_state(csv_path, snapshot_path)
+            _default['catalog'] = catalog_snapshot.load_snapshot(snapshot_path, csv_path)
+            _default['files'] = files
+        return _default['catalog']
@@ -0,0 +1,152 @@
+import numpy as np
+
+from .food_catalog import PORTION_SUFFIX
+from .rules import FOOD_BMI_BAND
+
+# Scoring weights, shared with the original pandas implementation
+GI_WEIGHT = 0.4
+FIBER_WEIGHT = 0.2
+PROTEIN_WEIGHT = 0.2
+RISK_WEIGHT = 0.2
+
+# How well a food's risk label suits a diabetic diet; unknown labels get 0.5
+FOOD_RISK_SCORES = {'Low': 1.0, 'Moderate': 0.7, 'High': 0.4}
+UNKNOWN_RISK_SCORE = 0.5
+
+
+class FoodPartition:
+    """Rows of one (diet_type, risk) slice with their precomputed scores"""
+
+    def __init__(self, rows, partial_scores, calorie_adjustment, meal_masks):
+        self.rows = rows
+        self.partial_scores = partial_scores
+        self.calorie_adjustment = calorie_adjustment
+        self.meal_masks = meal_masks
+        self.meal_positions = {meal: np.flatnonzero(mask) for meal, mask in meal_masks.items()}
+        # Meal planner candidates per (patient risk level, BMI band), see meal_planner
+        self.candidates = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class FoodScoringEngine:
+    """Array-backed scorer for the food catalog.
+
+    Everything that does not depend on the patient is computed once from the
+    FoodCatalog: the numeric columns, its integer codes for the categorical
+    columns, and for every (diet_type, risk) partition the score terms for
+    each patient risk level. Scoring a request is then a slice lookup plus
+    the BMI calorie adjustment.
+    """
+
+    def __init__(self, catalog):
+        self.size = len(catalog)
+        self.gi_index = catalog.column('gi_index')
+        self.fiber_g = catalog.column('fiber_g')
+        self.protein_g = catalog.column('protein_g')
+        self.calories = catalog.column('calories')
+
+        self.risk_code, self.risk_labels = catalog.codes['risk'], catalog.labels['risk']
+        self.diet_code, self.diet_labels = catalog.codes['diet_type'], catalog.labels['diet_type']
+        self.region_code, self.region_labels = catalog.codes['region'], catalog.labels['region']
+        self.icon_code, self.icon_labels = catalog.codes['icon'], catalog.labels['icon']
+        # Portion variants of the same dish share a dish code
+        self.dish_code, self.dish_labels = catalog.derived_codes('title', lambda title: PORTION_SUFFIX.sub('', title))
+
+        self._partial_scores = self._compute_partial_scores()
+        self._calorie_adjustment = 0.1 * (self.calories / 1000)
+        self._meal_masks = {
+            'breakfast': self.gi_index < 60,  # Lower GI for breakfast
+            'lunch': (self.calories >= 200) & (self.calories <= 400),
+            'dinner': (self.calories >= 150) & (self.calories <= 350),
+            'snacks': self.calories < 200,
+        }
+        self._partitions = {}
+
+    def _compute_partial_scores(self):
+        """Patient independent score for every food, per patient risk level"""
+        static = np.zeros(self.size)
+        static += GI_WEIGHT * ((100 - self.gi_index.astype(float)) / 100)
+        static += FIBER_WEIGHT * np.minimum((self.fiber_g * 20) / 100, 1)
+        static += PROTEIN_WEIGHT * (np.minimum(self.protein_g * 10, 100) / 100)
+
+        # Code -1 (no label) picks the trailing unknown score
+        label_scores = [FOOD_RISK_SCORES.get(label, UNKNOWN_RISK_SCORE) for label in self.risk_labels]
+        food_risk = np.array(label_scores + [UNKNOWN_RISK_SCORE])[self.risk_code]
+        return {
+            # High-risk patients need low-risk foods
+            'High': static + RISK_WEIGHT * food_risk,
+            # Moderate-risk patients can have moderate-risk foods
+            'Moderate': static + RISK_WEIGHT * (1 - np.abs(food_risk - 0.7)),
+            # Low-risk patients can have varied foods
+            'Low': static + RISK_WEIGHT * 0.8,
+        }
+
+    def partition(self, diet_type, risk=None):
+        """Rows matching a diet type (and optionally a food risk label), in catalog order"""
+        key = (diet_type, risk)
+        if key not in self._partitions:
+            mask = self._code_mask(self.diet_code, self.diet_labels, diet_type)
+            if risk is not None:
+                mask &= self._code_mask(self.risk_code, self.risk_labels, risk)
+            rows = np.flatnonzero(mask)
+            self._partitions[key] = FoodPartition(
+                rows,
+                {level: scores[rows] for level, scores in self._partial_scores.items()},
+                self._calorie_adjustment[rows],
+                {meal: meal_mask[rows] for meal, meal_mask in self._meal_masks.items()},
+            )
+        return self._partitions[key]
+
+    @staticmethod
+    def _code_mask(codes, labels, value):
+        if value not in labels:
+            return np.zeros(len(codes), dtype=bool)
+        return codes == labels.index(value)
+
+    def build_partitions(self):
+        """Precompute every (diet_type, risk) and diet-only partition"""
+        for diet_type in self.diet_labels:
+            self.partition(diet_type)
+            for risk in self.risk_labels:
+                self.partition(diet_type, risk)
+
+    def score(self, partition, patient_data, risk_level):
+        """Score every row of a partition for one patient"""
+        if risk_level not in partition.partial_scores:
+            risk_level = 'Low'
+        scores = partition.partial_scores[risk_level]
+
+        # BMI-based adjustments
+        if 'bmi' in patient_data:
+            band = FOOD_BMI_BAND(patient_data['bmi'])
+            if band == 'obese':  # prefer lower calorie foods
+                scores = scores - partition.calorie_adjustment
+            elif band == 'underweight':  # prefer higher calorie foods
+                scores = scores + partition.calorie_adjustment
+
+        return np.maximum(scores, 0)  # Ensure non-negative scores
+
+    @staticmethod
+    def rank_descending(scores):
+        """Positions of scores from best to worst.
+
+        Reproduces the tie order of DataFrame.sort_values(ascending=False)
+        so plans stay identical to the original pandas implementation.
+        """
+        reverse_order = scores[::-1].argsort(kind='quicksort')
+        return (len(scores) - 1 - reverse_order)[::-1]
+
+    @classmethod
+    def top_k(cls, scores, count):
+        """Positions of the `count` best scores, matching DataFrame.nlargest"""
+        if count >= len(scores):
+            # nlargest falls back to a full sort_values in this case
+            return cls.rank_descending(scores)
+
+        # Keep everything tied with the k-th best so ties resolve by catalog order
+        kth = np.partition(scores, len(scores) - count)[len(scores) - count]
+        candidates = np.flatnonzero(scores >= kth)
+        order = np.argsort(-scores[candidates], kind='stable')
+        return candidates[order][:count]
@@ -1,20 +1,66 @@
-import pandas as pd
+import logging
+
 import numpy as np
-from pathlib import Path
+
+from .cache import LRUCache
+from .food_catalog import INDIAN_FOOD, default_catalog, load_catalog
+from .food_engine import FoodScoringEngine
+from .food_search import FoodSearchIndex
+from .meal_planner import MEAL_SLOTS, MultiDayPlan, plan_meals
+from .rules import FIBER_TARGET, FOOD_BMI_BAND, PROTEIN_SHARE, daily_calories
+from .serialization import RawJSON, dumps
+
+logger = logging.getLogger(__name__)
 
 class FoodRecommender:
-    def __init__(self):
-        self.food_data = None
+    def __init__(self, plan_cache_size=256):
+        self.catalog = None
+        self.catalog_version = None
+        self.foods = None
+        self.engine = None
+        self.search_index = None
+        self._title_codes = {}
+        self.plan_cache = LRUCache(maxsize=plan_cache_size)
+        self.multi_day_cache = LRUCache(maxsize=plan_cache_size)
         self.load_food_data()
     
     def load_food_data(self):
-        """Load the Indian food dataset"""
-        try:
-            data_path = Path(__file__).parent.parent.parent / 'ml' / 'data' / 'indian_food_weighted_220.csv'
-            self.food_data = pd.read_csv(data_path)
-        except Exception as e:
-            print(f"Error loading food data: {e}")
-            self.food_data = pd.DataFrame()
+        """Load the shipped food catalog from its snapshot.
+
+        A stale or invalid snapshot raises CatalogError rather than leaving
+        the recommender without foods.
+        """
+        self.set_catalog(default_catalog())
+    
+    def set_food_data(self, food_data):
+        """Serve recommendations from a DataFrame in the CSV layout"""
+        self.set_catalog(load_catalog(food_data=food_data))
+    
+    @property
+    def food_data(self):
+        """The recommended foods as a DataFrame in the CSV layout"""
+        return self.foods.to_frame()
+    
+    def set_catalog(self, catalog):
+        """Serve recommendations from the Indian food rows of `catalog`"""
+        self.catalog = catalog
+        self.catalog_version = catalog.digest()
+        self.foods = catalog.select(INDIAN_FOOD)
+        
+        # Precompute the array-backed scoring tables and search index once per load
+        self.engine = None
+        self.search_index = None
+        self._title_codes = {}
+        if len(self.foods):
+            self.engine = FoodScoringEngine(self.foods)
+            self.engine.build_partitions()
+            self.search_index = FoodSearchIndex(self.foods, self.engine.dish_labels)
+            for code, title in enumerate(self.foods.labels['title']):
+                self._title_codes.setdefault(title.lower(), code)
+        
+        # Cached plans were built from the previous catalog
+        self.plan_cache.clear()
+        self.multi_day_cache.clear()
     
     def get_recommendations(self, patient_data, risk_level, diet_preference="Vegetarian", count=10):
         """
@@ -26,122 +72,204 @@ class FoodRecommender:
             diet_preference: str - "Vegetarian" or "Non-Vegetarian"
             count: int - number of recommendations
         """
-        if self.food_data.empty:
+        if self.engine is None:
             return []
         
-        # Filter by diet preference
-        filtered_foods = self.food_data[
-            self.food_data['diet_type'] == diet_preference
-        ].copy()
+        # Score the diet partition and take the top `count` foods
+        partition = self.engine.partition(diet_preference)
+        scores = self.engine.score(partition, patient_data, risk_level)
+        best = self.engine.top_k(scores, count)
         
-        # Calculate recommendation score based on patient condition
-        filtered_foods['score'] = self._calculate_score(filtered_foods, patient_data, risk_level)
+        return self._format_rows(partition.rows[best], scores[best])
+    
+    def search_foods(self, query='', region=None, diet_type=None, ranges=None, offset=0, limit=20):
+        """Search the catalog by name and examples with optional filters, one page at a time"""
+        if self.engine is None:
+            return {'total': 0, 'offset': offset, 'limit': limit, 'results': []}
         
-        # Sort by score and get top recommendations
-        recommendations = filtered_foods.nlargest(count, 'score')
+        total, rows = self.search_index.search(query, region, diet_type, ranges, offset, limit)
+        results = [
+            {**record, 'diet_type': diet_type}
+            for record, diet_type in zip(self._records(rows), self.foods.strings('diet_type', rows))
+        ]
+        return {'total': total, 'offset': offset, 'limit': limit, 'results': results}
+    
+    def autocomplete(self, query, limit=10):
+        """Dish names completing a partial query"""
+        if self.engine is None:
+            return []
+        return self.search_index.autocomplete(query, limit)
+    
+    def _records(self, rows):
+        """Static API fields of catalog rows, formatted column by column"""
+        foods = self.foods
+        columns = zip(
+            foods.strings('title', rows),
+            foods.strings('icon', rows),
+            foods.column('calories', rows).tolist(),
+            [round(value, 1) for value in foods.column('protein_g', rows).tolist()],
+            [round(value, 1) for value in foods.column('fiber_g', rows).tolist()],
+            foods.column('gi_index', rows).tolist(),
+            [f"{weight}g" for weight in foods.column('weight_g', rows).tolist()],
+            foods.strings('risk', rows),
+            foods.strings('region', rows),
+            foods.strings('benefit', rows),
+        )
+        keys = ('title', 'icon', 'calories', 'protein', 'fiber', 'gi_index',
+                'weight', 'risk_level', 'region', 'benefit')
+        return [dict(zip(keys, values)) for values in columns]
+    
+    def _format_rows(self, rows, scores):
+        """Format catalog rows with their scores for API response"""
+        return [
+            {**record, 'score': round(score, 2)}
+            for record, score in zip(self._records(rows), scores.tolist())
+        ]
+    
+    def get_daily_meal_plan(self, patient_data, risk_level, diet_preference="Vegetarian"):
+        """Generate a complete daily meal plan with specific foods
         
-        return self._format_recommendations(recommendations)
+        Plans only depend on the diet preference, the risk level, the BMI
+        band used for scoring and the daily calorie target, so they are
+        served from an LRU cache. The returned dict is shared between
+        callers and must not be modified.
+        """
+        if self.engine is None:
+            return {}
+        return self.get_daily_meal_plan_encoded(patient_data, risk_level, diet_preference)[0]
     
-    def _calculate_score(self, foods, patient_data, risk_level):
-        """Calculate recommendation score for each food"""
-        scores = np.zeros(len(foods))
+    def get_daily_meal_plan_encoded(self, patient_data, risk_level, diet_preference="Vegetarian"):
+        """Return (plan, plan_json): the cached plan and the same plan as RawJSON"""
+        if self.engine is None:
+            return {}, RawJSON('{}')
         
-        # Base scoring factors
-        gi_weight = 0.4
-        fiber_weight = 0.2
-        protein_weight = 0.2
-        risk_weight = 0.2
+        calorie_target = self._calorie_target(patient_data)
+        key = (diet_preference, risk_level, self._bmi_band(patient_data), calorie_target)
+        entry = self.plan_cache.get(key)
+        if entry is None:
+            entry = self._build_daily_meal_plan(patient_data, risk_level, diet_preference, calorie_target)
+            self.plan_cache.put(key, entry)
+        return entry
+    
+    @staticmethod
+    def _bmi_band(patient_data):
+        """BMI band that the food scoring branches on"""
+        bmi = patient_data.get('bmi')
+        if bmi is None:
+            return 'normal'
+        return FOOD_BMI_BAND(bmi)
+    
+    @staticmethod
+    def _calorie_target(patient_data):
+        """Daily calories from calculate_nutrition_needs, None without bmi and age"""
+        if 'bmi' not in patient_data or 'age' not in patient_data:
+            return None
+        return daily_calories(patient_data['bmi'], patient_data['age'])
+    
+    def _build_daily_meal_plan(self, patient_data, risk_level, diet_preference, calorie_target=None):
+        """Score and select the foods for one daily meal plan"""
+        # Filter foods by diet preference and risk level
+        partition = self.engine.partition(diet_preference, self._get_suitable_food_risk(risk_level))
         
-        # GI Index scoring (lower is better for diabetics)
-        gi_scores = 100 - foods['gi_index']  # Invert GI (lower GI = higher score)
-        scores += gi_weight * (gi_scores / 100)
+        if len(partition) == 0:
+            partition = self.engine.partition(diet_preference)
         
-        # Fiber scoring (higher is better)
-        fiber_scores = foods['fiber_g'] * 20  # Scale fiber content
-        scores += fiber_weight * np.minimum(fiber_scores / 100, 1)
+        # Select the foods for all meals together, without repeating a dish
+        scores = self.engine.score(partition, patient_data, risk_level)
+        cache_key = (risk_level, self._bmi_band(patient_data))
+        selections = plan_meals(self.engine, partition, scores, calorie_target, cache_key)
         
-        # Protein scoring (moderate protein is good)
-        protein_scores = np.minimum(foods['protein_g'] * 10, 100)
-        scores += protein_weight * (protein_scores / 100)
+        plan = {}
+        rendered = {}
+        for meal_type, selected in selections.items():
+            plan[meal_type] = self._format_rows(partition.rows[selected], scores[selected])
+            rendered[meal_type] = RawJSON(dumps(plan[meal_type]))
         
-        # Risk-based scoring
-        risk_mapping = {'Low': 1.0, 'Moderate': 0.7, 'High': 0.4}
-        food_risk_scores = foods['risk'].map(risk_mapping).fillna(0.5)
+        all_foods = plan['breakfast'] + plan['lunch'] + plan['dinner'] + plan['snacks']
+        plan['daily_nutrition'] = rendered['daily_nutrition'] = self._calculate_daily_nutrition(all_foods)
         
-        if risk_level == "High":
-            # High-risk patients need low-risk foods
-            scores += risk_weight * food_risk_scores
-        elif risk_level == "Moderate":
-            # Moderate-risk patients can have moderate-risk foods
-            scores += risk_weight * (1 - abs(food_risk_scores - 0.7))
-        else:
-            # Low-risk patients can have varied foods
-            scores += risk_weight * 0.8
-        
-        # BMI-based adjustments
-        if 'bmi' in patient_data:
-            bmi = patient_data['bmi']
-            if bmi > 30:  # Obese - prefer lower calorie foods
-                calorie_penalty = foods['calories'] / 1000
-                scores -= 0.1 * calorie_penalty
-            elif bmi < 18.5:  # Underweight - prefer higher calorie foods
-                calorie_bonus = foods['calories'] / 1000
-                scores += 0.1 * calorie_bonus
-        
-        return np.maximum(scores, 0)  # Ensure non-negative scores
-    
-    def _format_recommendations(self, recommendations):
-        """Format recommendations for API response"""
-        formatted = []
-        
-        for _, food in recommendations.iterrows():
-            formatted.append({
-                'title': food['title'],
-                'icon': food['icon'],
-                'calories': int(food['calories']),
-                'protein': round(food['protein_g'], 1),
-                'fiber': round(food['fiber_g'], 1),
-                'gi_index': int(food['gi_index']),
-                'weight': f"{int(food['weight_g'])}g",
-                'risk_level': food['risk'],
-                'region': food['region'],
-                'benefit': food['benefit'],
-                'score': round(food['score'], 2)
-            })
-        
-        return formatted
+        return plan, RawJSON(dumps(rendered))
     
-    def get_daily_meal_plan(self, patient_data, risk_level, diet_preference="Vegetarian"):
-        """Generate a complete daily meal plan with specific foods"""
-        if self.food_data.empty:
-            return {}
-        
-        # Filter foods by diet preference and risk level
-        suitable_foods = self.food_data[
-            (self.food_data['diet_type'] == diet_preference) &
-            (self.food_data['risk'] == self._get_suitable_food_risk(risk_level))
-        ].copy()
+    def get_multi_day_plan(self, patient_data, risk_level, diet_preference="Vegetarian", days=7, swaps=()):
+        """Meal plans for `days` consecutive days without repeating dishes on nearby days
+
+        The plan and its formatted response are cached like the daily
+        plan, plus the number of days; without swaps the cached response
+        is returned and must not be modified. `swaps` are applied in order
+        on a copy; each is a dict with 'day' (1-based), 'meal', 'index' and
+        an optional replacement 'title'. Returns (response dict, recomputed
+        days as 1-based numbers).
+        """
+        if self.engine is None:
+            return {'days': [], 'summary': {}}, []
         
-        if suitable_foods.empty:
-            suitable_foods = self.food_data[self.food_data['diet_type'] == diet_preference].copy()
+        calorie_target = self._calorie_target(patient_data)
+        key = (diet_preference, risk_level, self._bmi_band(patient_data), calorie_target, days)
+        entry = self.multi_day_cache.get(key)
+        if entry is None:
+            partition = self.engine.partition(diet_preference, self._get_suitable_food_risk(risk_level))
+            if len(partition) == 0:
+                partition = self.engine.partition(diet_preference)
+            scores = self.engine.score(partition, patient_data, risk_level)
+            targets = {'fiber': FIBER_TARGET}
+            if calorie_target:
+                targets['calories'] = calorie_target
+                targets['protein'] = int(calorie_target * PROTEIN_SHARE / 4)
+            plan = MultiDayPlan(
+                self.engine, partition, scores, days, targets,
+                cache_key=(risk_level, self._bmi_band(patient_data)),
+            )
+            entry = plan, self._format_multi_day_plan(plan)
+            self.multi_day_cache.put(key, entry)
         
-        # Calculate scores
-        suitable_foods['score'] = self._calculate_score(suitable_foods, patient_data, risk_level)
-        suitable_foods = suitable_foods.sort_values('score', ascending=False)
+        plan, response = entry
+        if not swaps:
+            return response, []
+        recomputed = set()
+        for swap in swaps:
+            day = swap['day'] - 1
+            if not 0 <= day < days:
+                raise ValueError(f"Day {swap['day']} is outside the plan")
+            if swap['meal'] not in plan.days[day]:
+                raise ValueError(f"Unknown meal {swap['meal']!r}")
+            replacement = None
+            if swap.get('title'):
+                replacement = self._partition_position(plan.partition, swap['title'])
+            plan, changed = plan.swap(day, swap['meal'], swap['index'], replacement)
+            recomputed.update(changed)
         
-        # Select best foods for each meal
-        breakfast_foods = self._select_meal_foods(suitable_foods, 'breakfast', 2)
-        lunch_foods = self._select_meal_foods(suitable_foods, 'lunch', 2) 
-        dinner_foods = self._select_meal_foods(suitable_foods, 'dinner', 2)
-        snacks = self._select_meal_foods(suitable_foods, 'snacks', 1)
+        return self._format_multi_day_plan(plan), sorted(day + 1 for day in recomputed)
+    
+    def _partition_position(self, partition, title):
+        """Position of a food title within a partition"""
+        code = self._title_codes.get(title.lower())
+        positions = [] if code is None else np.flatnonzero(self.foods.codes['title'][partition.rows] == code)
+        if len(positions) == 0:
+            raise ValueError(f"{title!r} is not available for this plan")
+        return int(positions[0])
+    
+    def _format_multi_day_plan(self, plan):
+        """Format a MultiDayPlan for API response"""
+        rows, scores = plan.partition.rows, plan.scores
+        days = []
+        for number, meals in enumerate(plan.days, start=1):
+            day = {'day': number}
+            for meal, _, _ in MEAL_SLOTS:
+                day[meal] = self._format_rows(rows[meals[meal]], scores[meals[meal]])
+            day['daily_nutrition'] = self._calculate_daily_nutrition(
+                day['breakfast'] + day['lunch'] + day['dinner'] + day['snacks']
+            )
+            days.append(day)
         
-        return {
-            'breakfast': breakfast_foods,
-            'lunch': lunch_foods,
-            'dinner': dinner_foods,
-            'snacks': snacks,
-            'daily_nutrition': self._calculate_daily_nutrition(breakfast_foods + lunch_foods + dinner_foods + snacks)
-        }
+        summary = {'days': len(days)}
+        for nutrient in ('calories', 'protein', 'fiber'):
+            total = sum(day['daily_nutrition'][nutrient] for day in days)
+            summary[nutrient] = {
+                'total': round(total, 1),
+                'daily_average': round(total / len(days), 1) if days else 0,
+                'daily_target': plan.targets.get(nutrient),
+            }
+        return {'days': days, 'summary': summary}
     
     def _get_suitable_food_risk(self, patient_risk):
         """Map patient risk to suitable food risk"""
@@ -152,22 +280,6 @@ class FoodRecommender:
         else:
             return "Low"
     
-    def _select_meal_foods(self, foods, meal_type, count):
-        """Select appropriate foods for specific meal type"""
-        # Meal-specific filtering logic
-        if meal_type == 'breakfast':
-            meal_foods = foods[foods['gi_index'] < 60].head(count * 3)  # Lower GI for breakfast
-        elif meal_type == 'lunch':
-            meal_foods = foods[(foods['calories'] >= 200) & (foods['calories'] <= 400)].head(count * 3)
-        elif meal_type == 'dinner':
-            meal_foods = foods[(foods['calories'] >= 150) & (foods['calories'] <= 350)].head(count * 3)
-        else:  # snacks
-            meal_foods = foods[foods['calories'] < 200].head(count * 3)
-        
-        # Select top foods and format
-        selected = meal_foods.head(count)
-        return self._format_recommendations(selected)
-    
     def _calculate_daily_nutrition(self, all_foods):
         """Calculate total daily nutrition"""
         total_calories = sum(food['calories'] for food in all_foods)
@@ -0,0 +1,253 @@
+"""
+Food catalog search: an inverted index built once per catalog load.
+
+Text queries match the words of a food's title and examples. Every query
+word is a prefix, so "moong da" finds "Moong Dal Khichdi". The index keeps
+one sorted posting array per word in CSR layout (`postings` sliced by
+`offsets`), with words in sorted order so that all words sharing a prefix
+form one contiguous slice. Region and diet type filters use per-label
+posting arrays, and the numeric range filters (gi_index, calories,
+fiber_g) use the column sorted once with its row order.
+
+A query starts from the most selective of those posting arrays and checks
+the other conditions on its rows only, so its cost follows the number of
+candidate rows rather than the catalog size. Results are in catalog order.
+"""
+import re
+from bisect import bisect_left
+from itertools import chain
+
+import numpy as np
+
+from .food_catalog import PORTION_SUFFIX, factorize
+
+TOKEN = re.compile(r'[a-z0-9]+')
+RANGE_COLUMNS = ('gi_index', 'calories', 'fiber_g')
+# Sorts after every character a token can contain
+PREFIX_END = '\U0010ffff'
+# Texts tokenized per C-level split, and the piece separating them
+SPLIT_CHUNK = 65536
+SEPARATOR = '\x00'
+
+
+def tokenize(text):
+    """Lowercase words of a text or query"""
+    return TOKEN.findall(text.lower())
+
+
+def _intersect(rows, other):
+    """Rows (sorted, unique) that are also in the sorted array `other`"""
+    if len(rows) == 0 or len(other) == 0:
+        return rows[:0]
+    found = np.searchsorted(other, rows)
+    return rows[other[np.minimum(found, len(other) - 1)] == rows]
+
+
+def _expand(codes, lengths):
+    """Flatten groups of `lengths` items indexed by `codes`.
+
+    Returns (index into `codes`, index into the concatenated groups) for
+    every item, without a Python loop over `codes`. Code -1 picks the last
+    group, which callers keep empty.
+    """
+    starts = np.r_[0, np.cumsum(lengths)[:-1]]
+    counts = lengths[codes]
+    owners = np.repeat(np.arange(len(codes)), counts)
+    return owners, np.arange(int(counts.sum())) + (starts[codes] - np.r_[0, np.cumsum(counts)[:-1]])[owners]
+
+
+def _split(texts, pieces):
+    """Whitespace separated pieces of lowercased texts as (text index, piece id).
+
+    Texts are joined, lowercased and split a chunk at a time in C, with a
+    separator piece between them; new pieces are added to `pieces`.
+    """
+    owners, ids = [], []
+    for start in range(0, len(texts), SPLIT_CHUNK):
+        codes, distinct = factorize(f' {SEPARATOR} '.join(texts[start:start + SPLIT_CHUNK]).lower().split())
+        chunk = np.array([pieces.setdefault(piece, len(pieces)) for piece in distinct], dtype=np.int64)[codes]
+        separator = chunk == 0
+        owners.append(start + np.cumsum(separator)[~separator])
+        ids.append(chunk[~separator])
+    if not owners:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(owners), np.concatenate(ids)
+
+
+class TokenIndex:
+    """Inverted index from words to the sorted ids of the documents holding them.
+
+    Each column is a (codes, labels) pair: document i holds the words of
+    labels[codes[i]], or none for code -1. Every distinct label is
+    tokenized once.
+    """
+
+    def __init__(self, *columns):
+        size = len(columns[0][0])
+        pieces = {SEPARATOR: 0}
+        docs, piece_ids = [], []
+        for codes, labels in columns:
+            label_of, label_pieces = _split(labels, pieces)
+            # One trailing empty group for code -1
+            doc_of, piece_at = _expand(np.asarray(codes), np.bincount(label_of, minlength=len(labels) + 1))
+            docs.append(doc_of)
+            piece_ids.append(label_pieces[piece_at])
+
+        # Words of every distinct piece ("(212g)" -> "212g"), then of every document
+        tokens = [TOKEN.findall(piece) for piece in pieces]
+        piece_of, positions = _expand(np.concatenate(piece_ids), np.array(list(map(len, tokens)) + [0]))
+        docs = np.concatenate(docs)[piece_of]
+        token_codes, vocab = factorize(list(chain.from_iterable(tokens)))
+
+        # Token ids in sorted word order, so that a prefix is a contiguous id range
+        order = sorted(range(len(vocab)), key=vocab.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        self.vocab = [vocab[code] for code in order]
+
+        # Postings grouped by token with documents ascending. Both sorts are
+        # stable: the first merges the per-column runs of documents, the
+        # second is a radix sort while token ids fit in 16 bits.
+        by_doc = np.argsort(docs, kind='stable')
+        token_type = np.int16 if len(order) <= np.iinfo(np.int16).max else np.int32
+        tokens = rank.astype(token_type)[token_codes][positions][by_doc]
+        by_token = np.argsort(tokens, kind='stable')
+        tokens, docs = tokens[by_token], docs[by_doc][by_token]
+        unique = np.r_[True, (tokens[1:] != tokens[:-1]) | (docs[1:] != docs[:-1])]
+        self.postings = docs[unique].astype(np.int32)
+        self.offsets = np.searchsorted(tokens[unique], np.arange(len(self.vocab) + 1))
+
+    def prefix(self, prefix):
+        """Sorted ids of the documents with a word starting with `prefix`"""
+        lo = bisect_left(self.vocab, prefix)
+        hi = bisect_left(self.vocab, prefix + PREFIX_END, lo)
+        docs = self.postings[self.offsets[lo]:self.offsets[hi]]
+        return np.unique(docs) if hi - lo > 1 else docs
+
+    def match(self, words):
+        """Sorted ids of the documents matching every word as a prefix"""
+        lists = sorted((self.prefix(word) for word in words), key=len)
+        docs = lists[0]
+        for other in lists[1:]:
+            docs = _intersect(docs, other)
+        return docs
+
+
+class FoodSearchIndex:
+    """Filtered, paged search and autocomplete over one FoodCatalog.
+
+    `dish_names` are the distinct titles without portion sizes, when the
+    caller has them already (FoodScoringEngine.dish_labels).
+    """
+
+    def __init__(self, catalog, dish_names=None):
+        self.size = len(catalog)
+        self.text = TokenIndex(
+            (catalog.codes['title'], catalog.labels['title']),
+            (catalog.codes['examples'], catalog.labels['examples']),
+        )
+
+        # Per-label codes and sorted rows for the equality filters
+        self.category_labels = {}
+        self.category_codes = {}
+        self.categories = {}
+        for field in ('region', 'diet_type'):
+            # Labels that only differ in case share one filter value
+            labels, lowered = np.unique([label.lower() for label in catalog.labels[field]], return_inverse=True)
+            codes = np.r_[lowered, -1].astype(np.int16)[catalog.codes[field]]
+            order = np.argsort(codes, kind='stable').astype(np.int32)
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            self.category_labels[field] = {label: code for code, label in enumerate(labels.tolist())}
+            self.category_codes[field] = codes
+            self.categories[field] = [order[bounds[code]:bounds[code + 1]] for code in range(len(labels))]
+
+        # Each range column, sorted, with the row order that sorts it
+        self.columns = {}
+        self.sorted_columns = {}
+        for column in RANGE_COLUMNS:
+            values = catalog.column(column).astype(float)
+            order = np.argsort(values, kind='stable').astype(np.int32)
+            self.columns[column] = values
+            self.sorted_columns[column] = (values[order], order)
+
+        # Dish names (titles without the portion size) for autocomplete, A-Z
+        if dish_names is None:
+            _, dish_names = catalog.derived_codes('title', lambda title: PORTION_SUFFIX.sub('', title))
+        self.dish_names = sorted(dish_names, key=str.lower)
+        self._dish_keys = [name.lower() for name in self.dish_names]
+        self.dishes = TokenIndex((np.arange(len(self.dish_names)), self.dish_names))
+
+    def search(self, query='', region=None, diet_type=None, ranges=None, offset=0, limit=20):
+        """Return (total matches, rows of the requested page).
+
+        `ranges` maps a column in RANGE_COLUMNS to an inclusive (low, high)
+        pair, either end may be None. Region and diet type are matched
+        case-insensitively.
+        """
+        ranges = {column: bounds for column, bounds in (ranges or {}).items() if bounds != (None, None)}
+        for column in ranges:
+            if column not in self.columns:
+                raise ValueError(f"Cannot filter on {column!r}")
+
+        # Every condition as (candidate count, its sorted rows, a filter over
+        # rows); the most selective one supplies the rows, the others filter
+        conditions = []
+        words = tokenize(query or '')
+        if words:
+            matched = self.text.match(words)
+            conditions.append((len(matched), lambda: matched, lambda rows: _intersect(rows, matched)))
+        for field, value in (('region', region), ('diet_type', diet_type)):
+            if value:
+                code = self.category_labels[field].get(value.lower(), -1)
+                conditions.append(self._category_condition(field, code))
+        for column, (low, high) in ranges.items():
+            conditions.append(self._range_condition(column, low, high))
+        if not conditions:
+            return self.size, np.arange(min(offset, self.size), min(offset + limit, self.size))
+
+        conditions.sort(key=lambda condition: condition[0])
+        rows = conditions[0][1]()
+        for _, _, keep in conditions[1:]:
+            rows = keep(rows)
+        return len(rows), rows[offset:offset + limit]
+
+    def _category_condition(self, field, code):
+        if code < 0:
+            return 0, lambda: np.empty(0, dtype=np.int32), lambda rows: rows[:0]
+        rows = self.categories[field][code]
+        codes = self.category_codes[field]
+        return len(rows), lambda: rows, lambda rows: rows[codes[rows] == code]
+
+    def _range_condition(self, column, low, high):
+        sorted_values, order = self.sorted_columns[column]
+        lo = 0 if low is None else np.searchsorted(sorted_values, low, side='left')
+        hi = len(sorted_values) if high is None else np.searchsorted(sorted_values, high, side='right')
+        values = self.columns[column]
+
+        def keep(rows):
+            selected = values[rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if low is not None:
+                mask &= selected >= low
+            if high is not None:
+                mask &= selected <= high
+            return rows[mask]
+        return hi - lo, lambda: np.sort(order[lo:hi]), keep
+
+    def autocomplete(self, query, limit=10):
+        """Dish names for a partial query: names starting with it first, then
+        names containing every query word as a prefix, each A-Z"""
+        key = query.strip().lower()
+        if not key:
+            return []
+        lo = bisect_left(self._dish_keys, key)
+        hi = bisect_left(self._dish_keys, key + PREFIX_END, lo)
+        names = self.dish_names[lo:min(hi, lo + limit)]
+        words = tokenize(key)
+        if len(names) < limit and words:
+            for dish in self.dishes.match(words).tolist():
+                if not lo <= dish < hi:
+                    names.append(self.dish_names[dish])
+                    if len(names) == limit:
+                        break
+        return names
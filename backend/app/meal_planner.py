@@ -0,0 +1,294 @@
+"""
+Joint food selection for the daily meal plan.
+
+The meal slots overlap (a 300 kcal dish fits lunch, dinner and breakfast),
+so picking the best foods per slot independently puts the same dish on
+the plate three times a day. The planner instead:
+
+1. takes the top candidates of every slot, at most two portion sizes per
+   dish, and caches them per partition, risk level and BMI band,
+2. re-scores them by distance to the slot's share of the calorie target,
+3. assigns them to slots greedily from one heap, best candidate first,
+   never using a dish twice, never repeating an icon within a meal and
+   capping how many foods of one region the day can have.
+
+If the diversity rules leave a slot short, the skipped candidates fill it
+in the same order, still without repeating a dish.
+"""
+import copy
+import heapq
+
+import numpy as np
+
+# (meal, number of foods, share of the daily calorie target)
+MEAL_SLOTS = [
+    ('breakfast', 2, 0.25),
+    ('lunch', 2, 0.35),
+    ('dinner', 2, 0.30),
+    ('snacks', 1, 0.10),
+]
+TOTAL_FOODS = sum(count for _, count, _ in MEAL_SLOTS)
+MAX_PER_REGION = 2
+# Candidates kept per food in a slot, and portion sizes kept per dish
+CANDIDATES_PER_FOOD = 16
+VARIANTS_PER_DISH = 2
+# Score penalty for a food whose calories are 100% off its share of the target
+CALORIE_WEIGHT = 0.2
+
+# Multi-day plans: days a dish is held back after being served, how far a
+# day's calorie target may move to balance the other days, and the score
+# bonus for nutrient rich foods while the plan is behind on a nutrient
+NO_REPEAT_DAYS = 2
+CALORIE_CATCH_UP = 0.2
+NUTRIENT_WEIGHT = 0.05
+
+
+def top_k_positions(scores, positions, k):
+    """The k best scoring `positions`, best first, ties in position order"""
+    if len(positions) > k:
+        positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+    return positions[np.lexsort((positions, -scores[positions]))]
+
+
+def dish_candidates(engine, partition, scores, positions, k):
+    """The k best `positions`, keeping at most VARIANTS_PER_DISH portions of a dish.
+
+    Works on a growing top slice of the slot, so large catalogs are not
+    sorted in full: the reduction is exact as soon as the slice yields k
+    survivors, because better portions of a dish rank above worse ones.
+    """
+    size = k * 4
+    while True:
+        top = top_k_positions(scores, positions, size)
+        dishes = engine.dish_code[partition.rows[top]]
+        # Rank of each food among the portions of its dish, best first
+        order = np.lexsort((np.arange(len(top)), dishes))
+        sorted_dishes = dishes[order]
+        first = np.flatnonzero(np.r_[True, sorted_dishes[1:] != sorted_dishes[:-1]])
+        rank = np.empty(len(top), dtype=np.intp)
+        rank[order] = np.arange(len(top)) - np.repeat(first, np.diff(np.r_[first, len(top)]))
+        kept = top[rank < VARIANTS_PER_DISH]
+        if len(kept) >= k or size >= len(positions):
+            return kept[:k]
+        size *= 4
+
+
+def meal_candidates(engine, partition, scores, cache_key=None):
+    """Top candidate positions for every meal slot, best first.
+
+    Scores only depend on the patient's risk level and BMI band, so the
+    candidates are cached on the partition under `cache_key` and later
+    plans skip the scan over the catalog.
+    """
+    if cache_key is not None and cache_key in partition.candidates:
+        return partition.candidates[cache_key]
+    candidates = {
+        meal: dish_candidates(engine, partition, scores, partition.meal_positions[meal], count * CANDIDATES_PER_FOOD + TOTAL_FOODS)
+        for meal, count, _ in MEAL_SLOTS
+    }
+    if cache_key is not None:
+        partition.candidates[cache_key] = candidates
+    return candidates
+
+
+def plan_meals(engine, partition, scores, calorie_target=None, cache_key=None, recent_dishes=None, nutrient_bonus=None):
+    """Assign partition positions to every meal slot.
+
+    `recent_dishes` maps dishes served on nearby days to their distance in
+    days; they are only used when nothing else fits, least recent first.
+    `nutrient_bonus` maps a catalog column (e.g. 'protein_g') to a weight
+    for foods rich in it. Returns {meal: positions}, each meal ordered by
+    score like the recommendations list.
+    """
+    candidates = meal_candidates(engine, partition, scores, cache_key)
+    recent_dishes = recent_dishes or {}
+    heap = []
+    for slot, (meal, count, share) in enumerate(MEAL_SLOTS):
+        positions = candidates[meal]
+        rows = partition.rows[positions]
+        adjusted = scores[positions]
+        if calorie_target:
+            target = calorie_target * share / count
+            adjusted = adjusted - CALORIE_WEIGHT * np.abs(engine.calories[rows] - target) / target
+        for column, weight in (nutrient_bonus or {}).items():
+            values = getattr(engine, column)[rows]
+            if len(values) and values.max() > 0:
+                adjusted = adjusted + weight * values / values.max()
+        heap.extend(zip(
+            (-adjusted).tolist(), [slot] * len(positions), positions.tolist(),
+            engine.dish_code[rows].tolist(), engine.icon_code[rows].tolist(), engine.region_code[rows].tolist(),
+        ))
+    heapq.heapify(heap)
+
+    chosen = [[] for _ in MEAL_SLOTS]
+    slot_icons = [set() for _ in MEAL_SLOTS]
+    used_dishes = set()
+    region_counts = {}
+    deferred = []
+    deferred_recent = []
+
+    def take(slot, position, dish, icon, region):
+        chosen[slot].append(position)
+        slot_icons[slot].add(icon)
+        used_dishes.add(dish)
+        region_counts[region] = region_counts.get(region, 0) + 1
+
+    def fill(pending):
+        for _, slot, position, dish, icon, region in pending:
+            if len(chosen[slot]) < MEAL_SLOTS[slot][1] and dish not in used_dishes:
+                take(slot, position, dish, icon, region)
+
+    remaining = TOTAL_FOODS
+    while heap and remaining:
+        candidate = heapq.heappop(heap)
+        _, slot, position, dish, icon, region = candidate
+        if len(chosen[slot]) == MEAL_SLOTS[slot][1] or dish in used_dishes:
+            continue
+        if dish in recent_dishes:
+            deferred_recent.append(candidate)
+            continue
+        if icon in slot_icons[slot] or region_counts.get(region, 0) >= MAX_PER_REGION:
+            deferred.append(candidate)
+            continue
+        take(slot, position, dish, icon, region)
+        remaining -= 1
+
+    # Relax the diversity rules for slots that are still short, then the
+    # no-repeat window, bringing back the dishes served longest ago first
+    fill(deferred)
+    deferred_recent.sort(key=lambda candidate: -recent_dishes[candidate[3]])
+    fill(deferred_recent)
+
+    plan = {}
+    for slot, (meal, _, _) in enumerate(MEAL_SLOTS):
+        positions = np.array(chosen[slot], dtype=np.intp)
+        plan[meal] = positions[np.lexsort((positions, -scores[positions]))]
+    return plan
+
+
+class MultiDayPlan:
+    """Meal plans for consecutive days that rotate dishes.
+
+    A dish served on one day is held back for the next `no_repeat_days`
+    days when the catalog allows it. Each day aims at the calorie target
+    plus whatever the other days missed it by, and favours protein and
+    fiber rich foods while the plan is behind on them. All days share one
+    score vector and candidate set.
+    """
+
+    def __init__(self, engine, partition, scores, days, targets=None, cache_key=None, no_repeat_days=NO_REPEAT_DAYS):
+        self.engine = engine
+        self.partition = partition
+        self.scores = scores
+        self.targets = targets or {}
+        self.cache_key = cache_key
+        self.no_repeat_days = no_repeat_days
+        self.days = []
+        self._dishes = []
+        self._totals = []
+        for day in range(days):
+            self.days.append(None)
+            self._dishes.append(None)
+            self._totals.append(None)
+            self._set_day(day, self._plan_day(day, range(day)))
+
+    def _set_day(self, day, meals):
+        rows = self.partition.rows[np.concatenate(list(meals.values()))]
+        self.days[day] = meals
+        self._dishes[day] = set(self.engine.dish_code[rows].tolist())
+        self._totals[day] = {
+            'calories': float(self.engine.calories[rows].sum()),
+            'protein': float(self.engine.protein_g[rows].sum()),
+            'fiber': float(self.engine.fiber_g[rows].sum()),
+        }
+
+    def dishes(self, day):
+        """Dish codes served on one day"""
+        return self._dishes[day]
+
+    def totals(self, day):
+        """Calories, protein and fiber served on one day"""
+        return self._totals[day]
+
+    def _plan_day(self, day, other_days):
+        """Plan `day` around the already planned `other_days`"""
+        recent = {}
+        for other in other_days:
+            distance = abs(day - other)
+            if distance <= self.no_repeat_days:
+                for dish in self.dishes(other):
+                    recent[dish] = min(distance, recent.get(dish, distance))
+
+        consumed = {'calories': 0.0, 'protein': 0.0, 'fiber': 0.0}
+        for other in other_days:
+            for nutrient, amount in self.totals(other).items():
+                consumed[nutrient] += amount
+        planned = len(other_days) + 1
+
+        calorie_target = self.targets.get('calories')
+        if calorie_target:
+            # Make up for the other days, within CALORIE_CATCH_UP of the daily target
+            catch_up = calorie_target * planned - consumed['calories']
+            calorie_target = min(max(catch_up, calorie_target * (1 - CALORIE_CATCH_UP)), calorie_target * (1 + CALORIE_CATCH_UP))
+
+        bonus = {}
+        for nutrient, column in (('protein', 'protein_g'), ('fiber', 'fiber_g')):
+            target = self.targets.get(nutrient)
+            if target and planned > 1:
+                behind = 1 - consumed[nutrient] / (target * (planned - 1))
+                if behind > 0:
+                    bonus[column] = NUTRIENT_WEIGHT * behind
+
+        return plan_meals(
+            self.engine, self.partition, self.scores, calorie_target, self.cache_key, recent, bonus
+        )
+
+    def swap(self, day, meal, index, replacement=None):
+        """Replace one food and re-plan only the days that now clash with it.
+
+        `replacement` is a partition position; by default the best
+        candidate for the meal that keeps the day free of repeats is used.
+        Returns (new plan, recomputed days); this plan is left unchanged.
+        """
+        rows = self.partition.rows
+        current = self.days[day][meal]
+        if not 0 <= index < len(current):
+            raise IndexError(f"{meal} on day {day + 1} has no item {index}")
+        day_dishes = self.dishes(day)
+
+        if replacement is None:
+            nearby = set()
+            for other in range(max(0, day - self.no_repeat_days), min(len(self.days), day + self.no_repeat_days + 1)):
+                nearby |= self.dishes(other)
+            options = [
+                p for p in meal_candidates(self.engine, self.partition, self.scores, self.cache_key)[meal].tolist()
+                if self.engine.dish_code[rows[p]] not in day_dishes
+            ]
+            fresh = [p for p in options if self.engine.dish_code[rows[p]] not in nearby]
+            if not (fresh or options):
+                raise ValueError(f"No other food fits {meal}")
+            replacement = (fresh or options)[0]
+        elif not np.isin(replacement, self.partition.meal_positions[meal]):
+            raise ValueError(f"That food does not fit {meal}")
+        else:
+            # The day's other foods, so swapping an item for itself stays allowed
+            others = np.concatenate([
+                np.delete(positions, index) if name == meal else positions
+                for name, positions in self.days[day].items()
+            ])
+            if self.engine.dish_code[rows[replacement]] in set(self.engine.dish_code[rows[others]].tolist()):
+                raise ValueError(f"That food is already served on day {day + 1}")
+
+        plan = copy.copy(self)
+        plan.days, plan._dishes, plan._totals = list(self.days), list(self._dishes), list(self._totals)
+        positions = current.copy()
+        positions[index] = replacement
+        plan._set_day(day, {**self.days[day], meal: positions[np.lexsort((positions, -self.scores[positions]))]})
+
+        new_dish = self.engine.dish_code[rows[replacement]]
+        recomputed = []
+        for other in range(max(0, day - self.no_repeat_days), min(len(self.days), day + self.no_repeat_days + 1)):
+            if other != day and new_dish in plan.dishes(other):
+                plan._set_day(other, plan._plan_day(other, [d for d in range(len(plan.days)) if d != other]))
+                recomputed.append(other)
+        return plan, recomputed
@@ -0,0 +1,208 @@
+"""
+In-process request metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms keep one series per label tuple and are
+rendered by `/api/metrics`. Recording is a dict lookup and a few integer
+updates under a per-metric lock, cheap enough for request handlers to
+time every stage (see StageTimer). Every worker process
+keeps its own values; scrape each worker, or sum them, like any other
+multi-process Prometheus target.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+PREFIX = 'diabetes_api_'
+# Upper bounds in seconds, from 50 us stages to multi-second bulk requests
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = PREFIX + name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return self._header() + [
+            f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in series
+        ]
+
+    def value(self, labels=()):
+        return self._series.get(labels, 0)
+
+
+class Counter(_Metric):
+    """Monotonic count per label tuple"""
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+    kind = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) - amount
+
+    def set(self, labels, value):
+        with self._lock:
+            self._series[labels] = value
+
+
+class Histogram(_Metric):
+    """Observations bucketed by upper bound, with their count and sum.
+
+    Each series is a list of per-bucket counts (the last one for +Inf)
+    followed by the sum; buckets are made cumulative when rendered.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bucket] += 1
+            series[-1] += value
+
+    def timer(self, *labels):
+        """A StageTimer recording into this histogram with `labels` first"""
+        return StageTimer(self, labels)
+
+    def count(self, labels=()):
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        with self._lock:
+            series = sorted((labels, list(values)) for labels, values in self._series.items())
+        lines = self._header()
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(values[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class StageTimer:
+    """Times consecutive stages of one request.
+
+    Each lap(stage) records the time since the previous lap (or since the
+    timer was created) under the timer's labels plus the stage name.
+    """
+    __slots__ = ('histogram', 'labels', 'last')
+
+    def __init__(self, histogram, labels=()):
+        self.histogram = histogram
+        self.labels = labels
+        self.last = perf_counter()
+
+    def lap(self, stage):
+        now = perf_counter()
+        self.histogram.observe(self.labels + (stage,), now - self.last)
+        self.last = now
+
+
+class Registry:
+    """The metrics of one process plus the caches whose stats are exported"""
+
+    def __init__(self):
+        self.metrics = []
+        self.caches = {}
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def add_cache(self, name, cache):
+        """Export the stats() of an LRUCache under the `cache` label"""
+        self.caches[name] = cache
+
+    def _render_caches(self):
+        stats = {name: cache.stats() for name, cache in sorted(self.caches.items())}
+        lines = []
+        for field, kind, help in (
+            ('size', 'gauge', 'Entries held by the cache'),
+            ('hits', 'counter', 'Cache lookups that found an entry'),
+            ('misses', 'counter', 'Cache lookups that found nothing'),
+            ('evictions', 'counter', 'Entries dropped to stay within maxsize'),
+        ):
+            name = f'{PREFIX}cache_{field}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+            lines += [f'{name}{{cache="{_escape(cache)}"}} {values[field]}' for cache, values in stats.items()]
+        name = f'{PREFIX}cache_hit_ratio'
+        lines += [f'# HELP {name} Share of cache lookups that found an entry', f'# TYPE {name} gauge']
+        for cache, values in stats.items():
+            lookups = values['hits'] + values['misses']
+            lines.append(f'{name}{{cache="{_escape(cache)}"}} {_number(values["hits"] / lookups if lookups else 0)}')
+        return lines
+
+    def render(self):
+        """All metrics in the text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        if self.caches:
+            lines += self._render_caches()
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry and the metrics recorded outside of routes.py
+REGISTRY = Registry()
+MODEL_FALLBACKS = REGISTRY.counter(
+    'model_fallback_total', 'Patients scored without the model, by fallback path', ('path',)
+)
@@ -1,71 +1,295 @@
+import hashlib
+import json
+import logging
 import pickle
 import os
-import pandas as pd
+import weakref
+from functools import lru_cache
+from pathlib import Path
+
 import numpy as np
 
-def load_model():
-    """Load the trained ML model"""
+from .metrics import MODEL_FALLBACKS
+from .rules import EMERGENCY_PROBABILITY, FALLBACK_POSITIVE, emergency_high_risk, fallback_score
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """Random forest flattened into packed NumPy arrays.
+    
+    All trees share one node table indexed by global node id: `feature` and
+    `threshold` describe each split, `children` holds interleaved (left,
+    right) child ids and `leaf_proba` each node's normalized class
+    distribution. Leaves point to themselves, so every row can be walked
+    through every tree in lockstep for `max_depth` steps. Probabilities
+    match RandomForestClassifier.predict_proba.
+    
+    The arrays are used as stored, so they can be memory-mapped from disk
+    and shared between worker processes.
+    """
+    
+    ARRAYS = ('feature', 'threshold', 'children', 'leaf_proba', 'roots', 'classes')
+    
+    # Rows walked per step; keeps the (trees x rows) node table cache sized
+    CHUNK_ROWS = 1024
+    
+    def __init__(self, feature, threshold, children, leaf_proba, roots, classes, max_depth, manifest=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = len(FEATURE_NAMES)
+        self.manifest = manifest or {}
+        self._digest = None
+    
+    @property
+    def version(self):
+        return self.manifest.get('version')
+    
+    def digest(self):
+        """Hash of every array; differs between any two differently trained forests"""
+        if self._digest is None:
+            digest = hashlib.blake2b(str(self.max_depth).encode('ascii'), digest_size=16)
+            for name in self.ARRAYS:
+                array = np.ascontiguousarray(self._array(name))
+                digest.update(f'{name}:{array.dtype.str}:{array.shape}'.encode('ascii'))
+                digest.update(array.tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+    
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted RandomForestClassifier"""
+        features, thresholds, children, probas, roots = [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            children.append(np.stack([left, right], axis=1).ravel())
+            
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            counts = tree.value[:, 0, :model.n_classes_]
+            normalizer = counts.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(counts / normalizer)
+            
+            roots.append(offset)
+            offset += tree.node_count
+        
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.intp),
+            leaf_proba=np.concatenate(probas).astype(np.float64),
+            roots=np.array(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            max_depth=max(e.tree_.max_depth for e in model.estimators_),
+        )
+    
+    def save(self, directory):
+        """Write one .npy file per array into directory"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), self._array(name))
+    
+    @classmethod
+    def load(cls, directory, max_depth, manifest=None, mmap_mode='r'):
+        """Load arrays written by save, memory-mapped read-only by default"""
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode) for name in cls.ARRAYS}
+        return cls(**arrays, max_depth=max_depth, manifest=manifest)
+    
+    def _array(self, name):
+        return self.classes_ if name == 'classes' else getattr(self, name)
+    
+    def predict_proba(self, X):
+        """Class probabilities for an (n_rows, n_features) matrix"""
+        # sklearn evaluates trees on float32 inputs compared against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        proba = np.empty((len(X), self.leaf_proba.shape[1]))
+        for start in range(0, len(X), self.CHUNK_ROWS):
+            chunk = X[start:start + self.CHUNK_ROWS]
+            proba[start:start + len(chunk)] = self._predict_chunk(chunk)
+        return proba
+    
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = np.arange(n_rows) * n_features
+        
+        # One row of node ids per tree, one column per input row
+        nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            values = flat_X[row_offsets + self.feature[nodes]]
+            nodes = self.children[2 * nodes + (values > self.threshold[nodes])]
+        
+        # Accumulate tree by tree, then average, like the forest does
+        return self.leaf_proba[nodes].sum(axis=0) / len(self.roots)
+    
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def compile_model(model):
+    """Compile a fitted random forest for fast inference; other models pass through"""
+    if model is None or isinstance(model, CompiledForest) or not hasattr(model, 'estimators_'):
+        return model
+    try:
+        return CompiledForest.from_sklearn(model)
+    except Exception as e:
+        logger.warning("Model compilation failed: %s. Serving the sklearn model.", e)
+        return model
+
+def load_model(version=None):
+    """Load the trained ML model
+    
+    Serves `version` (default: the registry's admin pin, else MODEL_VERSION
+    from the environment, else the latest) from the model registry. Without a registry, falls back to
+    probing for a legacy model.pkl, which is compiled in process and
+    serves the metrics.json written next to it by ml/train_model.py.
+    """
+    from .model_registry import ModelRegistry, RegistryError
+    
     model = None
     try:
+        registry = ModelRegistry()
+        version = version or registry.pinned() or os.environ.get('MODEL_VERSION', 'latest')
+        if registry.versions():
+            model = registry.load(version)
+            logger.info("Model %s loaded from: %s", model.version, registry.path)
+            return model
+        
         model_paths = ['model/model.pkl', '../model.pkl', 'model.pkl']
         for path in model_paths:
             if os.path.exists(path):
                 with open(path, 'rb') as f:
-                    model = pickle.load(f)
-                print(f"Model loaded from: {path}")
+                    model = compile_model(pickle.load(f))
+                metrics_path = os.path.join(os.path.dirname(path), 'metrics.json')
+                if isinstance(model, CompiledForest) and os.path.exists(metrics_path):
+                    with open(metrics_path, encoding='utf-8') as f:
+                        model.manifest = json.load(f)
+                logger.info("Model loaded from: %s", path)
                 break
         
         if not model:
-            print("No model file found. Using fallback prediction logic.")
-            
+            logger.warning("No model file found. Using fallback prediction logic.")
+    
+    except RegistryError:
+        # A pinned version that does not exist must not silently serve another model
+        raise
     except Exception as e:
-        print(f"Model loading failed: {e}. Using fallback prediction logic.")
+        logger.exception("Model loading failed: %s. Using fallback prediction logic.", e)
         model = None
     
     return model
 
+@lru_cache(maxsize=1)
+def _rules_digest():
+    from . import rules
+    return hashlib.blake2b(Path(rules.__file__).read_bytes(), digest_size=16).hexdigest()
+
+# Digests of models that are not CompiledForests, computed once per loaded model
+_pickled_digests = weakref.WeakKeyDictionary()
+
+def model_digest(model):
+    """Content hash of the model being served, for keying cached responses.
+
+    Unlike the version name, it changes whenever the model does: a
+    retrained legacy model.pkl reports 'unversioned' every time. The
+    rule-based fallback hashes the rule table it scores with.
+    """
+    if model is None:
+        return 'rules-' + _rules_digest()
+    if isinstance(model, CompiledForest):
+        return model.digest()
+    digest = _pickled_digests.get(model)
+    if digest is None:
+        digest = _pickled_digests[model] = hashlib.blake2b(pickle.dumps(model), digest_size=16).hexdigest()
+    return digest
+
+def model_info(model):
+    """Version, accuracy and training metrics of the model being served, for API responses
+
+    Accuracy is None unless the model came with a measured one, e.g. a
+    legacy model.pkl without metrics.json or the rule-based fallback.
+    """
+    manifest = getattr(model, 'manifest', None) or {}
+    return {
+        'version': manifest.get('version', 'unversioned' if model else 'rule-based'),
+        'accuracy': manifest.get('training_accuracy'),
+        'created_at': manifest.get('created_at'),
+        'metrics': manifest.get('metrics'),
+    }
+
+# Request field names and the matching training column names, in model order
+FEATURE_FIELDS = ['pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
+                  'insulin', 'bmi', 'diabetesPedigreeFunction', 'age']
+FEATURE_NAMES = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                 'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+
+def build_feature_matrix(rows):
+    """Stack patient dicts into an (n_rows, 8) float matrix in model order"""
+    return np.array([[row[field] for field in FEATURE_FIELDS] for row in rows], dtype=float)
+
 def predict_diabetes(model, data):
     """Make diabetes prediction"""
+    return predict_diabetes_batch(model, [data])[0]
+
+def predict_diabetes_batch(model, rows):
+    """Make diabetes predictions for many patients with a single model call.
+
+    Returns a list of (prediction, probability) tuples, one per row, identical
+    to what predict_diabetes returns for each row on its own.
+    """
+    if not rows:
+        return []
+    
     try:
-        if model:
-            # Convert input data to the format expected by the model
-            input_features = [
-                data['pregnancies'],
-                data['glucose'],
-                data['bloodPressure'],
-                data['skinThickness'],
-                data['insulin'],
-                data['bmi'],
-                data['diabetesPedigreeFunction'],
-                data['age']
-            ]
-            
-            # Create DataFrame with proper column names
-            feature_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-                            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-            input_df = pd.DataFrame([input_features], columns=feature_names)
-            
-            # Make prediction
-            prediction = model.predict(input_df)[0]
-            probability = model.predict_proba(input_df)[0].tolist()
-            
-            return prediction, probability
-        else:
-            # Fallback prediction logic
-            risk_score = 0
-            if data['glucose'] > 140: risk_score += 0.3
-            if data['bmi'] > 30: risk_score += 0.2
-            if data['age'] > 60: risk_score += 0.15
-            if data['bloodPressure'] > 90: risk_score += 0.1
-            if data['diabetesPedigreeFunction'] > 1.0: risk_score += 0.1
-            
-            prediction = 1 if risk_score > 0.4 else 0
-            probability = [1 - risk_score, risk_score] if prediction == 1 else [0.8, 0.2]
-            
-            return prediction, probability
+        features = build_feature_matrix(rows)
+        predictions, probabilities = predict_diabetes_matrix(model, features)
+        if not model:
+            predictions = predictions.tolist()
+        return list(zip(predictions, probabilities.tolist()))
             
     except Exception as e:
-        print(f"Prediction error: {e}")
-        # Emergency fallback
-        is_high_risk = data['glucose'] > 140 or data['bmi'] > 30
-        return (1 if is_high_risk else 0), ([0.3, 0.7] if is_high_risk else [0.8, 0.2])
\ No newline at end of file
+        logger.exception("Prediction error: %s", e)
+        MODEL_FALLBACKS.inc(('emergency',), len(rows))
+        return [_emergency_prediction(data) for data in rows]
+
+def predict_diabetes_matrix(model, features):
+    """Score an (n_rows, 8) feature matrix in model order.
+
+    Returns (predictions, probabilities) as arrays, the vectorized core of
+    predict_diabetes_batch. Model errors are raised to the caller.
+    """
+    if model:
+        if not isinstance(model, CompiledForest):
+            # Keep the training column names so sklearn does not warn
+            import pandas as pd
+            features = pd.DataFrame(features, columns=FEATURE_NAMES)
+        
+        # Derive the class from the probabilities, exactly like model.predict
+        probabilities = model.predict_proba(features)
+        predictions = model.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+        return predictions, probabilities
+    
+    # Fallback prediction logic
+    MODEL_FALLBACKS.inc(('rule_based',), len(features))
+    risk_score = fallback_score(dict(zip(FEATURE_FIELDS, features.T)))
+    predictions = FALLBACK_POSITIVE(risk_score).astype(int)
+    probabilities = np.where(
+        predictions[:, None] == 1, np.column_stack([1 - risk_score, risk_score]), [0.8, 0.2]
+    )
+    return predictions, probabilities
+
+def _emergency_prediction(data):
+    """Emergency fallback when the model call itself fails, from rules.EMERGENCY_HIGH_RISK"""
+    is_high_risk = emergency_high_risk(data)
+    return (1 if is_high_risk else 0), list(EMERGENCY_PROBABILITY[is_high_risk])
@@ -0,0 +1,136 @@
+"""
+Holds the model being served and swaps in new registry versions at runtime.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .model_loader import model_info, predict_diabetes_batch
+from .model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Synthetic patients used to warm a model before it serves traffic; they
+# cover every BMI band used by the meal planner
+WARM_UP_PATIENTS = [
+    {'pregnancies': 1, 'glucose': 90, 'bloodPressure': 70, 'skinThickness': 20,
+     'insulin': 80, 'bmi': 17.5, 'diabetesPedigreeFunction': 0.3, 'age': 25},
+    {'pregnancies': 3, 'glucose': 120, 'bloodPressure': 75, 'skinThickness': 25,
+     'insulin': 100, 'bmi': 24.0, 'diabetesPedigreeFunction': 0.5, 'age': 40},
+    {'pregnancies': 6, 'glucose': 170, 'bloodPressure': 95, 'skinThickness': 35,
+     'insulin': 200, 'bmi': 35.0, 'diabetesPedigreeFunction': 1.2, 'age': 65},
+]
+
+
+class ModelManager:
+    """Reference to the served model that can be replaced without downtime.
+
+    Request handlers read `current` once and use that object for the whole
+    request, so a concurrent reload never mixes two models in one response.
+    Reloads load and warm the new version on the calling (or watcher) thread
+    and only then swap the reference.
+
+    The version to serve is the registry's admin pin, else `pinned_version`
+    (MODEL_VERSION), else LATEST; watchers in every worker follow it.
+    """
+
+    def __init__(self, model, registry=None, pinned_version=None):
+        self.current = model
+        self.registry = registry or ModelRegistry()
+        self.pinned_version = pinned_version or os.environ.get('MODEL_VERSION')
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self.previous_version = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_reload_ms = None
+        self.last_swap_us = None
+        self.last_reload_at = None
+        self.last_error = None
+
+    @property
+    def version(self):
+        return model_info(self.current)['version']
+
+    def target(self):
+        """The version every worker should serve: admin pin, MODEL_VERSION or latest"""
+        return self.registry.pinned() or self.pinned_version or 'latest'
+
+    def reload(self, version=None):
+        """Load `version` (default: target()), warm it up and swap it in.
+
+        Returns True when a different version was swapped in. Errors leave
+        the current model in place and are re-raised to the caller.
+        """
+        with self._reload_lock:
+            target = self.registry.resolve(version or self.target())
+            if target == self.version:
+                return False
+
+            started = time.perf_counter()
+            try:
+                model = self.registry.load(target)
+                predict_diabetes_batch(model, WARM_UP_PATIENTS)
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                raise
+
+            swap_started = time.perf_counter()
+            previous, self.current = self.current, model
+            self.last_swap_us = (time.perf_counter() - swap_started) * 1e6
+
+            self.previous_version = model_info(previous)['version']
+            self.last_reload_ms = (time.perf_counter() - started) * 1000
+            self.last_reload_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            self.last_error = None
+            self.reloads += 1
+            logger.info("Model reloaded: %s -> %s in %.1f ms", self.previous_version, target, self.last_reload_ms)
+            return True
+
+    def start_watcher(self, interval=5.0):
+        """Poll the registry in a daemon thread and reload when LATEST moves.
+
+        Safe to call again after a fork: threads do not survive fork, so a
+        dead watcher is simply replaced.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if not self.registry.versions():
+                    continue  # Nothing published: a legacy model.pkl or rule-based deployment
+                target = self.registry.resolve(self.target())
+                if target != self.version:
+                    self.reload(target)
+            except Exception as e:
+                logger.warning("Model reload failed: %s. Keeping version %s.", e, self.version)
+
+    def stats(self):
+        return {
+            'current_version': self.version,
+            'previous_version': self.previous_version,
+            'pinned_version': self.pinned_version,
+            'admin_pin': self.registry.pinned(),
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'last_reload_ms': self.last_reload_ms,
+            'last_swap_us': self.last_swap_us,
+            'last_reload_at': self.last_reload_at,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+        }
@@ -0,0 +1,159 @@
+"""
+Versioned on-disk registry of compiled models.
+
+Each version is a directory holding the CompiledForest arrays as .npy files
+plus a manifest.json with the feature order, training accuracy, dataset
+hash and creation time:
+
+    model/registry/
+        LATEST                      name of the newest version
+        PINNED                      version pinned by an admin, if any
+        20240101-120000/
+            manifest.json
+            feature.npy, threshold.npy, children.npy, ...
+
+Arrays are memory-mapped read-only on load, so every worker process serving
+the same version shares one physical copy through the page cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .model_loader import FEATURE_NAMES, CompiledForest
+
+DEFAULT_REGISTRY_DIR = Path(__file__).resolve().parents[1] / 'model' / 'registry'
+
+MANIFEST_FILE = 'manifest.json'
+LATEST_FILE = 'LATEST'
+PIN_FILE = 'PINNED'
+FORMAT_VERSION = 1
+
+
+class RegistryError(Exception):
+    """Raised when a requested model version cannot be served"""
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, used to tie a model to its training data"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get('MODEL_REGISTRY_DIR', DEFAULT_REGISTRY_DIR))
+
+    def versions(self):
+        """Published versions, oldest first"""
+        if not self.path.is_dir():
+            return []
+        return sorted(
+            entry.name for entry in self.path.iterdir()
+            if not entry.name.startswith('.') and (entry / MANIFEST_FILE).is_file()
+        )
+
+    def latest(self):
+        """Newest published version, or None for an empty registry"""
+        latest_file = self.path / LATEST_FILE
+        if latest_file.is_file():
+            version = latest_file.read_text(encoding='utf-8').strip()
+            if (self.path / version / MANIFEST_FILE).is_file():
+                return version
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def resolve(self, version='latest'):
+        """Turn 'latest' or a pinned version into a published version name
+
+        Only names listed by versions() are accepted, so a requested version
+        can never point outside the registry.
+        """
+        resolved = self.latest() if version == 'latest' else version
+        if not isinstance(resolved, str) or resolved not in self.versions():
+            raise RegistryError(f"Model version {version!r} not found in {self.path}")
+        return resolved
+
+    def pinned(self):
+        """Version pinned with pin(), or None"""
+        try:
+            version = (self.path / PIN_FILE).read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            return None
+        return version if version in self.versions() else None
+
+    def pin(self, version):
+        """Make every ModelManager on this registry serve `version` until unpin()"""
+        self._write_pointer(PIN_FILE, self.resolve(version))
+
+    def unpin(self):
+        (self.path / PIN_FILE).unlink(missing_ok=True)
+
+    def manifest(self, version='latest'):
+        version = self.resolve(version)
+        with open(self.path / version / MANIFEST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, version='latest', mmap_mode='r'):
+        """Load a published version as a CompiledForest"""
+        manifest = self.manifest(version)
+        if manifest.get('format') != FORMAT_VERSION:
+            raise RegistryError(f"Unsupported model format {manifest.get('format')!r} for {manifest['version']}")
+        if manifest.get('feature_names') != FEATURE_NAMES:
+            raise RegistryError(f"Model {manifest['version']} was trained on different features")
+        return CompiledForest.load(
+            self.path / manifest['version'], manifest['max_depth'], manifest=manifest, mmap_mode=mmap_mode
+        )
+
+    def publish(self, forest, training_accuracy, dataset_path, extra=None):
+        """Store a compiled forest as a new version and make it the latest.
+
+        The version directory is written under a temporary name and renamed
+        into place, so readers never see a half-written version.
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        created_at = datetime.now(timezone.utc)
+        version = created_at.strftime('%Y%m%d-%H%M%S')
+        suffix = 1
+        while (self.path / version).exists():
+            suffix += 1
+            version = f"{created_at.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+
+        manifest = {
+            'format': FORMAT_VERSION,
+            'version': version,
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'feature_names': FEATURE_NAMES,
+            'classes': forest.classes_.tolist(),
+            'training_accuracy': round(float(training_accuracy), 4),
+            'dataset_sha256': file_sha256(dataset_path),
+            'n_estimators': len(forest.roots),
+            'max_depth': forest.max_depth,
+            **(extra or {}),
+        }
+
+        staging = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=self.path))
+        try:
+            forest.save(staging)
+            with open(staging / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            # mkdtemp creates 0700; serving processes may run as another user
+            os.chmod(staging, 0o755)
+            os.rename(staging, self.path / version)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._write_pointer(LATEST_FILE, version)
+        return version
+
+    def _write_pointer(self, name, version):
+        tmp = self.path / f'.{name}.tmp'
+        tmp.write_text(version + '\n', encoding='utf-8')
+        os.replace(tmp, self.path / name)
@@ -0,0 +1,152 @@
+"""
+Micro-batching of concurrent single-patient predictions.
+
+Interactive traffic arrives one patient per request, and each model call
+has a fixed cost that dwarfs the per-row work (about 0.17 ms for one row
+against 0.9 ms for 64 with the compiled forest). A PredictBatcher
+collects the rows submitted by concurrent requests for up to `window`
+seconds after the first one, or until `max_batch` rows are waiting. It
+then scores them with one predict_diabetes_batch call and hands each
+caller its own (prediction, probability).
+
+Enabled with PREDICT_BATCH_WINDOW_MS (e.g. 2); PREDICT_BATCH_MAX caps
+the batch size (default 64). Batching only pays off when requests
+overlap, i.e. with threaded or async workers.
+
+A batch that fails resolves every one of its futures with the error, and
+a caller waits at most `timeout` seconds for its row.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeoutError
+from time import perf_counter
+
+from .metrics import REGISTRY
+from .model_loader import predict_diabetes_batch
+
+DEFAULT_MAX_BATCH = 64
+
+# Seconds a caller waits for its micro-batch before giving up
+DEFAULT_TIMEOUT = 5.0
+
+BATCH_SIZE = REGISTRY.histogram(
+    'predict_batch_size', 'Patients scored per micro-batched model call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT_SECONDS = REGISTRY.histogram(
+    'predict_batch_wait_seconds', 'Time a patient waited for its micro-batch to be scored',
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PredictBatcher:
+    """Coalesces predict calls from many threads into batched model calls.
+
+    A daemon thread, started on first use (and again after a fork), forms
+    the batches. Rows submitted with different model objects, e.g. around
+    a reload, are scored in separate calls with their own model.
+    """
+
+    def __init__(self, window=0.002, max_batch=DEFAULT_MAX_BATCH, timeout=DEFAULT_TIMEOUT):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    @classmethod
+    def from_env(cls):
+        """A batcher configured from PREDICT_BATCH_*, or None when batching is off"""
+        window_ms = float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 0))
+        if window_ms <= 0:
+            return None
+        return cls(window_ms / 1000, int(os.environ.get('PREDICT_BATCH_MAX', DEFAULT_MAX_BATCH)))
+
+    def submit(self, model, data):
+        """Queue one validated patient; the Future resolves to (prediction, probability)"""
+        future = Future()
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='predict-batcher', daemon=True)
+                self._thread.start()
+            self._pending.append((model, data, future, perf_counter()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def predict(self, model, data):
+        """Blocking predict_diabetes through the batcher; TimeoutError after `timeout` seconds"""
+        future = self.submit(model, data)
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            # Still queued: cancelled rows are skipped by the batch thread
+            future.cancel()
+            raise TimeoutError(f"Prediction not scored within {self.timeout} s") from None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0][3] + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            try:
+                self._score(batch)
+                error = None
+            except Exception as e:
+                logger.exception("Micro-batch of %d rows failed", len(batch))
+                error = e
+            # No caller may be left waiting on a row the batch did not resolve
+            for _, _, future, _ in batch:
+                if not future.done():
+                    try:
+                        future.set_exception(error or RuntimeError("Prediction was not scored"))
+                    except InvalidStateError:
+                        pass  # cancelled by its caller meanwhile
+
+    def _score(self, batch):
+        started = perf_counter()
+        groups = {}
+        for model, data, future, submitted in batch:
+            # Skip rows whose caller gave up (a cancelled asyncio wrapper)
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(id(model), (model, []))[1].append((data, future))
+                BATCH_WAIT_SECONDS.observe((), started - submitted)
+
+        for model, rows in groups.values():
+            try:
+                results = predict_diabetes_batch(model, [data for data, _ in rows])
+            except Exception as e:
+                for _, future in rows:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(rows, results):
+                future.set_result(result)
+
+        BATCH_SIZE.observe((), len(batch))
+        self.batches += 1
+        self.rows += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else None,
+            'largest_batch': self.largest_batch,
+        }
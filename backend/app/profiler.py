@@ -0,0 +1,243 @@
+"""
+Opt-in sampling profiler for the API requests.
+
+A daemon thread wakes every `interval` seconds and records the Python
+stack of every request being profiled, from sys._current_frames(). The
+stacks are kept in collapsed form ("outer;inner;leaf count" per line),
+which flamegraph.pl, speedscope and inferno read as is.
+
+Requests are profiled when their endpoint is listed in `endpoints` or a
+`sample_rate` draw picks them. With `slow_ms` set every request is
+tracked, and the profile of one that takes longer is kept even if it was
+not picked; the others are dropped when they finish. Profiles are written
+to `output_dir`, one file per request, and each process keeps only its
+newest `max_profiles`. The sampler does nothing while no request is tracked, and its
+cost per tick does not grow with the request rate, so low sample rates
+are safe to leave on under load.
+"""
+import itertools
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from flask import request
+
+DEFAULT_OUTPUT_DIR = Path(tempfile.gettempdir()) / 'diabetes-profiles'
+SUFFIX = '.collapsed'
+
+# <stamp>-<pid>-<sequence>-<endpoint>-<ms>ms-<reason>.collapsed, as written by _save
+PROFILE_NAME_PATTERN = re.compile(
+    r'(?P<stamp>\d{8}T\d{6})-(?P<pid>\d+)-\d+-(?P<endpoint>.+)-(?P<ms>\d+)ms-(?P<reason>[a-z]+)' + re.escape(SUFFIX)
+)
+
+
+def _frame_label(code, roots):
+    """'path/to/module.py:function' with the longest matching root stripped"""
+    filename = code.co_filename
+    for root in roots:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return f'{filename}:{code.co_name}'
+
+
+class _Profile:
+    __slots__ = ('endpoint', 'started', 'selected', 'stacks')
+
+    def __init__(self, endpoint, selected):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.selected = selected
+        self.stacks = Counter()
+
+
+class RequestProfiler:
+    """Samples request stacks and keeps the profiles of picked or slow requests"""
+
+    def __init__(self, output_dir=None, sample_rate=0.0, endpoints=(), slow_ms=None,
+                 interval=0.005, max_profiles=200):
+        self.output_dir = Path(output_dir or DEFAULT_OUTPUT_DIR)
+        self.output_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if output_dir is None:
+            # The default lives in the shared temporary directory
+            os.chmod(self.output_dir, 0o700)
+        self.sample_rate = sample_rate
+        self.endpoints = frozenset(endpoints)
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self._active = {}
+        self._labels = {}
+        self._roots = tuple(sorted({path for path in sys.path if path}, key=len, reverse=True))
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+        self.samples = 0
+        self.saved = 0
+        # Saved files, oldest first, including those of earlier runs
+        self._saved_files = deque(path for path, _ in sorted(self._files(), key=lambda file: file[1].st_mtime))
+
+    @classmethod
+    def from_env(cls):
+        """A profiler configured from PROFILE_* variables, None unless one enables it"""
+        sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+        endpoints = [e for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e]
+        slow_ms = os.environ.get('PROFILE_SLOW_MS')
+        if not (sample_rate or endpoints or slow_ms):
+            return None
+        return cls(
+            output_dir=os.environ.get('PROFILE_DIR'),
+            sample_rate=sample_rate,
+            endpoints=endpoints,
+            slow_ms=float(slow_ms) if slow_ms else None,
+            interval=float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000,
+            max_profiles=int(os.environ.get('PROFILE_MAX_FILES', 200)),
+        )
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+
+    def _start(self):
+        endpoint = request.endpoint or 'unknown'
+        selected = endpoint in self.endpoints or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        if not selected and self.slow_ms is None:
+            return
+        with self._lock:
+            self._active[threading.get_ident()] = _Profile(endpoint, selected)
+        self._ensure_sampler()
+
+    def _finish(self, exc=None):
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+        if profile is None:
+            return
+        elapsed_ms = (time.perf_counter() - profile.started) * 1000
+        if profile.selected:
+            self._save(profile, elapsed_ms, 'sampled')
+        elif elapsed_ms >= self.slow_ms:
+            self._save(profile, elapsed_ms, 'slow')
+
+    def _ensure_sampler(self):
+        # Threads do not survive fork, so every worker starts its own
+        if self._sampler is None or not self._sampler.is_alive():
+            with self._lock:
+                if self._sampler is None or not self._sampler.is_alive():
+                    self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                    self._sampler.start()
+        self._wake.set()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            # Sample under the lock, so a finished profile is never written to
+            with self._lock:
+                if self._active:
+                    frames = sys._current_frames()
+                    for ident, profile in self._active.items():
+                        if ident != me and ident in frames:
+                            profile.stacks[self._collapse(frames[ident])] += 1
+                            self.samples += 1
+                    del frames
+                else:
+                    self._wake.clear()
+            if self._wake.is_set():
+                time.sleep(self.interval)
+            else:
+                self._wake.wait()
+
+    def _collapse(self, frame):
+        labels = self._labels
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = _frame_label(code, self._roots)
+            stack.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _save(self, profile, elapsed_ms, reason):
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        name = f'{stamp}-{os.getpid()}-{next(self._sequence)}-{profile.endpoint}-{elapsed_ms:.0f}ms-{reason}{SUFFIX}'
+        lines = [f'{stack} {count}\n' for stack, count in profile.stacks.most_common()]
+        tmp = self.output_dir / f'.{name}.tmp'
+        tmp.write_text(''.join(lines), encoding='utf-8')
+        os.replace(tmp, self.output_dir / name)
+        with self._lock:
+            self.saved += 1
+            self._saved_files.append(self.output_dir / name)
+            expired = [self._saved_files.popleft() for _ in range(len(self._saved_files) - self.max_profiles)]
+        for path in expired:
+            path.unlink(missing_ok=True)
+
+    def _files(self):
+        """(path, name match, stat) of the saved profiles; other workers may delete them meanwhile"""
+        files = []
+        for path in self.output_dir.glob(f'*{SUFFIX}'):
+            match = PROFILE_NAME_PATTERN.fullmatch(path.name)
+            if match is None:
+                continue  # not written by a profiler
+            try:
+                files.append((path, match, path.stat()))
+            except FileNotFoundError:
+                pass
+        return files
+
+    def profiles(self):
+        """Saved profiles, newest first"""
+        result = []
+        for path, match, stat in self._files():
+            result.append({
+                'name': path.name,
+                'endpoint': match['endpoint'],
+                'duration_ms': int(match['ms']),
+                'reason': match['reason'],
+                'pid': int(match['pid']),
+                'created_at': match['stamp'],
+                'bytes': stat.st_size,
+            })
+        return sorted(result, key=lambda p: (p['created_at'], p['name']), reverse=True)
+
+    def path(self, name):
+        """Path of a saved profile, None for names that are not one"""
+        path = self.output_dir / name
+        if path.name != name or not PROFILE_NAME_PATTERN.fullmatch(name) or not path.is_file():
+            return None
+        return path
+
+    def merged(self, endpoint=None):
+        """Collapsed stacks summed over the saved profiles (of one endpoint)"""
+        stacks = Counter()
+        for profile in self.profiles():
+            if endpoint and profile['endpoint'] != endpoint:
+                continue
+            try:
+                text = (self.output_dir / profile['name']).read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            for line in text.splitlines():
+                stack, _, count = line.rpartition(' ')
+                stacks[stack] += int(count)
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'endpoints': sorted(self.endpoints),
+            'slow_ms': self.slow_ms,
+            'interval_ms': self.interval * 1000,
+            'active': len(self._active),
+            'samples': self.samples,
+            'saved': self.saved,
+            'output_dir': str(self.output_dir),
+        }
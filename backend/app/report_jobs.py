@@ -0,0 +1,237 @@
+"""
+Background PDF rendering for /api/report/jobs.
+
+Reports are rendered by a bounded process pool so a burst of downloads does
+not tie up the threads serving /api/predict. Jobs are identified by a hash
+of everything that goes into the PDF, so identical payloads share one job,
+and finished PDFs are kept in a size-bounded on-disk cache that every
+worker process can read.
+
+Job state is kept on disk as well: next to `<job id>.pdf` a marker file
+`<job id>.queued`, `.running` or `.failed` (holding the error) tells any
+worker process how a job started by another one is doing. The cache holds
+patient data, so the directory is private to the user running the API
+(0700, files 0600). Cached PDFs carry no generation time, since they are
+served again for later identical requests.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / 'diabetes-report-cache'
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Markers of jobs that are still pending, most advanced first
+PENDING_STATES = ('running', 'queued')
+
+# A queued or running marker this old belongs to a worker that died
+STALE_MARKER_SECONDS = 600
+
+# Seconds between marker checks while waiting for another process's job
+POLL_INTERVAL = 0.1
+
+
+class QueueFullError(Exception):
+    """Raised when too many report jobs are already waiting"""
+
+
+def report_key(report_args):
+    """Content hash of the render inputs, used as job id and cache file name"""
+    canonical = json.dumps(report_args, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _write_private(path, data):
+    """Write `data` to `path` through a 0600 temporary file and an atomic rename"""
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _marker(path, state):
+    return Path(path).with_suffix(f'.{state}')
+
+
+def _render_to_file(report_args, path):
+    """Process pool entry point: render one report and move it into place"""
+    from .report_renderer import render_report
+    _write_private(_marker(path, 'running'), b'')
+    _marker(path, 'queued').unlink(missing_ok=True)
+    try:
+        pdf = render_report(**report_args, timestamp=False)
+        _write_private(path, pdf)
+    except Exception as e:
+        _write_private(_marker(path, 'failed'), str(e).encode('utf-8'))
+        raise
+    finally:
+        _marker(path, 'running').unlink(missing_ok=True)
+    return len(pdf)
+
+
+class ReportJobQueue:
+    def __init__(self, cache_dir=None, max_workers=2, max_pending=32, cache_max_bytes=256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.cache_max_bytes = cache_max_bytes
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            cache_dir=os.environ.get('REPORT_CACHE_DIR'),
+            max_workers=int(os.environ.get('REPORT_WORKERS', 2)),
+            max_pending=int(os.environ.get('REPORT_QUEUE_SIZE', 32)),
+            cache_max_bytes=int(float(os.environ.get('REPORT_CACHE_MAX_MB', 256)) * 1024 * 1024),
+        )
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn, not fork: the API process is multi-threaded
+            self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def pdf_path(self, job_id):
+        return self.cache_dir / f'{job_id}.pdf'
+
+    def _disk_status(self, job_id):
+        """Status of a job as recorded in the cache directory by any process"""
+        path = self.pdf_path(job_id)
+        if path.exists():
+            return 'done'
+        if _marker(path, 'failed').exists():
+            return 'failed'
+        for state in PENDING_STATES:
+            try:
+                age = time.time() - _marker(path, state).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < STALE_MARKER_SECONDS:
+                return state
+        return None
+
+    def submit(self, report_args):
+        """Queue a report and return its job id; identical reports share one job"""
+        job_id = report_key(report_args)
+        with self._lock:
+            future = self._jobs.get(job_id)
+            if (future is not None and not future.done()) or self._disk_status(job_id) in ('done', *PENDING_STATES):
+                self.deduplicated += 1
+                return job_id
+
+            pending = sum(1 for f in self._jobs.values() if not f.done())
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} report jobs already pending")
+
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(self.cache_dir, 0o700)
+            path = self.pdf_path(job_id)
+            _marker(path, 'failed').unlink(missing_ok=True)
+            _write_private(_marker(path, 'queued'), b'')
+            future = self._get_pool().submit(_render_to_file, report_args, str(path))
+            self._jobs[job_id] = future
+        # Outside the lock: the callback runs right here when the job is already done
+        future.add_done_callback(lambda _: self._enforce_cache_limit())
+        return job_id
+
+    def status(self, job_id):
+        """'queued', 'running', 'done', 'failed' or None for an unknown job"""
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        future = self._jobs.get(job_id)
+        if future is None:
+            return self._disk_status(job_id)
+        if future.running():
+            return 'running'
+        if not future.done():
+            return 'queued'
+        if future.exception() is not None:
+            return 'failed'
+        # The PDF may have been evicted from the cache since
+        return 'done' if self.pdf_path(job_id).exists() else None
+
+    def error(self, job_id):
+        future = self._jobs.get(job_id)
+        if future is not None and future.done() and future.exception() is not None:
+            return str(future.exception())
+        try:
+            return _marker(self.pdf_path(job_id), 'failed').read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def wait(self, job_id, timeout):
+        """Block up to timeout seconds for a job, whichever process runs it"""
+        future = self._jobs.get(job_id)
+        if future is not None:
+            try:
+                future.exception(timeout=timeout)
+            except FutureTimeoutError:
+                pass
+            return self.status(job_id)
+
+        deadline = time.monotonic() + timeout
+        status = self.status(job_id)
+        while status in PENDING_STATES and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            status = self.status(job_id)
+        return status
+
+    def _enforce_cache_limit(self):
+        """Drop the oldest finished PDFs until the cache fits its size bound"""
+        with self._lock:
+            # Forget finished jobs; their PDFs or failed markers are found on disk from now on
+            for job_id in [j for j, f in self._jobs.items() if f.done()]:
+                error = self._jobs.pop(job_id).exception()
+                path = self.pdf_path(job_id)
+                if error is not None and not _marker(path, 'failed').exists():
+                    # Failed outside the render, e.g. a broken pool: record it for status()
+                    _write_private(_marker(path, 'failed'), str(error).encode('utf-8'))
+                    for state in PENDING_STATES:
+                        _marker(path, state).unlink(missing_ok=True)
+
+            # Other workers evict from the same directory, so files can vanish at any point
+            files = []
+            for path in self.cache_dir.glob('*.pdf'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            files.sort(key=lambda file: file[0])
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.cache_max_bytes:
+                    break
+                total -= size
+                path.unlink(missing_ok=True)
+                self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for f in self._jobs.values() if not f.done())
+        return {
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'workers': self.max_workers,
+            'deduplicated': self.deduplicated,
+            'evicted': self.evicted,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
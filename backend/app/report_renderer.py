@@ -0,0 +1,187 @@
+"""
+PDF rendering for assessment reports.
+
+Kept free of Flask and model state so it can run in a worker process.
+"""
+import io
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+
+HEADER_FORM = 'report_header'
+HEADER_HEIGHT = inch * 0.9
+
+
+def new_canvas(out):
+    """Canvas writing to `out` with the static page header pre-built.
+
+    The header box and title are stored once as a form XObject and
+    referenced from every report drawn on this canvas.
+    """
+    doc = canvas.Canvas(out, pagesize=letter)
+    width, height = letter
+    doc.beginForm(HEADER_FORM)
+    # colored header box
+    doc.setFillColor(colors.HexColor('#0b74de'))
+    doc.rect(0, height - HEADER_HEIGHT, width, HEADER_HEIGHT, stroke=0, fill=1)
+    doc.setFillColor(colors.white)
+    doc.setFont('Helvetica-Bold', 20)
+    doc.drawCentredString(width / 2.0, height - HEADER_HEIGHT / 2 + 6, 'Diabetes Risk Assessment Report')
+    doc.endForm()
+    return doc
+
+
+def generated_timestamp():
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+
+
+def render_report(data, prediction, probability, nutrition, daily_meal_plan, timestamp=True):
+    """Render the assessment report for one patient and return the PDF bytes
+
+    Without `timestamp` the header has no generation time, for PDFs that are
+    cached and served again later.
+    """
+    # Build PDF in memory
+    buffer = io.BytesIO()
+    doc = new_canvas(buffer)
+    draw_report(doc, data, prediction, probability, nutrition, daily_meal_plan, timestamp=timestamp)
+    doc.save()
+    return buffer.getvalue()
+
+
+def draw_report(doc, data, prediction, probability, nutrition, daily_meal_plan, generated_at=None, timestamp=True):
+    """Draw one patient's report on `doc`, starting on the current page.
+
+    The last page is left open; the caller ends it with showPage() or save().
+    """
+    width, height = letter
+
+    # --- Header ---
+    header_height = HEADER_HEIGHT
+    doc.doForm(HEADER_FORM)
+    # subtitle timestamp
+    if timestamp:
+        doc.setFillColor(colors.white)
+        doc.setFont('Helvetica', 9)
+        ts = generated_at or generated_timestamp()
+        doc.drawCentredString(width / 2.0, height - header_height / 2 - 12, f'Report generated: {ts}')
+
+    # content frame
+    x_margin = inch * 0.6
+    y = height - header_height - 18
+    line_height = 14
+
+    # Draw user inputs as a two-column table-like block
+    doc.setFont('Helvetica-Bold', 12)
+    doc.setFillColor(colors.black)
+    doc.drawString(x_margin, y, 'User Inputs')
+    y -= line_height
+    doc.setFont('Helvetica', 10)
+    left_keys = ['pregnancies', 'glucose', 'bloodPressure', 'skinThickness']
+    right_keys = ['insulin', 'bmi', 'diabetesPedigreeFunction', 'age']
+    max_rows = max(len(left_keys), len(right_keys))
+    col_gap = 220
+    for i in range(max_rows):
+        lx = x_margin
+        rx = x_margin + col_gap
+        if i < len(left_keys):
+            k = left_keys[i]
+            v = data.get(k, '')
+            doc.drawString(lx, y, f'{k}: {v}')
+        if i < len(right_keys):
+            k = right_keys[i]
+            v = data.get(k, '')
+            doc.drawString(rx, y, f'{k}: {v}')
+        y -= line_height
+
+    y -= line_height / 2
+
+    # Risk box
+    box_height = line_height * 3
+    box_width = width - x_margin * 2
+    doc.setFillColor(colors.HexColor('#fdecea') if prediction == 1 else colors.HexColor('#eef7f9'))
+    doc.rect(x_margin, y - box_height + 6, box_width, box_height, stroke=0, fill=1)
+    # Risk text
+    doc.setFillColor(colors.black)
+    doc.setFont('Helvetica-Bold', 12)
+    doc.drawString(x_margin + 6, y - 6, 'Risk Summary')
+    doc.setFont('Helvetica', 10)
+    risk_text = 'HIGH RISK' if prediction == 1 else 'LOW / MODERATE RISK'
+    prob_text = f'Probability (neg,pos): {probability}' if isinstance(probability, (list, tuple)) else ''
+    doc.drawString(x_margin + 6, y - 6 - line_height, f'Prediction: {risk_text} (class={int(prediction)})')
+    doc.drawString(x_margin + 6, y - 6 - line_height * 2, prob_text)
+    y -= box_height + line_height
+
+    # Nutrition
+    doc.setFont('Helvetica-Bold', 12)
+    doc.drawString(x_margin, y, 'Recommended Nutrition')
+    y -= line_height
+    doc.setFont('Helvetica', 10)
+    doc.drawString(x_margin + 6, y, f"Calories: {nutrition.get('calories')}, Protein: {nutrition.get('protein')} g, Carbs: {nutrition.get('carbs')} g")
+    y -= line_height * 1.5
+
+    # Daily Meal Plan
+    doc.setFont('Helvetica-Bold', 12)
+    doc.drawString(x_margin, y, 'Recommended Daily Meal Plan')
+    y -= line_height * 1.5
+
+    # Daily nutrition summary
+    if daily_meal_plan.get('daily_nutrition'):
+        dn = daily_meal_plan['daily_nutrition']
+        doc.setFont('Helvetica-Bold', 11)
+        doc.drawString(x_margin + 6, y, 'Daily Nutrition Summary')
+        y -= line_height
+        doc.setFont('Helvetica', 10)
+        doc.drawString(x_margin + 12, y, f"Total Calories: {dn.get('calories', 0)} | Protein: {dn.get('protein', 0)}g | Fiber: {dn.get('fiber', 0)}g | Avg GI: {dn.get('avg_gi', 0)}")
+        y -= line_height * 1.5
+
+    def draw_meal_group(meal_title, foods, y):
+        if not foods:
+            return y
+        doc.setFont('Helvetica-Bold', 11)
+        doc.drawString(x_margin + 6, y, f'{meal_title.capitalize()} ({len(foods)} items)')
+        y -= line_height
+        doc.setFont('Helvetica', 9)
+        for food in foods:
+            title = food.get('title', '')
+            calories = food.get('calories', 0)
+            protein = food.get('protein', 0)
+            fiber = food.get('fiber', 0)
+            gi = food.get('gi_index', 0)
+            risk = food.get('risk_level', '')
+            text = f'• {title} — {calories} kcal, {protein}g protein, {fiber}g fiber, GI: {gi} ({risk} risk)'
+
+            # Simple text wrapping
+            if len(text) > 85:
+                words = text.split()
+                line1 = ' '.join(words[:12])
+                line2 = '  ' + ' '.join(words[12:])
+                doc.drawString(x_margin + 12, y, line1)
+                y -= line_height * 0.8
+                doc.drawString(x_margin + 12, y, line2)
+            else:
+                doc.drawString(x_margin + 12, y, text)
+
+            y -= line_height
+            if y < inch * 1.5:
+                doc.showPage()
+                y = height - inch
+        return y - line_height * 0.3
+
+    # Draw each meal section
+    for meal_type in ['breakfast', 'lunch', 'dinner', 'snacks']:
+        foods = daily_meal_plan.get(meal_type, [])
+        if foods:
+            y = draw_meal_group(meal_type, foods, y)
+            y -= line_height * 0.5
+
+    # Footer
+    if y < inch:
+        doc.showPage()
+        y = height - inch
+    doc.setFont('Helvetica-Oblique', 9)
+    doc.drawString(x_margin, inch * 0.6, 'This report is for informational purposes only and not medical advice.')
@@ -0,0 +1,181 @@
+"""
+Response cache for /api/predict.
+
+Kiosks, frontend retries and integration tests resubmit identical
+payloads; a cached response skips inference, nutrition and meal planning.
+The pipeline reads nothing but the eight input fields, so the key is a
+hash of those values plus content digests ("versions") of the model and
+food catalog that built the response. Bodies are kept, already encoded, in an
+in-process LRU with a TTL. An optional sqlite file on local disk is
+shared by the worker processes of a host, so a response built by one
+worker is a hit in the others.
+
+Enabled with PREDICT_CACHE_SIZE (entries kept per process);
+PREDICT_CACHE_TTL sets the lifetime in seconds (default 300) and
+PREDICT_CACHE_PATH the sqlite file of the shared tier.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import LRUCache
+from .model_loader import FEATURE_FIELDS
+
+DEFAULT_TTL = 300
+
+# Expired rows are deleted from the shared tier every this many writes
+PURGE_EVERY = 256
+
+logger = logging.getLogger(__name__)
+
+
+def response_key(data, versions):
+    """Hash of the input fields of a validated payload and the (model, catalog) versions.
+
+    Other payload keys and key order do not matter; numbers are kept as
+    sent, since 120 and 120.0 can encode differently in the response.
+    """
+    canonical = json.dumps([[data[field] for field in FEATURE_FIELDS], list(versions)], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SharedStore:
+    """Response bodies in a sqlite file shared by the processes of one host.
+
+    Every thread (and every forked worker) opens its own connection. Errors,
+    e.g. a database locked for longer than `timeout`, count as misses and
+    never fail a request.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, timeout=0.05):
+        self.path = str(path)
+        self.ttl = ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self.errors = 0
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses '
+                '(key TEXT PRIMARY KEY, versions TEXT NOT NULL, expires REAL NOT NULL, body TEXT NOT NULL)'
+            )
+            local.pid = os.getpid()
+        return local.connection
+
+    def _failed(self, action, error):
+        self.errors += 1
+        logger.warning("Shared response cache %s failed: %s", action, error)
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT body FROM responses WHERE key = ? AND expires > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed('read', e)
+            return None
+        return row[0] if row else None
+
+    def put(self, key, versions, body):
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)',
+                (key, json.dumps(list(versions)), time.time() + self.ttl, body),
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                connection.execute('DELETE FROM responses WHERE expires <= ?', (time.time(),))
+        except sqlite3.Error as e:
+            self._failed('write', e)
+
+    def purge(self, versions):
+        """Delete the responses of any other (model, catalog) versions and expired ones"""
+        try:
+            self._connection().execute(
+                'DELETE FROM responses WHERE versions != ? OR expires <= ?', (json.dumps(list(versions)), time.time())
+            )
+        except sqlite3.Error as e:
+            self._failed('purge', e)
+
+
+class ResponseCache:
+    """Encoded /api/predict bodies by response_key, in process and optionally shared.
+
+    The first lookup under new (model, catalog) versions, i.e. after a
+    model reload or catalog change, drops every entry built under the old
+    ones. The keys include the versions, so a worker still on an old model
+    never serves a response built by another.
+    """
+
+    def __init__(self, maxsize=1024, ttl=DEFAULT_TTL, path=None):
+        self.memory = LRUCache(maxsize, ttl)
+        self.shared = SharedStore(path, ttl) if path else None
+        self.versions = None
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls):
+        """A cache configured from PREDICT_CACHE_*, or None when caching is off"""
+        size = int(os.environ.get('PREDICT_CACHE_SIZE', 0))
+        if size <= 0:
+            return None
+        return cls(size, float(os.environ.get('PREDICT_CACHE_TTL', DEFAULT_TTL)), os.environ.get('PREDICT_CACHE_PATH'))
+
+    def _check_versions(self, versions):
+        if versions == self.versions:
+            return
+        with self._lock:
+            if versions == self.versions:
+                return
+            if self.versions is not None:
+                self.invalidations += 1
+                logger.info("Versions changed to %s, dropping cached predict responses", versions)
+            self.memory.clear()
+            if self.shared is not None:
+                self.shared.purge(versions)
+            self.versions = versions
+
+    def get(self, data, versions):
+        """(key, cached body or None) for a validated payload under (model, catalog) versions"""
+        self._check_versions(versions)
+        key = response_key(data, versions)
+        body = self.memory.get(key)
+        if body is None and self.shared is not None:
+            body = self.shared.get(key)
+            if body is not None:
+                self.shared_hits += 1
+                self.memory.put(key, body)
+        return key, body
+
+    def put(self, key, body):
+        self.memory.put(key, body)
+        if self.shared is not None:
+            self.shared.put(key, self.versions, body)
+
+    def stats(self):
+        """LRUCache-style stats; hits include the ones served by the shared tier"""
+        stats = self.memory.stats()
+        stats['hits'] += self.shared_hits
+        stats['misses'] -= self.shared_hits
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None,
+            'shared_hits': self.shared_hits,
+            'shared_errors': self.shared.errors if self.shared is not None else None,
+            'invalidations': self.invalidations,
+            'ttl': self.memory.ttl,
+        })
+        return stats
@@ -1,91 +1,433 @@
-from flask import Blueprint, request, jsonify, send_file
-from .model_loader import load_model, predict_diabetes
+from flask import Blueprint, Response, current_app, g, request, jsonify, send_file, stream_with_context
+from .model_loader import load_model, model_digest, model_info, predict_diabetes, predict_diabetes_batch
+from .model_manager import WARM_UP_PATIENTS, ModelManager
+from .model_registry import RegistryError
 import subprocess
 from pathlib import Path
 from .diet_recommender import get_food_recommendations, calculate_meal_plan_nutrition
-from .utils import calculate_nutrition_needs, validate_input_data
+from .utils import calculate_nutrition_needs, validate_input_data, validate_input_batch
 from .food_recommender import FoodRecommender
+from . import rules
+from .serialization import dumps, json_response
+from .metrics import REGISTRY
+from .report_jobs import QueueFullError, ReportJobQueue
+from .predict_batcher import PredictBatcher
+from .response_cache import ResponseCache
+import hmac
 import io
-from datetime import datetime
+import json
+import os
+import tempfile
+import threading
+from functools import wraps
+from time import perf_counter
 
-# reportlab for PDF generation
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, Frame, KeepInFrame
+# The PDF modules (reportlab) are imported by the report views on first use,
+# so processes that never render a report do not pay for them at startup
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# Load model and food recommender on startup
-model = load_model()
-food_recommender = FoodRecommender()
+# The model, food recommender, report queue, predict micro-batcher (None
+# unless PREDICT_BATCH_WINDOW_MS is set) and predict response cache (None
+# unless PREDICT_CACHE_SIZE is set); set by load_state(), which create_app
+# calls, so importing this module loads nothing
+model_manager = None
+food_recommender = None
+report_jobs = None
+predict_batcher = None
+predict_cache = None
+
+# Request metrics, served at /api/metrics
+REQUEST_SECONDS = REGISTRY.histogram('request_duration_seconds', 'Time to build the response, by endpoint', ('endpoint',))
+REQUESTS = REGISTRY.counter('requests_total', 'Responses sent, by endpoint and status code', ('endpoint', 'status'))
+IN_FLIGHT = REGISTRY.gauge('requests_in_flight', 'Requests being handled, by endpoint', ('endpoint',))
+STAGE_SECONDS = REGISTRY.histogram('stage_duration_seconds', 'Time spent in each stage of a request', ('endpoint', 'stage'))
+
+# Set once warm_up() has run; gates the /api/ready probe
+ready = False
+
+def load_state():
+    """Load the model, the food catalog, the report queue, the batcher and the
+    response cache, once per process.
+
+    Anything already set (e.g. replaced by a test) is kept.
+    """
+    global model_manager, food_recommender, report_jobs, predict_batcher, predict_cache
+    if model_manager is None:
+        model_manager = ModelManager(load_model())
+    if food_recommender is None:
+        food_recommender = FoodRecommender()
+        REGISTRY.add_cache('meal_plan', food_recommender.plan_cache)
+        REGISTRY.add_cache('multi_day_plan', food_recommender.multi_day_cache)
+    if report_jobs is None:
+        report_jobs = ReportJobQueue.from_env()
+    if predict_batcher is None:
+        predict_batcher = PredictBatcher.from_env()
+    if predict_cache is None:
+        predict_cache = ResponseCache.from_env()
+        if predict_cache is not None:
+            REGISTRY.add_cache('predict_response', predict_cache)
+
+def response_versions(model):
+    """What a /api/predict body depends on besides the input: digests of the model and food catalog"""
+    return model_digest(model), food_recommender.catalog_version
+
+def predict_patient(model, data):
+    """predict_diabetes, coalesced with concurrent requests when batching is on"""
+    if predict_batcher is not None:
+        return predict_batcher.predict(model, data)
+    return predict_diabetes(model, data)
+
+def warm_up_in_background():
+    """Run warm_up() in a daemon thread; /api/ready reports 503 until it finishes"""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def warm_up():
+    """Exercise the prediction path and fill the meal plan cache.
+
+    Meant to run once before serving (in the master process when workers are
+    forked), so every worker starts with warm code paths and caches.
+    """
+    global ready
+    predict_diabetes_batch(model_manager.current, WARM_UP_PATIENTS)
+    for patient in WARM_UP_PATIENTS:
+        for risk_level in ('Low', 'Moderate', 'High'):
+            food_recommender.get_daily_meal_plan_encoded(patient, risk_level, "Vegetarian")
+    ready = True
+
+@api_bp.before_request
+def _start_request():
+    g.request_started = perf_counter()
+    IN_FLIGHT.inc((request.endpoint,))
+
+@api_bp.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        IN_FLIGHT.dec((request.endpoint,))
+        REQUEST_SECONDS.observe((request.endpoint,), perf_counter() - started)
+        REQUESTS.inc((request.endpoint, str(response.status_code)))
+    return response
+
+def build_assessment(model, data, prediction, probability, encoded_meal_plan=False, timer=None):
+    """Build the /api/predict response body for one validated patient
+
+    With encoded_meal_plan the daily meal plan is the cached RawJSON
+    rendering, for responses sent through json_response. A StageTimer
+    records the nutrition and meal plan stages.
+    """
+    # Calculate risk factors
+    risk_factors = rules.risk_factors(data)
+    
+    # Calculate nutrition needs
+    nutrition = calculate_nutrition_needs(
+        data['bmi'], data['age'], data['glucose'], prediction == 1
+    )
+    if timer:
+        timer.lap('nutrition')
+    
+    # Determine risk level
+    diabetic_prob = probability[1] if isinstance(probability, list) else probability
+    risk_level = rules.RISK_LEVEL(diabetic_prob)
+    
+    # Get daily meal plan based on patient condition
+    daily_meal_plan, daily_meal_plan_json = food_recommender.get_daily_meal_plan_encoded(data, risk_level, "Vegetarian")
+    if timer:
+        timer.lap('meal_plan')
+    
+    # Get nutrition from daily meal plan
+    meal_plan_nutrition = daily_meal_plan.get('daily_nutrition', {})
+    if encoded_meal_plan:
+        daily_meal_plan = daily_meal_plan_json
+    
+    return {
+        'prediction': int(prediction),
+        'probability': probability,
+        'risk_factors': risk_factors,
+        'risk_level': risk_level,
+        'accuracy': model_info(model)['accuracy'],
+        'nutrition': nutrition,
+        'daily_meal_plan': daily_meal_plan,
+        'meal_plan_nutrition': meal_plan_nutrition
+    }
 
 @api_bp.route('/predict', methods=['POST'])
 def predict():
+    timer = STAGE_SECONDS.timer('predict')
     try:
         data = request.json
         
         # Validate input data
         if not validate_input_data(data):
             return jsonify({'error': 'Invalid input data'}), 400
+        timer.lap('validate')
+        
+        model = model_manager.current
+        if predict_cache is not None:
+            key, cached = predict_cache.get(data, response_versions(model))
+            if cached is not None:
+                timer.lap('cache')
+                return Response(cached, mimetype='application/json')
         
         # Make prediction
-        prediction, probability = predict_diabetes(model, data)
+        prediction, probability = predict_patient(model, data)
+        timer.lap('model')
+        
+        body = dumps(build_assessment(model, data, prediction, probability, encoded_meal_plan=True, timer=timer))
+        timer.lap('encode')
+        if predict_cache is not None:
+            predict_cache.put(key, body)
+        return Response(body, mimetype='application/json')
+            
+    except Exception as e:
+        return jsonify({
+            'error': 'Prediction failed',
+            'message': str(e)
+        }), 500
+
+MAX_SEARCH_LIMIT = 100
+SEARCH_RANGES = {'gi': 'gi_index', 'calories': 'calories', 'fiber': 'fiber_g'}
+
+@api_bp.route('/foods/search', methods=['GET'])
+def search_foods():
+    """Search foods by name or examples.
+
+    Query parameters: q, region, diet, gi_min/gi_max, calories_min/calories_max,
+    fiber_min/fiber_max (inclusive), offset and limit (at most 100).
+    """
+    try:
+        args = request.args
+        offset = args.get('offset', 0, type=int)
+        limit = args.get('limit', 20, type=int)
+        if offset < 0 or not 1 <= limit <= MAX_SEARCH_LIMIT:
+            return jsonify({'error': f'offset must be >= 0 and limit between 1 and {MAX_SEARCH_LIMIT}'}), 400
+        ranges = {}
+        for name, column in SEARCH_RANGES.items():
+            bounds = (args.get(f'{name}_min'), args.get(f'{name}_max'))
+            try:
+                ranges[column] = tuple(None if bound in (None, '') else float(bound) for bound in bounds)
+            except ValueError:
+                return jsonify({'error': f'{name}_min and {name}_max must be numbers'}), 400
         
-        # Calculate risk factors
-        risk_factors = []
-        if data['glucose'] > 140: risk_factors.append('glucose')
-        if data['bmi'] > 30: risk_factors.append('bmi')
-        if data['age'] > 60: risk_factors.append('age')
-        if data['bloodPressure'] > 90: risk_factors.append('bloodPressure')
+        return json_response(food_recommender.search_foods(
+            args.get('q', ''), args.get('region'), args.get('diet'), ranges, offset, limit
+        ))
+    
+    except Exception as e:
+        return jsonify({'error': 'Food search failed', 'message': str(e)}), 500
+
+@api_bp.route('/foods/autocomplete', methods=['GET'])
+def autocomplete_foods():
+    """Dish names completing the partial query `q`"""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 20)
+    return jsonify({'suggestions': food_recommender.autocomplete(request.args.get('q', ''), limit)})
+
+MAX_PLAN_DAYS = 31
+
+@api_bp.route('/meal-plan', methods=['POST'])
+def multi_day_meal_plan():
+    """Meal plans for several days that rotate dishes.
+
+    Body: the patient fields, plus optional 'days' (default 7), 'diet'
+    and 'swaps' ([{day, meal, index, title?}], applied in order). Only the
+    days that clash with a swapped-in dish are re-planned; they are
+    listed in 'recomputed_days'.
+    """
+    try:
+        data = request.json or {}
+        if not validate_input_data(data):
+            return jsonify({'error': 'Invalid input data'}), 400
         
-        # Calculate nutrition needs
-        nutrition = calculate_nutrition_needs(
-            data['bmi'], data['age'], data['glucose'], prediction == 1
-        )
+        days = data.get('days', 7)
+        swaps = data.get('swaps') or []
+        if not isinstance(days, int) or not 1 <= days <= MAX_PLAN_DAYS:
+            return jsonify({'error': f'days must be between 1 and {MAX_PLAN_DAYS}'}), 400
+        if not isinstance(swaps, list) or not all(
+            isinstance(swap, dict) and isinstance(swap.get('day'), int) and isinstance(swap.get('index'), int)
+            and isinstance(swap.get('meal'), str) for swap in swaps
+        ):
+            return jsonify({'error': 'swaps must be a list of {day, meal, index, title?}'}), 400
         
-        # Determine risk level
+        _, probability = predict_patient(model_manager.current, data)
         diabetic_prob = probability[1] if isinstance(probability, list) else probability
-        if diabetic_prob < 0.3:
-            risk_level = "Low"
-        elif diabetic_prob < 0.6:
-            risk_level = "Moderate"
-        else:
-            risk_level = "High"
+        risk_level = rules.RISK_LEVEL(diabetic_prob)
+        try:
+            plan, recomputed = food_recommender.get_multi_day_plan(
+                data, risk_level, data.get('diet', 'Vegetarian'), days, swaps
+            )
+        except (ValueError, IndexError) as e:
+            return jsonify({'error': 'Invalid swap', 'message': str(e)}), 400
+        
+        return json_response({'risk_level': risk_level, **plan, 'recomputed_days': recomputed})
+    
+    except Exception as e:
+        return jsonify({'error': 'Meal plan failed', 'message': str(e)}), 500
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def _read_batch_payload():
+    """Read a JSON array or NDJSON body into a list of patient payloads"""
+    if request.mimetype in NDJSON_MIMETYPES:
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    
+    rows = request.get_json(silent=True)
+    return rows if isinstance(rows, list) else None
+
+@api_bp.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many patients at once.
+
+    Accepts a JSON array of /api/predict payloads, or NDJSON with one payload
+    per line. Every row is validated up front and all valid rows go through a
+    single model call. Results keep the input order; invalid rows get an
+    error entry instead of failing the whole batch.
+    """
+    try:
+        try:
+            rows = _read_batch_payload()
+        except ValueError:
+            rows = None
+        if rows is None:
+            return jsonify({'error': 'Expected a JSON array or NDJSON body'}), 400
         
-        # Get daily meal plan based on patient condition
-        daily_meal_plan = food_recommender.get_daily_meal_plan(data, risk_level, "Vegetarian")
+        valid = validate_input_batch(rows)
+        valid_rows = [row for row, ok in zip(rows, valid) if ok]
+        model = model_manager.current
+        predictions = iter(predict_diabetes_batch(model, valid_rows))
         
-        # Get nutrition from daily meal plan
-        meal_plan_nutrition = daily_meal_plan.get('daily_nutrition', {})
+        results = []
+        for row, ok in zip(rows, valid):
+            if ok:
+                prediction, probability = next(predictions)
+                results.append(build_assessment(model, row, prediction, probability, encoded_meal_plan=True))
+            else:
+                results.append({'error': 'Invalid input data'})
         
-        return jsonify({
-            'prediction': int(prediction),
-            'probability': probability,
-            'risk_factors': risk_factors,
-            'risk_level': risk_level,
-            'accuracy': 0.952,
-            'nutrition': nutrition,
-            'daily_meal_plan': daily_meal_plan,
-            'meal_plan_nutrition': meal_plan_nutrition
+        return json_response({
+            'count': len(results),
+            'invalid': len(results) - len(valid_rows),
+            'results': results
         })
-            
+    
     except Exception as e:
         return jsonify({
-            'error': 'Prediction failed',
+            'error': 'Batch prediction failed',
             'message': str(e)
         }), 500
 
-@api_bp.route('/health', methods=['GET'])
-def health():
-    return jsonify({
+def health_status():
+    """The /api/health body, shared with the async server"""
+    model = model_manager.current
+    info = model_info(model)
+    return {
         'status': 'healthy', 
         'model_loaded': model is not None,
-        'version': '1.0.0',
-        'endpoints': ['/api/predict', '/api/health']
-    })
+        'ready': ready,
+        'version': info['version'],
+        'accuracy': info['accuracy'],
+        'model_metrics': info['metrics'],
+        'meal_plan_cache': food_recommender.plan_cache.stats(),
+        'model_reload': model_manager.stats(),
+        'report_jobs': report_jobs.stats(),
+        'predict_batching': predict_batcher.stats() if predict_batcher else None,
+        'predict_cache': predict_cache.stats() if predict_cache else None,
+        'endpoints': ['/api/predict', '/api/predict/batch', '/api/health', '/api/metrics']
+    }
+
+
+@api_bp.route('/health', methods=['GET'])
+def health():
+    return jsonify(health_status())
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request latencies, in-flight requests, model fallbacks and cache stats
+    in the Prometheus text exposition format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@api_bp.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 only once the model and caches are warmed up"""
+    if not ready:
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({'status': 'ready'})
+
+
+def admin_required(view):
+    """Require the X-Admin-Token header to match ADMIN_TOKEN; without ADMIN_TOKEN the admin endpoints are off"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get('ADMIN_TOKEN')
+        if not token:
+            return jsonify({'error': 'Forbidden', 'message': 'Admin endpoints are disabled; set ADMIN_TOKEN'}), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@api_bp.route('/admin/reload-model', methods=['POST'])
+@admin_required
+def reload_model():
+    """Pin a registry version for every worker (no version: unpin) and swap it in here.
+
+    Workers running the model watcher follow the pin within MODEL_WATCH_INTERVAL.
+    """
+    version = (request.get_json(silent=True) or {}).get('version')
+    registry = model_manager.registry
+    if version is not None and (not isinstance(version, str) or version not in registry.versions()):
+        return jsonify({'error': 'Model reload failed', 'message': f'Unknown model version {version!r}'}), 404
+    try:
+        if version is None:
+            registry.unpin()
+        else:
+            registry.pin(version)
+        swapped = model_manager.reload()
+    except RegistryError as e:
+        return jsonify({'error': 'Model reload failed', 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': 'Model reload failed', 'message': str(e)}), 500
+    return jsonify({'reloaded': swapped, **model_manager.stats()})
+
+
+def _profiler():
+    return current_app.extensions.get('profiler')
+
+
+@api_bp.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Profiles saved by the request profiler, newest first"""
+    profiler = _profiler()
+    if profiler is None:
+        return jsonify({'error': 'Profiling is not enabled', 'message': 'Set PROFILE_SAMPLE_RATE, PROFILE_ENDPOINTS or PROFILE_SLOW_MS'}), 404
+    return jsonify({'profiler': profiler.stats(), 'profiles': profiler.profiles()})
+
+
+@api_bp.route('/admin/profiles/collapsed', methods=['GET'])
+@admin_required
+def merged_profile():
+    """All saved profiles (or those of `?endpoint=`) summed into one collapsed-stack file"""
+    profiler = _profiler()
+    if profiler is None:
+        return jsonify({'error': 'Profiling is not enabled'}), 404
+    return Response(profiler.merged(request.args.get('endpoint')), mimetype='text/plain')
+
+
+@api_bp.route('/admin/profiles/<name>', methods=['GET'])
+@admin_required
+def get_profile(name):
+    """One saved profile in collapsed-stack format, ready for flamegraph.pl or speedscope"""
+    profiler = _profiler()
+    path = profiler.path(name) if profiler is not None else None
+    if path is None:
+        return jsonify({'error': 'Unknown profile', 'name': name}), 404
+    return send_file(str(path), mimetype='text/plain', as_attachment=True, download_name=name)
 
 
 @api_bp.route('/run-tests', methods=['GET', 'POST'])
@@ -122,6 +464,12 @@ def run_tests():
         return jsonify({'error': 'Failed to run tests', 'message': str(e)}), 500
 
 
+def report_inputs(model, data):
+    """Everything render_report needs for one validated patient"""
+    from .bulk_reports import report_args
+    prediction, probability = predict_diabetes(model, data)
+    return report_args(food_recommender, data, prediction, probability)
+
 @api_bp.route('/report', methods=['POST'])
 def generate_report():
     """Generate a PDF report for a user payload: includes inputs, risk, probabilities,
@@ -134,171 +482,120 @@ def generate_report():
         if not validate_input_data(data):
             return jsonify({'error': 'Invalid input data'}), 400
 
-        # Run prediction using existing model loader
-        prediction, probability = predict_diabetes(model, data)
-
-        # Determine risk level
-        diabetic_prob = probability[1] if isinstance(probability, list) else probability
-        if diabetic_prob < 0.3:
-            risk_level = "Low"
-        elif diabetic_prob < 0.6:
-            risk_level = "Moderate"
-        else:
-            risk_level = "High"
-        
-        # Calculate nutrition and get daily meal plan
-        nutrition = calculate_nutrition_needs(
-            data['bmi'], data['age'], data['glucose'], prediction == 1
-        )
-        
-        daily_meal_plan = food_recommender.get_daily_meal_plan(data, risk_level, "Vegetarian")
-
-        # Build PDF in memory
-        buffer = io.BytesIO()
-        doc = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-
-        # --- Header ---
-        title = 'Diabetes Risk Assessment Report'
-        header_height = inch * 0.9
-        # colored header box
-        doc.setFillColor(colors.HexColor('#0b74de'))
-        doc.rect(0, height - header_height, width, header_height, stroke=0, fill=1)
-        doc.setFillColor(colors.white)
-        doc.setFont('Helvetica-Bold', 20)
-        doc.drawCentredString(width / 2.0, height - header_height / 2 + 6, title)
-        # subtitle timestamp
-        doc.setFont('Helvetica', 9)
-        ts = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
-        doc.drawCentredString(width / 2.0, height - header_height / 2 - 12, f'Report generated: {ts}')
-
-        # content frame
-        x_margin = inch * 0.6
-        y = height - header_height - 18
-        line_height = 14
-
-        # Draw user inputs as a two-column table-like block
-        doc.setFont('Helvetica-Bold', 12)
-        doc.setFillColor(colors.black)
-        doc.drawString(x_margin, y, 'User Inputs')
-        y -= line_height
-        doc.setFont('Helvetica', 10)
-        left_keys = ['pregnancies', 'glucose', 'bloodPressure', 'skinThickness']
-        right_keys = ['insulin', 'bmi', 'diabetesPedigreeFunction', 'age']
-        max_rows = max(len(left_keys), len(right_keys))
-        col_gap = 220
-        for i in range(max_rows):
-            lx = x_margin
-            rx = x_margin + col_gap
-            if i < len(left_keys):
-                k = left_keys[i]
-                v = data.get(k, '')
-                doc.drawString(lx, y, f'{k}: {v}')
-            if i < len(right_keys):
-                k = right_keys[i]
-                v = data.get(k, '')
-                doc.drawString(rx, y, f'{k}: {v}')
-            y -= line_height
-
-        y -= line_height / 2
-
-        # Risk box
-        box_height = line_height * 3
-        box_width = width - x_margin * 2
-        doc.setFillColor(colors.HexColor('#fdecea') if prediction == 1 else colors.HexColor('#eef7f9'))
-        doc.rect(x_margin, y - box_height + 6, box_width, box_height, stroke=0, fill=1)
-        # Risk text
-        doc.setFillColor(colors.black)
-        doc.setFont('Helvetica-Bold', 12)
-        doc.drawString(x_margin + 6, y - 6, 'Risk Summary')
-        doc.setFont('Helvetica', 10)
-        risk_text = 'HIGH RISK' if prediction == 1 else 'LOW / MODERATE RISK'
-        prob_text = f'Probability (neg,pos): {probability}' if isinstance(probability, (list, tuple)) else ''
-        doc.drawString(x_margin + 6, y - 6 - line_height, f'Prediction: {risk_text} (class={int(prediction)})')
-        doc.drawString(x_margin + 6, y - 6 - line_height * 2, prob_text)
-        y -= box_height + line_height
-
-        # Nutrition
-        doc.setFont('Helvetica-Bold', 12)
-        doc.drawString(x_margin, y, 'Recommended Nutrition')
-        y -= line_height
-        doc.setFont('Helvetica', 10)
-        doc.drawString(x_margin + 6, y, f"Calories: {nutrition.get('calories')}, Protein: {nutrition.get('protein')} g, Carbs: {nutrition.get('carbs')} g")
-        y -= line_height * 1.5
-
-        # Daily Meal Plan
-        doc.setFont('Helvetica-Bold', 12)
-        doc.drawString(x_margin, y, 'Recommended Daily Meal Plan')
-        y -= line_height * 1.5
-        
-        # Daily nutrition summary
-        if daily_meal_plan.get('daily_nutrition'):
-            dn = daily_meal_plan['daily_nutrition']
-            doc.setFont('Helvetica-Bold', 11)
-            doc.drawString(x_margin + 6, y, 'Daily Nutrition Summary')
-            y -= line_height
-            doc.setFont('Helvetica', 10)
-            doc.drawString(x_margin + 12, y, f"Total Calories: {dn.get('calories', 0)} | Protein: {dn.get('protein', 0)}g | Fiber: {dn.get('fiber', 0)}g | Avg GI: {dn.get('avg_gi', 0)}")
-            y -= line_height * 1.5
-
-        def draw_meal_group(meal_title, foods, y):
-            if not foods:
-                return y
-            doc.setFont('Helvetica-Bold', 11)
-            doc.drawString(x_margin + 6, y, f'{meal_title.capitalize()} ({len(foods)} items)')
-            y -= line_height
-            doc.setFont('Helvetica', 9)
-            for food in foods:
-                title = food.get('title', '')
-                calories = food.get('calories', 0)
-                protein = food.get('protein', 0)
-                fiber = food.get('fiber', 0)
-                gi = food.get('gi_index', 0)
-                risk = food.get('risk_level', '')
-                text = f'• {title} — {calories} kcal, {protein}g protein, {fiber}g fiber, GI: {gi} ({risk} risk)'
-                
-                # Simple text wrapping
-                if len(text) > 85:
-                    words = text.split()
-                    line1 = ' '.join(words[:12])
-                    line2 = '  ' + ' '.join(words[12:])
-                    doc.drawString(x_margin + 12, y, line1)
-                    y -= line_height * 0.8
-                    doc.drawString(x_margin + 12, y, line2)
-                else:
-                    doc.drawString(x_margin + 12, y, text)
-                
-                y -= line_height
-                if y < inch * 1.5:
-                    doc.showPage()
-                    y = height - inch
-            return y - line_height * 0.3
-
-        # Draw each meal section
-        for meal_type in ['breakfast', 'lunch', 'dinner', 'snacks']:
-            foods = daily_meal_plan.get(meal_type, [])
-            if foods:
-                y = draw_meal_group(meal_type, foods, y)
-                y -= line_height * 0.5
-
-        # Footer
-        if y < inch:
-            doc.showPage()
-            y = height - inch
-        doc.setFont('Helvetica-Oblique', 9)
-        doc.drawString(x_margin, inch * 0.6, 'This report is for informational purposes only and not medical advice.')
-
-        doc.save()
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name='diabetes_report.pdf', mimetype='application/pdf')
+        from .report_renderer import render_report
+        pdf = render_report(**report_inputs(model_manager.current, data))
+        return send_file(io.BytesIO(pdf), as_attachment=True, download_name='diabetes_report.pdf', mimetype='application/pdf')
 
     except Exception as e:
         return jsonify({'error': 'Failed to generate report', 'message': str(e)}), 500
 
+def _job_status(job_id, status):
+    body = {
+        'job_id': job_id,
+        'status': status,
+        'status_url': f'/api/report/jobs/{job_id}',
+    }
+    if status == 'done':
+        body['pdf_url'] = f'/api/report/jobs/{job_id}/pdf'
+    elif status == 'failed':
+        body['error'] = report_jobs.error(job_id)
+    return body
+
+@api_bp.route('/report/jobs', methods=['POST'])
+def submit_report_job():
+    """Queue a PDF report for background rendering.
+
+    Returns 202 with a job id derived from the report contents, so posting
+    the same patient twice returns the same job instead of rendering again.
+    """
+    try:
+        data = request.json or {}
+        if not validate_input_data(data):
+            return jsonify({'error': 'Invalid input data'}), 400
+
+        job_id = report_jobs.submit(report_inputs(model_manager.current, data))
+        return jsonify(_job_status(job_id, report_jobs.status(job_id))), 202
+
+    except QueueFullError as e:
+        response = jsonify({'error': 'Report queue is full', 'message': str(e)})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except Exception as e:
+        return jsonify({'error': 'Failed to queue report', 'message': str(e)}), 500
+
+@api_bp.route('/report/jobs/<job_id>', methods=['GET'])
+def report_job_status(job_id):
+    """Status of a report job; `?wait=<seconds>` long-polls until it finishes"""
+    wait = min(request.args.get('wait', 0, type=float), 30.0)
+    status = report_jobs.wait(job_id, wait) if wait > 0 else report_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown report job', 'job_id': job_id}), 404
+    return jsonify(_job_status(job_id, status))
+
+@api_bp.route('/report/jobs/<job_id>/pdf', methods=['GET'])
+def report_job_pdf(job_id):
+    status = report_jobs.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown report job', 'job_id': job_id}), 404
+    if status != 'done':
+        return jsonify(_job_status(job_id, status)), 409
+    return send_file(str(report_jobs.pdf_path(job_id)), as_attachment=True, download_name='diabetes_report.pdf', mimetype='application/pdf')
+
+@api_bp.route('/report/bulk', methods=['POST'])
+def generate_bulk_report():
+    """Reports for a whole roster: a ZIP of per-patient PDFs or, with
+    `?format=pdf`, one combined PDF.
+
+    The roster is a CSV or NDJSON body, or a multipart upload named
+    `roster`. Rows are scored in batches and the ZIP is streamed out as it
+    is built; invalid rows are listed instead of failing the whole roster.
+    The combined PDF is built in full before it is sent, so it is limited
+    to BULK_PDF_MAX_ROWS rows (413 past that).
+    """
+    from .bulk_reports import (
+        RosterTooLargeError, combined_pdf_max_rows, iter_reports, read_roster, roster_format, stream_zip,
+        write_combined_pdf,
+    )
+    output = request.args.get('format', 'zip')
+    if output not in ('zip', 'pdf'):
+        return jsonify({'error': 'format must be zip or pdf'}), 400
+
+    upload = request.files.get('roster')
+    if upload is not None:
+        fmt = roster_format(upload.filename, upload.mimetype)
+        stream = upload.stream
+    else:
+        fmt = roster_format(mimetype=request.mimetype)
+        stream = request.stream
+    lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    reports = iter_reports(model_manager.current, food_recommender, read_roster(lines, fmt))
+
+    if output == 'pdf':
+        # send_file closes the temporary file once the response is sent
+        pdf = tempfile.TemporaryFile()
+        max_rows = combined_pdf_max_rows()
+        try:
+            write_combined_pdf(reports, pdf, max_rows)
+        except RosterTooLargeError as e:
+            pdf.close()
+            return jsonify({
+                'error': 'Roster too large for a combined PDF',
+                'message': f'{e}; request the ZIP output instead',
+                'max_rows': max_rows,
+            }), 413
+        pdf.seek(0)
+        return send_file(pdf, as_attachment=True, download_name='diabetes_reports.pdf', mimetype='application/pdf')
+
+    return Response(
+        stream_with_context(stream_zip(reports)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': 'attachment; filename=diabetes_reports.zip'},
+    )
+
 @api_bp.route('/', methods=['GET'])
 def root():
     return jsonify({
         'message': 'Diabetes Prediction API',
         'status': 'running',
-        'endpoints': ['/api/predict', '/api/health']
+        'endpoints': ['/api/predict', '/api/predict/batch', '/api/health']
     })
\ No newline at end of file
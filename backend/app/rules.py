@@ -0,0 +1,164 @@
+"""
+Clinical threshold rules as data.
+
+Every threshold the API applies to patient inputs or probabilities lives in
+one of the tables below. Each table is compiled once into sorted NumPy
+edges, and evaluated with `searchsorted`, so the same rule works on a
+single value or on a whole column:
+
+    >>> BMI_CATEGORY(27.0)
+    'Overweight'
+    >>> BMI_CATEGORY(np.array([17.0, 22.0, 35.0]))
+    array(['Underweight', 'Normal', 'Obese'], dtype='<U11')
+
+Scalars in give Python scalars out, so single-patient responses keep
+their exact types. They are looked up with `bisect` on the same edges,
+which matches `searchsorted` and avoids NumPy call overhead per request.
+"""
+from bisect import bisect_left, bisect_right
+from numbers import Real
+
+import numpy as np
+
+
+class Ladder:
+    """Piecewise-constant rule over one input.
+
+    `steps` are ascending (op, bound, value) tuples read like an if/elif
+    chain: the first step whose `x <op> bound` holds gives the value,
+    otherwise `default`. op is '<' or '<='.
+    """
+
+    def __init__(self, steps, default):
+        edges = []
+        for op, bound, _ in steps:
+            if op == '<':
+                edges.append(float(bound))
+            elif op == '<=':
+                # x <= b  <=>  x < nextafter(b, inf), so every edge is exclusive
+                edges.append(np.nextafter(float(bound), np.inf))
+            else:
+                raise ValueError(f"Unsupported comparison {op!r}")
+        if edges != sorted(edges):
+            raise ValueError("Ladder steps must be in ascending order")
+        self.steps = list(steps)
+        self.default = default
+        self.edges = np.array(edges)
+        self.values = np.array([value for _, _, value in steps] + [default])
+        self._edge_list = self.edges.tolist()
+        self._value_list = self.values.tolist()
+
+    def index(self, x):
+        """Position of the step that applies to each x"""
+        return np.searchsorted(self.edges, np.asarray(x, dtype=float), side='right')
+
+    def __call__(self, x):
+        if isinstance(x, Real):
+            return self._value_list[bisect_right(self._edge_list, x)]
+        return self.values[self.index(x)]
+
+
+class Above:
+    """Flag rule: `field > threshold`, with an optional weight"""
+
+    def __init__(self, field, threshold, weight=0.0):
+        self.field = field
+        self.threshold = threshold
+        self.weight = weight
+        self.edges = np.array([float(threshold)])
+        self._edge_list = self.edges.tolist()
+
+    def __call__(self, x):
+        if isinstance(x, Real):
+            return bisect_left(self._edge_list, x) == 1
+        return np.searchsorted(self.edges, np.asarray(x, dtype=float), side='left') == 1
+
+
+# --- Tables -------------------------------------------------------------------
+
+# Probability of the diabetic class -> risk level
+RISK_LEVEL = Ladder([('<', 0.3, 'Low'), ('<', 0.6, 'Moderate')], 'High')
+
+# Inputs reported as risk factors by /api/predict, in response order
+RISK_FACTORS = [
+    Above('glucose', 140),
+    Above('bmi', 30),
+    Above('age', 60),
+    Above('bloodPressure', 90),
+]
+
+# Additive score used when no trained model is available
+FALLBACK_SCORE = [
+    Above('glucose', 140, 0.3),
+    Above('bmi', 30, 0.2),
+    Above('age', 60, 0.15),
+    Above('bloodPressure', 90, 0.1),
+    Above('diabetesPedigreeFunction', 1.0, 0.1),
+]
+FALLBACK_POSITIVE = Above('score', 0.4)
+
+# Used when the model call itself fails: any flag makes the patient high risk
+EMERGENCY_HIGH_RISK = [
+    Above('glucose', 140),
+    Above('bmi', 30),
+]
+EMERGENCY_PROBABILITY = {True: [0.3, 0.7], False: [0.8, 0.2]}
+
+BMI_CATEGORY = Ladder([('<', 18.5, 'Underweight'), ('<', 25, 'Normal'), ('<', 30, 'Overweight')], 'Obese')
+
+GLUCOSE_CATEGORY = Ladder([('<', 70, 'Low'), ('<=', 140, 'Normal'), ('<=', 199, 'Pre-diabetic')], 'Diabetic')
+
+# BMI band the food scoring and meal plan cache branch on
+FOOD_BMI_BAND = Ladder([('<', 18.5, 'underweight'), ('<=', 30, 'normal')], 'obese')
+
+# Daily nutrition targets
+BASE_CALORIES = Ladder([('<', 18.5, 2200), ('<=', 25, 2000), ('<=', 30, 1800)], 1600)
+AGE_CALORIE_ADJUSTMENT = Ladder([('<', 30, 100), ('<=', 60, 0)], -200)
+HIGH_GLUCOSE = Above('glucose', 140)
+PROTEIN_SHARE = 0.20           # of calories, 4 kcal per gram
+CARB_SHARE_HIGH_RISK = 0.30    # for high risk or high glucose patients
+CARB_SHARE = 0.50
+FIBER_TARGET = 25              # grams per day, for multi-day meal plans
+
+
+# --- Evaluators ---------------------------------------------------------------
+
+def risk_factors(data):
+    """Names of the risk factors present for one patient dict"""
+    return [rule.field for rule in RISK_FACTORS if rule(data[rule.field])]
+
+
+def risk_factor_matrix(columns):
+    """(n_rows, len(RISK_FACTORS)) boolean matrix for a dict of columns"""
+    return np.column_stack([rule(np.asarray(columns[rule.field])) for rule in RISK_FACTORS])
+
+
+def fallback_score(columns):
+    """Rule-based diabetic probability for a dict of columns"""
+    score = np.zeros(len(np.asarray(columns['glucose'])))
+    for rule in FALLBACK_SCORE:
+        score += np.where(rule(np.asarray(columns[rule.field])), rule.weight, 0.0)
+    return score
+
+
+def emergency_high_risk(data):
+    """Whether the emergency rules flag one patient dict as high risk"""
+    return any(rule(data[rule.field]) for rule in EMERGENCY_HIGH_RISK)
+
+
+def daily_calories(bmi, age):
+    """Daily calorie target for scalars or equally sized arrays"""
+    return BASE_CALORIES(bmi) + AGE_CALORIE_ADJUSTMENT(age)
+
+
+def nutrition_targets(bmi, age, glucose, is_high_risk):
+    """(calories, protein, carbs) for scalars or equally sized arrays"""
+    calories = daily_calories(bmi, age)
+    if isinstance(calories, int):
+        carb_share = CARB_SHARE_HIGH_RISK if is_high_risk or HIGH_GLUCOSE(glucose) else CARB_SHARE
+        return calories, int(calories * PROTEIN_SHARE / 4), int(calories * carb_share / 4)
+
+    protein = (calories * PROTEIN_SHARE / 4).astype(int)
+    low_carb = np.logical_or(is_high_risk, HIGH_GLUCOSE(glucose))
+    carbs = (np.where(low_carb, calories * CARB_SHARE_HIGH_RISK, calories * CARB_SHARE) / 4).astype(int)
+    return calories, protein, carbs
@@ -0,0 +1,41 @@
+"""
+JSON encoding for API responses, using orjson when it is installed
+"""
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency, fall back to the stdlib encoder
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+
+class RawJSON(str):
+    """Already encoded JSON text that dumps splices into the output verbatim"""
+
+
+def _encode(obj):
+    """Encode a value that holds no RawJSON, matching jsonify's key order"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'))
+
+
+def dumps(obj):
+    """Encode obj to JSON text, splicing any RawJSON fragments it contains"""
+    if isinstance(obj, RawJSON):
+        return obj
+    if isinstance(obj, dict):
+        items = sorted(obj.items())
+        return '{' + ','.join(_encode(key) + ':' + dumps(value) for key, value in items) + '}'
+    if isinstance(obj, (list, tuple)):
+        return '[' + ','.join(dumps(value) for value in obj) + ']'
+    return _encode(obj)
+
+
+def json_response(payload, status=200):
+    """Flask response for payload, encoded with dumps"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
@@ -1,60 +1,71 @@
+from numbers import Real
+
+import numpy as np
+
+from .rules import BMI_CATEGORY, GLUCOSE_CATEGORY, nutrition_targets
+
 def calculate_nutrition_needs(bmi, age, glucose, is_high_risk):
     """Calculate personalized nutrition requirements"""
-    # Base calorie calculation
-    calories = 2000
-    if bmi > 30: calories = 1600
-    elif bmi > 25: calories = 1800
-    elif bmi < 18.5: calories = 2200
-    
-    # Age adjustment
-    if age > 60: calories -= 200
-    elif age < 30: calories += 100
-    
-    # Protein calculation (15-25% of calories)
-    protein = int((calories * 0.20) / 4)  # 20% of calories from protein
-    
-    # Carb calculation based on diabetes risk
-    if is_high_risk or glucose > 140:
-        carbs = int((calories * 0.30) / 4)  # 30% for diabetics
-    else:
-        carbs = int((calories * 0.50) / 4)  # 50% for healthy individuals
-    
+    calories, protein, carbs = nutrition_targets(bmi, age, glucose, is_high_risk)
     return {'calories': calories, 'protein': protein, 'carbs': carbs}
 
+REQUIRED_FIELDS = [
+    'pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
+    'insulin', 'bmi', 'diabetesPedigreeFunction', 'age'
+]
+
+# Inclusive (min, max) range accepted for each input field
+INPUT_RANGES = {
+    'pregnancies': (0, 20),
+    'glucose': (0, 300),
+    'bloodPressure': (0, 200),
+    'skinThickness': (0, 100),
+    'insulin': (0, 1000),
+    'bmi': (0, 100),
+    'diabetesPedigreeFunction': (0, 5),
+    'age': (0, 120),
+}
+
 def validate_input_data(data):
     """Validate input data for prediction"""
-    required_fields = [
-        'pregnancies', 'glucose', 'bloodPressure', 'skinThickness',
-        'insulin', 'bmi', 'diabetesPedigreeFunction', 'age'
-    ]
-    
     # Check if all required fields are present
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in data:
             return False
     
     # Basic range validation
-    if not (0 <= data['pregnancies'] <= 20): return False
-    if not (0 <= data['glucose'] <= 300): return False
-    if not (0 <= data['bloodPressure'] <= 200): return False
-    if not (0 <= data['skinThickness'] <= 100): return False
-    if not (0 <= data['insulin'] <= 1000): return False
-    if not (0 <= data['bmi'] <= 100): return False
-    if not (0 <= data['diabetesPedigreeFunction'] <= 5): return False
-    if not (0 <= data['age'] <= 120): return False
+    for field in REQUIRED_FIELDS:
+        low, high = INPUT_RANGES[field]
+        if not (low <= data[field] <= high): return False
     
     return True
 
+def validate_input_batch(rows):
+    """Validate a list of input payloads at once.
+
+    Returns a boolean numpy array with one entry per row. Rows that are not
+    dicts, miss a field or carry a non-numeric value are marked invalid
+    instead of raising.
+    """
+    values = np.full((len(rows), len(REQUIRED_FIELDS)), np.nan)
+    for i, row in enumerate(rows):
+        if isinstance(row, dict) and all(isinstance(row.get(f), Real) for f in REQUIRED_FIELDS):
+            values[i] = [row[f] for f in REQUIRED_FIELDS]
+    return validate_input_matrix(values)
+
+def validate_input_matrix(values):
+    """Range-check an (n_rows, 8) float matrix in REQUIRED_FIELDS order.
+
+    NaN marks a missing or non-numeric value and fails validation.
+    """
+    low = np.array([INPUT_RANGES[f][0] for f in REQUIRED_FIELDS], dtype=float)
+    high = np.array([INPUT_RANGES[f][1] for f in REQUIRED_FIELDS], dtype=float)
+    return ((values >= low) & (values <= high)).all(axis=1)
+
 def calculate_bmi_category(bmi):
     """Calculate BMI category"""
-    if bmi < 18.5: return 'Underweight'
-    elif bmi < 25: return 'Normal'
-    elif bmi < 30: return 'Overweight'
-    else: return 'Obese'
+    return BMI_CATEGORY(bmi)
 
 def calculate_glucose_category(glucose):
     """Calculate glucose category"""
-    if glucose < 70: return 'Low'
-    elif glucose <= 140: return 'Normal'
-    elif glucose <= 199: return 'Pre-diabetic'
-    else: return 'Diabetic'
\ No newline at end of file
+    return GLUCOSE_CATEGORY(glucose)
@@ -0,0 +1,133 @@
+"""Connections handled at 1k concurrent clients: the async server vs the Flask app.
+
+    python -m benchmarks.bench_async --clients 1000 --workers 2
+
+Each server is started on its own: gunicorn with sync workers (the current
+deployment), gunicorn with gthread workers, and `python -m app.async_api`.
+One client process then opens --clients connections at once. Each client
+sends --requests requests (70% /api/predict, 30% /api/health) with a random
+think time of up to --think seconds between them, like browser tabs.
+
+Per server the table shows how many clients had every request answered
+with any HTTP response ("handled"), the responses by outcome, and the
+latency of the successful ones. "shed" are 503s from the async server's
+in-flight limit; "failed" are connection errors and requests that got no
+response within --timeout seconds.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+
+from benchmarks.common import BACKEND_DIR, load_patients
+from benchmarks.load_test import start_server, wait_until_ready
+
+
+async def client(session, url, bodies, requests, think, rng, results):
+    """Send `requests` requests on one connection; record (route, status, seconds)"""
+    handled = True
+    for _ in range(requests):
+        await asyncio.sleep(rng.uniform(0, think))
+        predict = rng.random() < 0.7
+        began = time.perf_counter()
+        try:
+            if predict:
+                response = await session.post(f'{url}/api/predict', data=rng.choice(bodies),
+                                              headers={'Content-Type': 'application/json'})
+            else:
+                response = await session.get(f'{url}/api/health')
+            async with response:
+                await response.read()
+            status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            status = 0
+            handled = False
+        results.append(('predict' if predict else 'health', status, time.perf_counter() - began))
+    return handled
+
+
+async def drive(url, clients, requests, think, timeout, seed=0):
+    """(wall seconds, clients handled, [(route, status, seconds)]) for `clients` concurrent clients"""
+    bodies = [json.dumps(patient) for patient in load_patients(500)]
+    results = []
+    # One connection per client; keep-alive wherever the server allows it
+    sessions = [aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1),
+                                      timeout=aiohttp.ClientTimeout(total=timeout))
+                for _ in range(clients)]
+    began = time.perf_counter()
+    try:
+        handled = await asyncio.gather(*[
+            client(session, url, bodies, requests, think, random.Random(seed + i), results)
+            for i, session in enumerate(sessions)
+        ])
+    finally:
+        await asyncio.gather(*[session.close() for session in sessions])
+    return time.perf_counter() - began, sum(handled), results
+
+
+def summarize(wall, handled, results):
+    statuses = np.array([status for _, status, _ in results])
+    ok = np.array([seconds for _, status, seconds in results if status == 200]) * 1000
+    p50, p99 = np.percentile(ok, [50, 99]) if len(ok) else (float('nan'), float('nan'))
+    return {
+        'handled': handled,
+        'ok': int((statuses == 200).sum()),
+        'shed': int((statuses == 503).sum()),
+        'failed': int((statuses == 0).sum()),
+        'other': int(((statuses != 200) & (statuses != 503) & (statuses != 0)).sum()),
+        'ok_per_s': len(ok) / wall,
+        'p50_ms': p50,
+        'p99_ms': p99,
+    }
+
+
+def start_async_server(workers, max_in_flight, port):
+    return subprocess.Popen(
+        [sys.executable, '-m', 'app.async_api', '--host', '127.0.0.1', '--port', str(port),
+         '--workers', str(workers), '--max-in-flight', str(max_in_flight)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=5, help='requests per client')
+    parser.add_argument('--think', type=float, default=1.0, help='max seconds between requests of a client')
+    parser.add_argument('--timeout', type=float, default=10.0, help='seconds before a request counts as failed')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers / async executor threads')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    parser.add_argument('--port', type=int, default=5097)
+    args = parser.parse_args(argv)
+
+    servers = [
+        (f'gunicorn sync {args.workers}w', lambda: start_server(args.workers, 1, args.port)),
+        (f'gunicorn gthread {args.workers}x{args.threads}', lambda: start_server(args.workers, args.threads, args.port)),
+        (f'async {args.workers} threads', lambda: start_async_server(args.workers, args.max_in_flight, args.port)),
+    ]
+    url = f'http://127.0.0.1:{args.port}'
+    print(f"{args.clients} clients x {args.requests} requests, think time up to {args.think:g} s, "
+          f"timeout {args.timeout:g} s")
+    print(f"{'server':>22} | {'handled':>7} | {'ok':>5} | {'shed':>5} | {'failed':>6} | {'ok/s':>6} | "
+          f"{'p50':>9} | {'p99':>9}")
+    print("-" * 90)
+    for label, start in servers:
+        server = start()
+        try:
+            wait_until_ready(url)
+            s = summarize(*asyncio.run(drive(url, args.clients, args.requests, args.think, args.timeout)))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{label:>22} | {s['handled']:>7} | {s['ok']:>5} | {s['shed']:>5} | {s['failed'] + s['other']:>6} | "
+              f"{s['ok_per_s']:>6.0f} | {s['p50_ms']:>6.1f} ms | {s['p99_ms']:>6.1f} ms")
+
+if __name__ == '__main__':
+    main()
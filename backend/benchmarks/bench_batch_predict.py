@@ -0,0 +1,39 @@
+"""Throughput of /api/predict/batch against repeated /api/predict calls.
+
+Run from the backend folder so the model is found the same way run.py finds it:
+
+    python -m benchmarks.bench_batch_predict
+"""
+from benchmarks.common import load_patients, time_call
+
+from app import create_app
+
+BATCH_SIZES = [1, 100, 10000]
+
+# Repeated single calls are slow, so cap how many we time and extrapolate
+SINGLE_CALL_LIMIT = 200
+
+def main():
+    client = create_app().test_client()
+    
+    print(f"{'batch size':>10} | {'single rows/s':>14} | {'batch rows/s':>13} | speedup")
+    print("-" * 56)
+    for size in BATCH_SIZES:
+        patients = load_patients(size)
+        singles = patients[:SINGLE_CALL_LIMIT]
+        
+        def run_singles():
+            for patient in singles:
+                client.post('/api/predict', json=patient)
+        
+        def run_batch():
+            response = client.post('/api/predict/batch', json=patients)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        
+        repeat = 3 if size < 10000 else 1
+        single_rate = len(singles) / time_call(run_singles, repeat)
+        batch_rate = size / time_call(run_batch, repeat)
+        print(f"{size:>10} | {single_rate:>14,.0f} | {batch_rate:>13,.0f} | {batch_rate / single_rate:6.1f}x")
+
+if __name__ == '__main__':
+    main()
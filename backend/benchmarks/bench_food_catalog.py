@@ -0,0 +1,62 @@
+"""Resident size of the food data per layout as the catalog grows.
+
+    python -m benchmarks.bench_food_catalog
+
+"frame + records" is what FoodRecommender used to keep: the CSV DataFrame
+(pandas deep memory usage) plus one formatted record dict and one
+pre-rendered JSON fragment per row. "catalog" is the FoodCatalog that
+replaced them, measured with tracemalloc while it is built. "recommend"
+is get_recommendations latency for 10 foods on the catalog, to show that
+decoding rows on demand does not cost the request path.
+"""
+import json
+import tracemalloc
+
+from benchmarks.bench_meal_planner import scaled_catalog
+from benchmarks.common import time_call
+
+from app.food_catalog import FoodCatalog
+from app.food_recommender import FoodRecommender
+
+SIZES = [220, 10_000, 100_000]
+PATIENT = {'bmi': 31.0, 'age': 52, 'glucose': 150}
+
+def allocated(build):
+    """Bytes still allocated by build() once it returns, and its result"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+def frame_layout(food_data):
+    records = [
+        {
+            'title': row['title'], 'icon': row['icon'], 'calories': int(row['calories']),
+            'protein': round(float(row['protein_g']), 1), 'fiber': round(float(row['fiber_g']), 1),
+            'gi_index': int(row['gi_index']), 'weight': f"{row['weight_g']}g", 'risk_level': row['risk'],
+            'region': row['region'], 'benefit': row['benefit'],
+        }
+        for row in food_data.to_dict(orient='records')
+    ]
+    fragments = [json.dumps(record, sort_keys=True) for record in records]
+    return records, fragments
+
+def main():
+    base = FoodRecommender().food_data
+    print(f"{'rows':>8} | {'frame + records':>15} | {'catalog':>10} | {'ratio':>6} | {'recommend':>10}")
+    print("-" * 64)
+    for size in SIZES:
+        food_data = scaled_catalog(base, size)
+        frame = food_data.memory_usage(deep=True).sum()
+        records, _ = allocated(lambda: frame_layout(food_data))
+        catalog, _ = allocated(lambda: FoodCatalog.from_frame(food_data))
+
+        recommender = FoodRecommender()
+        recommender.set_food_data(food_data)
+        recommend = time_call(lambda: recommender.get_recommendations(PATIENT, 'High', count=10), repeat=20)
+        print(f"{size:>8,} | {(frame + records) / 2**20:>12.2f} MB | {catalog / 2**20:>7.2f} MB"
+              f" | {(frame + records) / catalog:>5.1f}x | {recommend * 1e3:>7.3f} ms")
+
+if __name__ == '__main__':
+    main()
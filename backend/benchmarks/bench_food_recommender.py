@@ -0,0 +1,39 @@
+"""Per-call latency of FoodRecommender.get_daily_meal_plan, before and after.
+
+    python -m benchmarks.bench_food_recommender
+"""
+import time
+
+from benchmarks.common import load_patients
+from benchmarks.legacy import LegacyFoodRecommender
+
+from app.food_recommender import FoodRecommender
+
+CALLS = 500
+RISK_LEVELS = ['Low', 'Moderate', 'High']
+
+def per_call_us(recommender, patients):
+    start = time.perf_counter()
+    for i, patient in enumerate(patients):
+        recommender.get_daily_meal_plan(patient, RISK_LEVELS[i % 3], "Vegetarian")
+    return (time.perf_counter() - start) / len(patients) * 1e6
+
+def main():
+    patients = load_patients(CALLS)
+    legacy = LegacyFoodRecommender()
+    uncached = FoodRecommender(plan_cache_size=0)
+    cached = FoodRecommender()
+    
+    # Warm up every path once
+    for recommender in (legacy, uncached, cached):
+        per_call_us(recommender, patients[:10])
+    
+    before = per_call_us(legacy, patients)
+    print(f"get_daily_meal_plan over {CALLS} calls")
+    print(f"  pandas filtering : {before:8.1f} us/call")
+    for label, recommender in (('scoring engine', uncached), ('plan cache', cached)):
+        after = per_call_us(recommender, patients)
+        print(f"  {label:<17}: {after:8.1f} us/call  ({before / after:.1f}x faster)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Food search latency as the catalog grows from 220 to 1M rows.
+
+    python -m benchmarks.bench_food_search
+
+The catalog is scaled with bench_meal_planner.scaled_catalog, which appends
+the copy number to every title, so "moong 0" matches the same 9 foods at
+every size while "moong dal" matches ~4% of the catalog. Every query asks
+for the first page of 20 results plus the total count. "pandas scan" is the
+same filtered name query done with str.contains over the DataFrame.
+"""
+import time
+
+from benchmarks.bench_meal_planner import scaled_catalog
+
+from app.food_catalog import FoodCatalog
+from app.food_recommender import FoodRecommender
+from app.food_search import FoodSearchIndex
+
+SIZES = [220, 10_000, 100_000, 1_000_000]
+QUERIES = [
+    ('moong 0', {}),
+    ('moong dal', {}),
+    ('moong dal', {'region': 'West', 'ranges': {'gi_index': (None, 55)}}),
+    ('', {'diet_type': 'Vegetarian', 'ranges': {'calories': (180, 185)}}),
+]
+
+def median_us(fn, repeat=21):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[repeat // 2] * 1e6
+
+def pandas_scan(food_data):
+    mask = food_data['title'].str.contains('moong', case=False) | food_data['examples'].str.contains('moong', case=False)
+    return food_data.index[mask & (food_data['region'] == 'West') & (food_data['gi_index'] <= 55)][:20]
+
+def main():
+    base = FoodRecommender().food_data
+    labels = [f"{query or '*'} {' '.join(sorted(options))}".strip() for query, options in QUERIES]
+    print(f"{'rows':>9} | {'build':>7} | " + ' | '.join(f"{label:>26}" for label in labels)
+          + f" | {'autocomplete mo':>15} | {'pandas scan':>11}")
+    for size in SIZES:
+        food_data = scaled_catalog(base, size)
+        catalog = FoodCatalog.from_frame(food_data)
+        start = time.perf_counter()
+        index = FoodSearchIndex(catalog)
+        build = time.perf_counter() - start
+
+        cells = []
+        for query, options in QUERIES:
+            total = index.search(query, **options)[0]
+            cells.append(f"{median_us(lambda: index.search(query, **options)):>8.1f} us ({total:>7,})")
+        autocomplete = median_us(lambda: index.autocomplete('mo'))
+        scan = median_us(lambda: pandas_scan(food_data), repeat=5)
+        print(f"{size:>9,} | {build:>5.2f} s | " + ' | '.join(f"{cell:>26}" for cell in cells)
+              + f" | {autocomplete:>12.1f} us | {scan / 1e3:>8.1f} ms")
+
+if __name__ == '__main__':
+    main()
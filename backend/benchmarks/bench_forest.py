@@ -0,0 +1,44 @@
+"""Latency of the compiled NumPy forest against sklearn's predict_proba.
+
+Needs model/model.pkl from ml/train_model.py:
+
+    python -m benchmarks.bench_forest
+"""
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import BACKEND_DIR, load_patients
+
+from app.model_loader import FEATURE_NAMES, CompiledForest, build_feature_matrix
+
+def latencies_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+def main():
+    with open(BACKEND_DIR / 'model' / 'model.pkl', 'rb') as f:
+        model = pickle.load(f)
+    forest = CompiledForest.from_sklearn(model)
+    
+    print(f"{'rows':>6} | {'engine':<8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    print("-" * 40)
+    for rows, runs in ((1, 500), (10000, 20)):
+        X = build_feature_matrix(load_patients(rows))
+        X_df = pd.DataFrame(X, columns=FEATURE_NAMES)
+        
+        max_diff = np.abs(model.predict_proba(X_df) - forest.predict_proba(X)).max()
+        assert max_diff <= 1e-12, max_diff
+        
+        for name, fn in (('sklearn', lambda: model.predict_proba(X_df)), ('compiled', lambda: forest.predict_proba(X))):
+            p50, p99 = latencies_ms(fn, runs)
+            print(f"{rows:>6} | {name:<8} | {p50:8.3f} | {p99:8.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Meal planner latency as the food catalog grows from 220 to 200k rows.
+
+    python -m benchmarks.bench_meal_planner
+
+The catalog is scaled by repeating the shipped CSV with jittered nutrition
+values and a distinct dish name per copy. "first plan" is the first
+plan_meals call for a risk level and BMI band, which scans the catalog for
+candidates; "planner" is every later call (e.g. a new calorie target);
+"full plan" adds scoring and response formatting (get_daily_meal_plan
+with the plan cache disabled).
+"""
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import time_call
+
+from app.food_recommender import FoodRecommender
+from app.meal_planner import plan_meals
+
+SIZES = [220, 2_000, 20_000, 200_000]
+PATIENT = {'bmi': 31.0, 'age': 52, 'glucose': 150}
+
+def scaled_catalog(base, size, seed=0):
+    rng = np.random.default_rng(seed)
+    copies = -(-size // len(base))
+    catalog = pd.concat([base] * copies, ignore_index=True).head(size)
+    copy = np.arange(size) // len(base)
+    catalog['title'] = catalog['title'].str.replace(r'\s*\(', ' ', regex=True).str.rstrip(')') + ' #' + copy.astype(str)
+    jitter = rng.uniform(0.85, 1.15, size)
+    catalog['calories'] = (catalog['calories'] * jitter).round().astype(int)
+    catalog['gi_index'] = np.clip(catalog['gi_index'] + rng.integers(-5, 6, size), 0, 100)
+    return catalog
+
+def main():
+    base = FoodRecommender().food_data
+    print(f"{'rows':>8} | {'first plan':>10} | {'planner':>10} | {'full plan':>10}")
+    print("-" * 49)
+    for size in SIZES:
+        recommender = FoodRecommender(plan_cache_size=0)
+        recommender.set_food_data(scaled_catalog(base, size))
+
+        engine = recommender.engine
+        partition = engine.partition('Vegetarian', 'Low')
+        scores = engine.score(partition, PATIENT, 'High')
+        first = time_call(lambda: plan_meals(engine, partition, scores, 1600), repeat=20)
+        plan_meals(engine, partition, scores, 1600, cache_key=('High', 'obese'))
+        planner = time_call(lambda: plan_meals(engine, partition, scores, 1600, cache_key=('High', 'obese')), repeat=50)
+        full = time_call(lambda: recommender.get_daily_meal_plan(PATIENT, 'High'), repeat=20)
+        print(f"{size:>8,} | {first * 1e3:>7.3f} ms | {planner * 1e3:>7.3f} ms | {full * 1e3:>7.3f} ms")
+
+if __name__ == '__main__':
+    main()
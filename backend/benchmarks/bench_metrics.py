@@ -0,0 +1,69 @@
+"""Cost of the request metrics on the /api/predict path.
+
+    python -m benchmarks.bench_metrics
+
+"per request" replays what one /api/predict records: the in-flight
+gauge up and down, the request histogram and status counter, and five
+stage laps. "predict" is a full test-client request for scale, and
+"render" one /api/metrics scrape with every series populated. "lock" is
+one uncontended acquire and release, the unit most of the per request
+cost is made of, to compare machines.
+"""
+import threading
+from time import perf_counter
+
+from benchmarks.common import load_patients, time_call
+
+from app import create_app
+from app.metrics import Registry
+
+N = 100_000
+STAGES = ('validate', 'model', 'nutrition', 'meal_plan', 'encode')
+
+def main():
+    registry = Registry()
+    request_seconds = registry.histogram('request_duration_seconds', 'Requests', ('endpoint',))
+    requests = registry.counter('requests_total', 'Requests', ('endpoint', 'status'))
+    in_flight = registry.gauge('requests_in_flight', 'In flight', ('endpoint',))
+    stage_seconds = registry.histogram('stage_duration_seconds', 'Stages', ('endpoint', 'stage'))
+
+    def record():
+        started = perf_counter()
+        in_flight.inc(('api.predict',))
+        timer = stage_seconds.timer('predict')
+        for stage in STAGES:
+            timer.lap(stage)
+        in_flight.dec(('api.predict',))
+        request_seconds.observe(('api.predict',), perf_counter() - started)
+        requests.inc(('api.predict', '200'))
+
+    def record_many():
+        for _ in range(N):
+            record()
+
+    def empty_loop():
+        for _ in range(N):
+            pass
+
+    lock = threading.Lock()
+
+    def lock_loop():
+        for _ in range(N):
+            with lock:
+                pass
+
+    per_request = (time_call(record_many, repeat=3) - time_call(empty_loop, repeat=3)) / N
+    render = time_call(registry.render, repeat=20)
+    lock_cost = (time_call(lock_loop, repeat=3) - time_call(empty_loop, repeat=3)) / N
+
+    client = create_app().test_client()
+    patient = load_patients(1)[0]
+    predict = time_call(lambda: client.post('/api/predict', json=patient), repeat=200)
+
+    print(f"per request: {per_request * 1e6:6.2f} us")
+    print(f"predict:     {predict * 1e6:6.0f} us ({per_request / predict:.1%} spent on metrics)")
+    print(f"render:      {render * 1e6:6.0f} us")
+    print(f"lock:        {lock_cost * 1e6:6.2f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Time to build 30-day meal plans for 10k patients.
+
+    python -m benchmarks.bench_multi_day_plans
+
+Patients are sampled from the Pima dataset with round-robin risk levels.
+"uncached" plans every patient from scratch (one score vector and one
+candidate scan per patient, then 30 planner runs); it is timed on a
+sample and extrapolated. "plan cache" is get_multi_day_plan as served,
+where patients sharing a diet, risk level, BMI band and calorie target
+share a plan. "swap" is one default swap on a cached plan.
+"""
+import time
+
+from benchmarks.common import load_patients
+
+from app.food_recommender import FoodRecommender
+
+PATIENTS = 10_000
+UNCACHED_SAMPLE = 200
+DAYS = 30
+RISK_LEVELS = ['Low', 'Moderate', 'High']
+
+def run(recommender, patients, swaps=()):
+    start = time.perf_counter()
+    for i, patient in enumerate(patients):
+        recommender.get_multi_day_plan(patient, RISK_LEVELS[i % 3], "Vegetarian", DAYS, swaps)
+    return time.perf_counter() - start
+
+def main():
+    patients = load_patients(PATIENTS)
+    uncached = FoodRecommender(plan_cache_size=0)
+    cached = FoodRecommender()
+    run(uncached, patients[:3])
+
+    sample = run(uncached, patients[:UNCACHED_SAMPLE]) / UNCACHED_SAMPLE
+    total = run(cached, patients)
+    swap = run(cached, patients[:1000], [{'day': 15, 'meal': 'lunch', 'index': 0}]) / 1000
+    plans = len(cached.multi_day_cache)
+
+    print(f"{DAYS}-day plans for {PATIENTS:,} patients")
+    print(f"  uncached   : {sample * 1e3:8.2f} ms/patient  (~{sample * PATIENTS:.0f} s total)")
+    print(f"  plan cache : {total / PATIENTS * 1e3:8.2f} ms/patient  ({total:.1f} s total, {plans} distinct plans)")
+    print(f"  + 1 swap   : {swap * 1e3:8.2f} ms/patient")
+
+if __name__ == '__main__':
+    main()
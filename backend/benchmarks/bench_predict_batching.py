@@ -0,0 +1,71 @@
+"""Throughput and latency of single-patient predictions with and without micro-batching.
+
+    python -m benchmarks.bench_predict_batching --threads 1 8 32 64
+
+Each of --threads client threads scores --calls patients one at a time,
+either with predict_diabetes directly or through a PredictBatcher with
+each --windows value (milliseconds). The table shows rows per second, the
+p50/p99 latency of a call and the mean batch size.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import load_patients
+from app.model_loader import load_model, predict_diabetes
+from app.predict_batcher import PredictBatcher
+
+
+def run(predict, patients, threads, calls):
+    """(rows per second, latencies in seconds) of `threads` threads making `calls` calls each"""
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def client(i):
+        barrier.wait()
+        for j in range(calls):
+            data = patients[(i * calls + j) % len(patients)]
+            started = time.perf_counter()
+            predict(data)
+            latencies[i].append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return threads * calls / elapsed, np.concatenate(latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--windows', type=float, nargs='+', default=[1, 2, 5], help='batching windows in ms')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--calls', type=int, default=200, help='calls per thread')
+    args = parser.parse_args(argv)
+
+    model = load_model()
+    patients = load_patients(2000)
+    print(f"{'threads':>7} | {'mode':>13} | {'rows/s':>8} | {'p50':>8} | {'p99':>8} | {'batch':>5}")
+    print("-" * 64)
+    for threads in args.threads:
+        modes = [('direct', None)] + [(f'batch {w:g} ms', PredictBatcher(w / 1000, args.max_batch))
+                                      for w in args.windows]
+        for label, batcher in modes:
+            if batcher is None:
+                predict = lambda data: predict_diabetes(model, data)
+            else:
+                predict = lambda data, batcher=batcher: batcher.predict(model, data)
+            rate, latencies = run(predict, patients, threads, args.calls)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            batch = f"{batcher.stats()['mean_batch_size']:>5.1f}" if batcher else f"{1:>5}"
+            print(f"{threads:>7} | {label:>13} | {rate:>8.0f} | {p50:>5.2f} ms | {p99:>5.2f} ms | {batch}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""/api/predict latency with the request profiler off and on.
+
+    python -m benchmarks.bench_profiler
+
+"sampled 1%" profiles one request in a hundred; "slow capture" tracks
+every request so the slow ones can be kept, which keeps the sampler
+thread running for the whole benchmark; "always" profiles every request
+and writes every profile, the worst case.
+"""
+import tempfile
+
+from benchmarks.common import load_patients, time_call
+
+from app import create_app
+from app.profiler import RequestProfiler
+
+REQUESTS = 300
+CONFIGS = [
+    ('off', None),
+    ('sampled 1%', {'sample_rate': 0.01}),
+    ('slow capture', {'slow_ms': 250}),
+    ('always', {'sample_rate': 1.0}),
+]
+
+def main():
+    patients = load_patients(REQUESTS)
+    print(f"{'profiler':>12} | {'per request':>11} | {'saved':>5} | {'samples':>7}")
+    print("-" * 46)
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, options in CONFIGS:
+            profiler = RequestProfiler(output_dir=tmp, max_profiles=REQUESTS, **options) if options else None
+            client = create_app(profiler=profiler).test_client()
+
+            def run():
+                for patient in patients:
+                    client.post('/api/predict', json=patient)
+
+            per_request = time_call(run, repeat=3) / REQUESTS
+            stats = profiler.stats() if profiler else {'saved': 0, 'samples': 0}
+            print(f"{label:>12} | {per_request * 1e6:>8.0f} us | {stats['saved']:>5} | {stats['samples']:>7}")
+
+if __name__ == '__main__':
+    main()
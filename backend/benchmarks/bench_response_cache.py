@@ -0,0 +1,61 @@
+"""Latency of /api/predict without the response cache, on a miss, and on in-process and shared hits.
+
+    python -m benchmarks.bench_response_cache --requests 2000
+
+Requests go through the Flask test client, so the numbers include routing,
+validation and the response object but no network.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import load_patients
+from app import create_app, routes
+from app.response_cache import ResponseCache
+
+
+def latencies(client, patients):
+    """Milliseconds per POST /api/predict, one per patient"""
+    out = []
+    for data in patients:
+        started = time.perf_counter()
+        client.post('/api/predict', json=data)
+        out.append((time.perf_counter() - started) * 1000)
+    return np.array(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    client = create_app(warm_up=True).test_client()
+    # Distinct payloads, so the first pass through a cache only misses
+    patients = [{**p, 'age': 21 + i % 60, 'insulin': i} for i, p in enumerate(load_patients(args.requests))]
+    saved = routes.predict_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'responses.sqlite'
+        runs = [('no cache', None)]
+        for label, make in (('memory', lambda: ResponseCache(args.requests)),
+                            ('memory + sqlite', lambda: ResponseCache(args.requests, path=path))):
+            cache = make()
+            runs += [(f'{label} miss', cache), (f'{label} hit', cache)]
+        # Another worker: its memory tier is empty, the shared file is not
+        runs.append(('sqlite hit, other worker', ResponseCache(args.requests, path=path)))
+
+        print(f"{'mode':>26} | {'p50':>8} | {'p99':>8} | {'mean':>8}")
+        print("-" * 60)
+        try:
+            for label, cache in runs:
+                routes.predict_cache = cache
+                ms = latencies(client, patients)
+                p50, p99 = np.percentile(ms, [50, 99])
+                print(f"{label:>26} | {p50:>5.3f} ms | {p99:>5.3f} ms | {ms.mean():>5.3f} ms")
+        finally:
+            routes.predict_cache = saved
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Cold start of the API process: a fresh interpreter importing and building the app.
+
+    python -m benchmarks.bench_startup
+
+Each stage is timed in its own interpreter (best of 5): importing
+app.routes, create_app() (model and food catalog loaded), create_app()
+followed by the first /api/report (which imports reportlab), and
+create_app(warm_up=True). "catalog" compares building the food catalog
+from the CSV with pandas, validating and compiling its snapshot (in full
+and after editing one row) and memory-mapping the snapshot.
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import BACKEND_DIR, time_call
+
+from app.catalog_snapshot import build_snapshot, load_snapshot
+from app.food_catalog import FOOD_DATA_PATH, load_catalog
+
+REPEAT = 5
+PATIENT = {'pregnancies': 2, 'glucose': 150, 'bloodPressure': 80, 'skinThickness': 30,
+           'insulin': 120, 'bmi': 31.0, 'diabetesPedigreeFunction': 0.6, 'age': 52}
+STAGES = [
+    ('import app.routes', 'import app.routes'),
+    ('create_app()', 'from app import create_app; create_app()'),
+    ('+ first /api/report', 'from app import create_app; '
+                            f'create_app().test_client().post("/api/report", json={PATIENT!r})'),
+    ('create_app(warm_up=True)', 'from app import create_app; create_app(warm_up=True)'),
+]
+HEAVY_MODULES = ('pandas', 'reportlab', 'sklearn')
+
+TIMED = '''
+import json, sys, time
+started = time.perf_counter()
+{code}
+print(json.dumps([time.perf_counter() - started, [m for m in {heavy!r} if m in sys.modules]]))
+'''
+
+
+def cold(code):
+    """Best wall time of `code` in a fresh interpreter, and the heavy modules it imported"""
+    best, modules = float('inf'), []
+    for _ in range(REPEAT):
+        result = subprocess.run([sys.executable, '-c', TIMED.format(code=code, heavy=HEAVY_MODULES)],
+                                cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+        seconds, modules = json.loads(result.stdout.splitlines()[-1])
+        best = min(best, seconds)
+    return best, modules
+
+def main():
+    print(f"{'stage':>26} | {'cold':>9} | heavy modules imported")
+    print("-" * 62)
+    for label, code in STAGES:
+        seconds, modules = cold(code)
+        print(f"{label:>26} | {seconds * 1e3:>6.0f} ms | {', '.join(modules) or '-'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv, snapshot = Path(tmp) / 'foods.csv', Path(tmp) / 'foods.snapshot'
+        lines = FOOD_DATA_PATH.read_text(encoding='utf-8').splitlines(keepends=True)
+        csv.write_text(''.join(lines), encoding='utf-8')
+        from_csv = time_call(lambda: load_catalog(csv))
+
+        def full_build():
+            snapshot.unlink(missing_ok=True)
+            build_snapshot(csv, snapshot)
+        full = time_call(full_build)
+
+        def edit_one_row():
+            lines[1] = lines[1].replace(',5,', ',4,', 1) if ',5,' in lines[1] else lines[1].replace(',4,', ',5,', 1)
+            csv.write_text(''.join(lines), encoding='utf-8')
+            return build_snapshot(csv, snapshot)
+        assert edit_one_row()['parsed'] == 1
+        incremental = time_call(edit_one_row)
+        mapped = time_call(lambda: load_snapshot(snapshot, csv), repeat=50)
+    print(f"\ncatalog: {from_csv * 1e3:.1f} ms from the CSV (pandas already imported), "
+          f"{full * 1e3:.1f} ms to build the snapshot, {incremental * 1e3:.1f} ms after editing one row, "
+          f"{mapped * 1e6:.0f} us to load it")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Shared helpers for the backend benchmark scripts"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DIABETES_CSV = BACKEND_DIR.parent / 'ml' / 'data' / 'diabetes.csv'
+
+# Make `import app` work no matter where a benchmark is launched from
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+COLUMN_TO_FIELD = {
+    'Pregnancies': 'pregnancies',
+    'Glucose': 'glucose',
+    'BloodPressure': 'bloodPressure',
+    'SkinThickness': 'skinThickness',
+    'Insulin': 'insulin',
+    'BMI': 'bmi',
+    'DiabetesPedigreeFunction': 'diabetesPedigreeFunction',
+    'Age': 'age',
+}
+
+def load_patients(n, seed=42):
+    """Sample n API payloads (with replacement) from the Pima diabetes dataset"""
+    df = pd.read_csv(DIABETES_CSV)
+    sample = df.sample(n=n, replace=True, random_state=seed)
+    sample = sample[list(COLUMN_TO_FIELD)].rename(columns=COLUMN_TO_FIELD)
+    return [
+        {field: (int(value) if float(value).is_integer() else float(value)) for field, value in row.items()}
+        for row in sample.to_dict(orient='records')
+    ]
+
+def time_call(fn, repeat=5):
+    """Return the best wall time in seconds over `repeat` calls of fn()"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,300 @@
+"""Reference copies of code paths that have since been optimized.
+
+Kept verbatim so benchmarks can time the old behaviour and tests can check
+that the optimized versions still return the same results.
+"""
+
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+class LegacyFoodRecommender:
+    def __init__(self):
+        self.food_data = None
+        self.load_food_data()
+    
+    def load_food_data(self):
+        """Load the Indian food dataset"""
+        try:
+            data_path = Path(__file__).parent.parent.parent / 'ml' / 'data' / 'indian_food_weighted_220.csv'
+            self.food_data = pd.read_csv(data_path)
+        except Exception as e:
+            print(f"Error loading food data: {e}")
+            self.food_data = pd.DataFrame()
+    
+    def get_recommendations(self, patient_data, risk_level, diet_preference="Vegetarian", count=10):
+        """
+        Recommend foods based on patient condition
+        
+        Args:
+            patient_data: dict with patient health metrics
+            risk_level: str - "Low", "Moderate", "High" 
+            diet_preference: str - "Vegetarian" or "Non-Vegetarian"
+            count: int - number of recommendations
+        """
+        if self.food_data.empty:
+            return []
+        
+        # Filter by diet preference
+        filtered_foods = self.food_data[
+            self.food_data['diet_type'] == diet_preference
+        ].copy()
+        
+        # Calculate recommendation score based on patient condition
+        filtered_foods['score'] = self._calculate_score(filtered_foods, patient_data, risk_level)
+        
+        # Sort by score and get top recommendations
+        recommendations = filtered_foods.nlargest(count, 'score')
+        
+        return self._format_recommendations(recommendations)
+    
+    def _calculate_score(self, foods, patient_data, risk_level):
+        """Calculate recommendation score for each food"""
+        scores = np.zeros(len(foods))
+        
+        # Base scoring factors
+        gi_weight = 0.4
+        fiber_weight = 0.2
+        protein_weight = 0.2
+        risk_weight = 0.2
+        
+        # GI Index scoring (lower is better for diabetics)
+        gi_scores = 100 - foods['gi_index']  # Invert GI (lower GI = higher score)
+        scores += gi_weight * (gi_scores / 100)
+        
+        # Fiber scoring (higher is better)
+        fiber_scores = foods['fiber_g'] * 20  # Scale fiber content
+        scores += fiber_weight * np.minimum(fiber_scores / 100, 1)
+        
+        # Protein scoring (moderate protein is good)
+        protein_scores = np.minimum(foods['protein_g'] * 10, 100)
+        scores += protein_weight * (protein_scores / 100)
+        
+        # Risk-based scoring
+        risk_mapping = {'Low': 1.0, 'Moderate': 0.7, 'High': 0.4}
+        food_risk_scores = foods['risk'].map(risk_mapping).fillna(0.5)
+        
+        if risk_level == "High":
+            # High-risk patients need low-risk foods
+            scores += risk_weight * food_risk_scores
+        elif risk_level == "Moderate":
+            # Moderate-risk patients can have moderate-risk foods
+            scores += risk_weight * (1 - abs(food_risk_scores - 0.7))
+        else:
+            # Low-risk patients can have varied foods
+            scores += risk_weight * 0.8
+        
+        # BMI-based adjustments
+        if 'bmi' in patient_data:
+            bmi = patient_data['bmi']
+            if bmi > 30:  # Obese - prefer lower calorie foods
+                calorie_penalty = foods['calories'] / 1000
+                scores -= 0.1 * calorie_penalty
+            elif bmi < 18.5:  # Underweight - prefer higher calorie foods
+                calorie_bonus = foods['calories'] / 1000
+                scores += 0.1 * calorie_bonus
+        
+        return np.maximum(scores, 0)  # Ensure non-negative scores
+    
+    def _format_recommendations(self, recommendations):
+        """Format recommendations for API response"""
+        formatted = []
+        
+        for _, food in recommendations.iterrows():
+            formatted.append({
+                'title': food['title'],
+                'icon': food['icon'],
+                'calories': int(food['calories']),
+                'protein': round(food['protein_g'], 1),
+                'fiber': round(food['fiber_g'], 1),
+                'gi_index': int(food['gi_index']),
+                'weight': f"{int(food['weight_g'])}g",
+                'risk_level': food['risk'],
+                'region': food['region'],
+                'benefit': food['benefit'],
+                'score': round(food['score'], 2)
+            })
+        
+        return formatted
+    
+    def get_daily_meal_plan(self, patient_data, risk_level, diet_preference="Vegetarian"):
+        """Generate a complete daily meal plan with specific foods"""
+        if self.food_data.empty:
+            return {}
+        
+        # Filter foods by diet preference and risk level
+        suitable_foods = self.food_data[
+            (self.food_data['diet_type'] == diet_preference) &
+            (self.food_data['risk'] == self._get_suitable_food_risk(risk_level))
+        ].copy()
+        
+        if suitable_foods.empty:
+            suitable_foods = self.food_data[self.food_data['diet_type'] == diet_preference].copy()
+        
+        # Calculate scores
+        suitable_foods['score'] = self._calculate_score(suitable_foods, patient_data, risk_level)
+        suitable_foods = suitable_foods.sort_values('score', ascending=False)
+        
+        # Select best foods for each meal
+        breakfast_foods = self._select_meal_foods(suitable_foods, 'breakfast', 2)
+        lunch_foods = self._select_meal_foods(suitable_foods, 'lunch', 2) 
+        dinner_foods = self._select_meal_foods(suitable_foods, 'dinner', 2)
+        snacks = self._select_meal_foods(suitable_foods, 'snacks', 1)
+        
+        return {
+            'breakfast': breakfast_foods,
+            'lunch': lunch_foods,
+            'dinner': dinner_foods,
+            'snacks': snacks,
+            'daily_nutrition': self._calculate_daily_nutrition(breakfast_foods + lunch_foods + dinner_foods + snacks)
+        }
+    
+    def _get_suitable_food_risk(self, patient_risk):
+        """Map patient risk to suitable food risk"""
+        if patient_risk == "High":
+            return "Low"
+        elif patient_risk == "Moderate":
+            return "Moderate"
+        else:
+            return "Low"
+    
+    def _select_meal_foods(self, foods, meal_type, count):
+        """Select appropriate foods for specific meal type"""
+        # Meal-specific filtering logic
+        if meal_type == 'breakfast':
+            meal_foods = foods[foods['gi_index'] < 60].head(count * 3)  # Lower GI for breakfast
+        elif meal_type == 'lunch':
+            meal_foods = foods[(foods['calories'] >= 200) & (foods['calories'] <= 400)].head(count * 3)
+        elif meal_type == 'dinner':
+            meal_foods = foods[(foods['calories'] >= 150) & (foods['calories'] <= 350)].head(count * 3)
+        else:  # snacks
+            meal_foods = foods[foods['calories'] < 200].head(count * 3)
+        
+        # Select top foods and format
+        selected = meal_foods.head(count)
+        return self._format_recommendations(selected)
+    
+    def _calculate_daily_nutrition(self, all_foods):
+        """Calculate total daily nutrition"""
+        total_calories = sum(food['calories'] for food in all_foods)
+        total_protein = sum(food['protein'] for food in all_foods)
+        total_fiber = sum(food['fiber'] for food in all_foods)
+        
+        return {
+            'calories': total_calories,
+            'protein': round(total_protein, 1),
+            'fiber': round(total_fiber, 1),
+            'avg_gi': round(sum(food['gi_index'] for food in all_foods) / len(all_foods), 1) if all_foods else 0
+        }
+
+# --- Scalar threshold rules, before app.rules ---------------------------------
+
+def calculate_nutrition_needs(bmi, age, glucose, is_high_risk):
+    """Calculate personalized nutrition requirements"""
+    # Base calorie calculation
+    calories = 2000
+    if bmi > 30: calories = 1600
+    elif bmi > 25: calories = 1800
+    elif bmi < 18.5: calories = 2200
+    
+    # Age adjustment
+    if age > 60: calories -= 200
+    elif age < 30: calories += 100
+    
+    # Protein calculation (15-25% of calories)
+    protein = int((calories * 0.20) / 4)  # 20% of calories from protein
+    
+    # Carb calculation based on diabetes risk
+    if is_high_risk or glucose > 140:
+        carbs = int((calories * 0.30) / 4)  # 30% for diabetics
+    else:
+        carbs = int((calories * 0.50) / 4)  # 50% for healthy individuals
+    
+    return {'calories': calories, 'protein': protein, 'carbs': carbs}
+
+def calculate_bmi_category(bmi):
+    """Calculate BMI category"""
+    if bmi < 18.5: return 'Underweight'
+    elif bmi < 25: return 'Normal'
+    elif bmi < 30: return 'Overweight'
+    else: return 'Obese'
+
+def calculate_glucose_category(glucose):
+    """Calculate glucose category"""
+    if glucose < 70: return 'Low'
+    elif glucose <= 140: return 'Normal'
+    elif glucose <= 199: return 'Pre-diabetic'
+    else: return 'Diabetic'
+
+def risk_factors(data):
+    risk_factors = []
+    if data['glucose'] > 140: risk_factors.append('glucose')
+    if data['bmi'] > 30: risk_factors.append('bmi')
+    if data['age'] > 60: risk_factors.append('age')
+    if data['bloodPressure'] > 90: risk_factors.append('bloodPressure')
+    return risk_factors
+
+def risk_level(diabetic_prob):
+    if diabetic_prob < 0.3:
+        risk_level = "Low"
+    elif diabetic_prob < 0.6:
+        risk_level = "Moderate"
+    else:
+        risk_level = "High"
+    return risk_level
+
+def fallback_prediction(data):
+    risk_score = 0
+    if data['glucose'] > 140: risk_score += 0.3
+    if data['bmi'] > 30: risk_score += 0.2
+    if data['age'] > 60: risk_score += 0.15
+    if data['bloodPressure'] > 90: risk_score += 0.1
+    if data['diabetesPedigreeFunction'] > 1.0: risk_score += 0.1
+    
+    prediction = 1 if risk_score > 0.4 else 0
+    probability = [1 - risk_score, risk_score] if prediction == 1 else [0.8, 0.2]
+    return prediction, probability
+
+# --- Dict-based curated food lists, before app.food_catalog ---------------------
+
+def get_food_recommendations(is_high_risk, glucose_level, bmi, age, target_calories):
+    """
+    Get personalized food recommendations based on health parameters
+    """
+    from app.food_catalog import FOOD_DATABASE
+
+    # Determine GI category
+    if is_high_risk or glucose_level > 140:
+        gi_category = 'low_gi'
+    else:
+        gi_category = 'moderate_gi' if glucose_level > 100 else 'low_gi'
+    
+    recommendations = {}
+    
+    for meal_type in ['breakfast', 'lunch', 'dinner', 'snacks']:
+        # Get foods from appropriate GI category
+        foods = FOOD_DATABASE[meal_type][gi_category]
+        
+        # Sort by protein content for high-risk individuals
+        if is_high_risk:
+            foods = sorted(foods, key=lambda x: x['protein'], reverse=True)
+        
+        recommendations[meal_type] = foods[:4]  # Top 4 recommendations
+    
+    return recommendations
+
+def calculate_meal_plan_nutrition(meal_plan):
+    """
+    Calculate total nutrition for a meal plan
+    """
+    total_calories = sum(meal['calories'] for meal in meal_plan)
+    total_protein = sum(meal['protein'] for meal in meal_plan)
+    total_carbs = sum(meal['carbs'] for meal in meal_plan)
+    total_fiber = sum(meal.get('fiber', 0) for meal in meal_plan)
+    
+    return {
+        'calories': total_calories,
+        'protein': total_protein,
+        'carbs': total_carbs,
+        'fiber': total_fiber
+    }
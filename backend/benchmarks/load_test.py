@@ -0,0 +1,117 @@
+"""Throughput of the gunicorn deployment as the worker count grows.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` once per worker count, waits
+for /api/ready and then drives /api/predict from several client processes
+over keep-alive connections:
+
+    python -m benchmarks.load_test --workers 1 2 4 --clients 8 --duration 10
+
+Pass --url to load-test a server that is already running instead.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import BACKEND_DIR, load_patients
+
+def _client(url, patients, duration, results):
+    """Post patients in a loop for `duration` seconds, counting responses"""
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    bodies = [json.dumps(p) for p in patients]
+    headers = {'Content-Type': 'application/json'}
+    ok = errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        try:
+            conn.request('POST', '/api/predict', body=bodies[(ok + errors) % len(bodies)], headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=30)
+    results.put((ok, errors))
+
+def drive(url, clients, duration):
+    """Return (requests/sec, error count) for `clients` concurrent clients"""
+    patients = load_patients(500)
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_client, args=(url, patients[i::clients], duration, results))
+        for i in range(clients)
+    ]
+    for proc in procs:
+        proc.start()
+    counts = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    ok = sum(c[0] for c in counts)
+    return ok / duration, sum(c[1] for c in counts)
+
+def wait_until_ready(url, timeout=60):
+    target = urlparse(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(target.hostname, target.port, timeout=2)
+            conn.request('GET', '/api/ready')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready within {timeout}s")
+
+def start_server(workers, threads, port):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), WEB_THREADS=str(threads), BIND=f'127.0.0.1:{port}')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_workers = sorted({1, 2, 4, multiprocessing.cpu_count()})
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--url', help='load-test an already running server instead')
+    args = parser.parse_args()
+
+    if args.url:
+        wait_until_ready(args.url)
+        rate, errors = drive(args.url, args.clients, args.duration)
+        print(f"{args.url}: {rate:,.0f} req/s ({errors} errors)")
+        return
+
+    print(f"{multiprocessing.cpu_count()} CPU cores, {args.clients} clients, {args.duration:.0f}s per run")
+    print(f"{'workers':>7} | {'req/s':>8} | {'errors':>6} | scaling")
+    print("-" * 38)
+    baseline = None
+    for workers in args.workers:
+        server = start_server(workers, args.threads, args.port)
+        try:
+            url = f'http://127.0.0.1:{args.port}'
+            wait_until_ready(url)
+            rate, errors = drive(url, args.clients, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        baseline = baseline or rate
+        print(f"{workers:>7} | {rate:>8,.0f} | {errors:>6} | {rate / baseline:5.2f}x")
+
+if __name__ == '__main__':
+    main()
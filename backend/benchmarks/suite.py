@@ -0,0 +1,243 @@
+"""Latency and throughput of the API routes under a mixed workload.
+
+Clients send a fixed mix of predict, batch predict, report and health
+requests, built from patients sampled from ml/data/diabetes.csv, at each
+concurrency level. The app is driven in process through the Flask test
+client and as a real gunicorn server with several workers:
+
+    python -m benchmarks.suite                        # both modes
+    python -m benchmarks.suite --mode inprocess --check
+    python -m benchmarks.suite --update-baseline
+
+Every route gets its throughput and p50/p95/p99 latency. With --check the
+run fails (exit status 1) when a route errors, or its p50 or p95 is more
+than --tolerance slower than in benchmarks/baseline.json, or the total
+throughput at a concurrency level drops by more than that. Baselines are
+per machine: record one with --update-baseline before comparing.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.common import BACKEND_DIR, load_patients
+from benchmarks.load_test import start_server, wait_until_ready
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+BATCH_SIZE = 20
+
+# (route, share of the requests, method, path)
+WORKLOAD = [
+    ('predict', 0.60, 'POST', '/api/predict'),
+    ('batch_predict', 0.10, 'POST', '/api/predict/batch'),
+    ('report', 0.05, 'POST', '/api/report'),
+    ('health', 0.25, 'GET', '/api/health'),
+]
+ROUTES = [route for route, _, _, _ in WORKLOAD]
+
+
+def build_requests(patients, count, seed):
+    """`count` (route, method, path, JSON body) tuples drawn from WORKLOAD"""
+    rng = random.Random(seed)
+    picks = rng.choices(WORKLOAD, weights=[share for _, share, _, _ in WORKLOAD], k=count)
+    requests = []
+    for route, _, method, path in picks:
+        if route == 'batch_predict':
+            body = json.dumps(rng.sample(patients, BATCH_SIZE)).encode()
+        elif method == 'POST':
+            body = json.dumps(rng.choice(patients)).encode()
+        else:
+            body = None
+        requests.append((route, method, path, body))
+    return requests
+
+
+class FlaskClientSender:
+    """Sends requests through a Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def __call__(self, method, path, body):
+        response = self.client.open(path, method=method, data=body, content_type='application/json')
+        response.get_data()
+        return response.status_code
+
+
+class HTTPSender:
+    """Sends requests over one keep-alive HTTP connection"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = http.client.HTTPConnection(host, port, timeout=60)
+
+    def __call__(self, method, path, body):
+        headers = {'Content-Type': 'application/json'} if body else {}
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return 0
+
+
+def drive(make_sender, patients, concurrency, total, seed=0):
+    """Send `total` requests from `concurrency` threads.
+
+    Returns (wall seconds, {route: [(latency seconds, status), ...]}).
+    """
+    per_client = -(-total // concurrency)
+    plans = [build_requests(patients, per_client, seed + client) for client in range(concurrency)]
+    senders = [make_sender() for _ in range(concurrency)]
+    results = [[] for _ in range(concurrency)]
+    start = threading.Barrier(concurrency + 1)
+
+    def client(index):
+        send, record = senders[index], results[index].append
+        start.wait()
+        for route, method, path, body in plans[index]:
+            began = time.perf_counter()
+            status = send(method, path, body)
+            record((route, time.perf_counter() - began, status))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    by_route = {route: [] for route in ROUTES}
+    for client_results in results:
+        for route, latency, status in client_results:
+            by_route[route].append((latency, status))
+    return wall, by_route
+
+
+def summarize(wall, by_route):
+    """Per-route throughput, error count and latency percentiles in ms"""
+    summary = {}
+    for route, samples in by_route.items():
+        if not samples:
+            continue
+        latencies = np.array([latency for latency, _ in samples]) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[route] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, status in samples if not 200 <= status < 300),
+            'rps': round(len(samples) / wall, 1),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+        }
+    summary['total'] = {'requests': sum(len(s) for s in by_route.values()),
+                        'rps': round(sum(len(s) for s in by_route.values()) / wall, 1)}
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` against `baseline`, as readable strings"""
+    problems = []
+    for mode, levels in results.items():
+        for level, routes in levels.items():
+            reference = baseline.get(mode, {}).get(level)
+            where = f"{mode} c={level}"
+            for route, stats in routes.items():
+                if stats.get('errors'):
+                    problems.append(f"{where} {route}: {stats['errors']} failed requests")
+            if reference is None:
+                continue
+            for route, stats in routes.items():
+                base = reference.get(route)
+                if base is None:
+                    continue
+                for key in ('p50_ms', 'p95_ms'):
+                    if key in base and stats[key] > base[key] * (1 + tolerance):
+                        problems.append(f"{where} {route}: {key} {stats[key]:.2f} > baseline {base[key]:.2f}")
+                if route == 'total' and stats['rps'] < base['rps'] * (1 - tolerance):
+                    problems.append(f"{where}: {stats['rps']:.0f} req/s < baseline {base['rps']:.0f}")
+    return problems
+
+
+def print_summary(mode, level, summary):
+    print(f"\n{mode}, concurrency {level}: {summary['total']['rps']:,.0f} req/s")
+    print(f"{'route':>14} | {'req':>5} | {'err':>3} | {'req/s':>7} | {'p50':>9} | {'p95':>9} | {'p99':>9}")
+    for route in ROUTES:
+        if route in summary:
+            s = summary[route]
+            print(f"{route:>14} | {s['requests']:>5} | {s['errors']:>3} | {s['rps']:>7,.1f} | "
+                  f"{s['p50_ms']:>6.2f} ms | {s['p95_ms']:>6.2f} ms | {s['p99_ms']:>6.2f} ms")
+
+
+def run_inprocess(patients, levels, total):
+    from app import create_app
+    app = create_app(warm_up=True)
+    return {str(level): summarize(*drive(lambda: FlaskClientSender(app), patients, level, total))
+            for level in levels}
+
+
+def run_server(patients, levels, total, workers, port):
+    server = start_server(workers, 1, port)
+    try:
+        wait_until_ready(f'http://127.0.0.1:{port}')
+        return {str(level): summarize(*drive(lambda: HTTPSender('127.0.0.1', port), patients, level, total))
+                for level in levels}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['inprocess', 'server', 'all'], default='all')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--requests', type=int, default=400, help='requests per concurrency level')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers in server mode')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--check', action='store_true', help='fail on regressions against the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown, 0.5 = 50%%')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    patients = load_patients(1000)
+    results = {}
+    if args.mode in ('inprocess', 'all'):
+        results['inprocess'] = run_inprocess(patients, args.concurrency, args.requests)
+    if args.mode in ('server', 'all'):
+        results[f'server_{args.workers}w'] = run_server(patients, args.concurrency, args.requests, args.workers, args.port)
+    for mode, levels in results.items():
+        for level, summary in levels.items():
+            print_summary(mode, level, summary)
+
+    if args.update_baseline:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        for mode, levels in results.items():
+            baseline.setdefault(mode, {}).update(levels)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f"\nBaseline written to {args.baseline.relative_to(BACKEND_DIR)}")
+
+    if args.check:
+        baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        problems = compare(results, baseline, args.tolerance)
+        print()
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            return 1
+        print("No regressions against the baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
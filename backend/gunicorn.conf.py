@@ -0,0 +1,43 @@
+"""Gunicorn settings for serving the API in production.
+
+Every setting can be overridden from the environment:
+
+    WEB_CONCURRENCY   number of worker processes (default: one per CPU core)
+    WEB_THREADS       threads per worker (default: 1)
+    BIND              address to listen on (default: 0.0.0.0:5000)
+    GRACEFUL_TIMEOUT  seconds workers get to finish in-flight requests
+    MODEL_WATCH_INTERVAL  seconds between registry polls for hot model reload
+                      (default: 5; 0 turns the watcher off). Workers follow
+                      LATEST and pins set with POST /api/admin/reload-model
+
+`kill -HUP <master pid>` reloads this file and gracefully replaces the
+workers; the preloaded app in the master is reused, so new workers are
+ready as soon as they are forked.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = 60
+keepalive = 5
+
+# Load the model and food tables once in the master, then fork
+preload_app = True
+
+def when_ready(server):
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and un-share) those pages
+    gc.freeze()
+    server.log.info("Preloaded app frozen; spawning %s workers", server.num_workers)
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so each worker runs its own model watcher
+    interval = float(os.environ.get('MODEL_WATCH_INTERVAL', 5))
+    if interval > 0:
+        from app import routes
+        routes.model_manager.start_watcher(interval)
@@ -1,6 +1,17 @@
-from app import create_app
+import os
 
-app = create_app()
+from app import configure_logging, create_app
+
+configure_logging()
+# Serve right away and warm up in the background; /api/ready reports when done
+app = create_app(warm_up='background')
+
+# Follow new registry versions when asked to; under gunicorn the workers
+# start their own watchers after the fork (see gunicorn.conf.py)
+watch_interval = os.environ.get('MODEL_WATCH_INTERVAL')
+if watch_interval:
+    from app import routes
+    routes.model_manager.start_watcher(float(watch_interval))
 
 if __name__ == '__main__':
     print("Starting Diabetes Prediction API...")
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+from app.metrics import REGISTRY
+from app.predict_batcher import PredictBatcher
+from app.response_cache import ResponseCache
+
+try:
+    from aiohttp.test_utils import TestClient, TestServer
+    from app.async_api import LIMIT, create_async_app
+except ImportError:
+    TestClient = None
+
+PATIENT = {
+    'pregnancies': 3, 'glucose': 120, 'bloodPressure': 70, 'skinThickness': 20,
+    'insulin': 79, 'bmi': 24.0, 'diabetesPedigreeFunction': 0.47, 'age': 33,
+}
+
+
+@unittest.skipUnless(TestClient, 'aiohttp is not installed')
+class TestAsyncAPI(unittest.TestCase):
+
+    def requests(self, app, *requests):
+        """(status, headers, body bytes) per (method, path, kwargs) request, in order"""
+        async def run():
+            results = []
+            async with TestClient(TestServer(app)) as client:
+                for method, path, kwargs in requests:
+                    response = await client.request(method, path, **kwargs)
+                    results.append((response.status, response.headers, await response.read()))
+            return results
+        return asyncio.run(run())
+
+    def request(self, app, method, path, **kwargs):
+        return self.requests(app, (method, path, kwargs))[0]
+
+    def test_predict_matches_flask(self):
+        flask = create_app().test_client().post('/api/predict', json=PATIENT)
+        status, headers, body = self.request(create_async_app(workers=1), 'POST', '/api/predict', json=PATIENT)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Access-Control-Allow-Origin'], '*')
+        self.assertEqual(json.loads(body), flask.get_json())
+
+    def test_concurrent_predictions_share_micro_batches(self):
+        patients = [{**PATIENT, 'glucose': 80 + 5 * i} for i in range(16)]
+        flask = create_app().test_client()
+        expected = [flask.post('/api/predict', json=p).get_json() for p in patients]
+
+        async def run():
+            async with TestClient(TestServer(create_async_app(workers=1))) as client:
+                responses = await asyncio.gather(*[client.post('/api/predict', json=p) for p in patients])
+                return [json.loads(await response.read()) for response in responses]
+
+        saved, routes.predict_batcher = routes.predict_batcher, PredictBatcher(window=0.05)
+        try:
+            self.assertEqual(asyncio.run(run()), expected)
+            # One executor thread, yet requests waited for their batch together
+            self.assertLess(routes.predict_batcher.batches, len(patients))
+        finally:
+            routes.predict_batcher = saved
+
+    def test_responses_are_cached_in_the_shared_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            saved, routes.predict_cache = routes.predict_cache, ResponseCache(path=Path(tmp) / 'cache.sqlite')
+            try:
+                first, again = self.requests(create_async_app(workers=1), *[('POST', '/api/predict', {'json': PATIENT})] * 2)
+                # Another worker finds the response in the shared file
+                other = ResponseCache(path=Path(tmp) / 'cache.sqlite')
+                _, shared = other.get(PATIENT, routes.response_versions(routes.model_manager.current))
+            finally:
+                routes.predict_cache, cache = saved, routes.predict_cache
+        self.assertEqual(again[2], first[2])
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(shared.encode(), first[2])
+
+    def test_invalid_input_is_rejected(self):
+        bodies = ({'data': 'not json'}, {'json': [1, 2]}, {'json': {**PATIENT, 'glucose': 900}})
+        results = self.requests(create_async_app(workers=1), *[('POST', '/api/predict', kwargs) for kwargs in bodies])
+        for kwargs, (status, _, body) in zip(bodies, results):
+            self.assertEqual(status, 400, kwargs)
+            self.assertEqual(json.loads(body), {'error': 'Invalid input data'})
+
+    def test_wrongly_typed_fields_get_a_json_error(self):
+        payload = {**PATIENT, 'glucose': 'high'}
+        flask = create_app().test_client().post('/api/predict', json=payload)
+        (status, headers, body), (report_status, _, report_body) = self.requests(
+            create_async_app(workers=1), ('POST', '/api/predict', {'json': payload}), ('POST', '/api/report', {'json': payload})
+        )
+        self.assertEqual((status, headers['Content-Type'].split(';')[0]), (flask.status_code, 'application/json'))
+        self.assertEqual(json.loads(body), flask.get_json())
+        self.assertEqual((report_status, json.loads(report_body)['error']), (500, 'Failed to generate report'))
+
+    def test_unrouted_paths_are_not_counted(self):
+        status, headers, _ = self.request(create_async_app(workers=1), 'GET', '/api/nope')
+        self.assertEqual(status, 404)
+        self.assertEqual(headers['Access-Control-Allow-Origin'], '*')
+        self.assertNotIn('endpoint="None"', REGISTRY.render())
+
+    def test_model_watcher_runs_with_the_app(self):
+        with mock.patch.dict('os.environ', {'MODEL_WATCH_INTERVAL': '60'}):
+            app = create_async_app(workers=1)
+        self.assertTrue(routes.model_manager._watcher.is_alive())
+        self.request(app, 'GET', '/api/ready')
+        self.assertIsNone(routes.model_manager._watcher)
+
+    def test_report_is_a_pdf(self):
+        status, headers, body = self.request(create_async_app(workers=1), 'POST', '/api/report', json=PATIENT)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'application/pdf')
+        self.assertTrue(body.startswith(b'%PDF'))
+
+    def test_saturated_server_sheds_with_retry_after(self):
+        app = create_async_app(max_in_flight=2, workers=1, retry_after=3)
+        app[LIMIT].active = 2
+        shed, health = self.requests(app, ('POST', '/api/predict', {'json': PATIENT}), ('GET', '/api/health', {}))
+        status, headers, body = shed
+        self.assertEqual(status, 503)
+        self.assertEqual(headers['Retry-After'], '3')
+        self.assertEqual(json.loads(body), {'error': 'Server busy', 'retry_after': 3})
+
+        # Health stays on the event loop and answers while predictions are shed
+        status, _, body = health
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['async_limit'], {'limit': 2, 'active': 2, 'admitted': 0, 'rejected': 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+
+
+class TestBatchPredict(unittest.TestCase):
+    
+    def setUp(self):
+        self.client = create_app().test_client()
+        self.patients = [
+            {"pregnancies": 3, "glucose": 120, "bloodPressure": 70, "skinThickness": 20,
+             "insulin": 79, "bmi": 24.0, "diabetesPedigreeFunction": 0.47, "age": 33},
+            {"pregnancies": 6, "glucose": 148, "bloodPressure": 72, "skinThickness": 35,
+             "insulin": 0, "bmi": 33.6, "diabetesPedigreeFunction": 0.627, "age": 50},
+            {"pregnancies": 1, "glucose": 85, "bloodPressure": 66, "skinThickness": 29,
+             "insulin": 0, "bmi": 17.9, "diabetesPedigreeFunction": 1.2, "age": 65},
+        ]
+    
+    def test_batch_matches_single_predictions(self):
+        """Each batch row should equal the /api/predict response for that patient"""
+        response = self.client.post('/api/predict/batch', json=self.patients)
+        self.assertEqual(response.status_code, 200)
+        
+        data = response.get_json()
+        self.assertEqual(data['count'], len(self.patients))
+        self.assertEqual(data['invalid'], 0)
+        for patient, result in zip(self.patients, data['results']):
+            single = self.client.post('/api/predict', json=patient).get_json()
+            self.assertEqual(result, single)
+    
+    def test_ndjson_body(self):
+        """NDJSON input should give the same results as a JSON array"""
+        body = '\n'.join(json.dumps(p) for p in self.patients) + '\n'
+        ndjson = self.client.post('/api/predict/batch', data=body, content_type='application/x-ndjson')
+        array = self.client.post('/api/predict/batch', json=self.patients)
+        
+        self.assertEqual(ndjson.status_code, 200)
+        self.assertEqual(ndjson.get_json(), array.get_json())
+    
+    def test_invalid_rows_are_reported_in_place(self):
+        """Invalid rows should not fail the rest of the batch"""
+        rows = [self.patients[0], {"glucose": "invalid"}, dict(self.patients[1], age=200)]
+        
+        data = self.client.post('/api/predict/batch', json=rows).get_json()
+        self.assertEqual(data['invalid'], 2)
+        self.assertIn('prediction', data['results'][0])
+        self.assertEqual(data['results'][1], {'error': 'Invalid input data'})
+        self.assertEqual(data['results'][2], {'error': 'Invalid input data'})
+    
+    def test_rejects_non_list_body(self):
+        response = self.client.post('/api/predict/batch', json=self.patients[0])
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.batch_score import COLUMN_TO_FIELD, score_chunk, score_file
+from app.model_loader import load_model, predict_diabetes
+from app.utils import calculate_nutrition_needs, validate_input_data
+from benchmarks.common import DIABETES_CSV
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestBatchScore(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.read_csv(DIABETES_CSV).head(200)
+        self.df.loc[3, 'Glucose'] = 400
+        self.df.loc[7, 'BMI'] = None
+
+    def test_matches_single_patient_path(self):
+        for model in (load_model(), None):
+            scored = score_chunk(model, self.df)
+            for i, row in self.df.iterrows():
+                data = {COLUMN_TO_FIELD[c]: row[c] for c in COLUMN_TO_FIELD}
+                with self.subTest(model=bool(model), row=i):
+                    valid = not row.isna().any() and validate_input_data(data)
+                    self.assertEqual(scored['valid'][i], valid)
+                    if not valid:
+                        self.assertTrue(pd.isna(scored['prediction'][i]))
+                        continue
+                    prediction, probability = predict_diabetes(model, data)
+                    nutrition = calculate_nutrition_needs(data['bmi'], data['age'], data['glucose'], prediction == 1)
+                    self.assertEqual(scored['prediction'][i], prediction)
+                    self.assertEqual(scored['probability'][i], probability[1])
+                    self.assertEqual(
+                        [scored[k][i] for k in ('calories', 'protein', 'carbs')],
+                        [nutrition['calories'], nutrition['protein'], nutrition['carbs']]
+                    )
+
+    def test_chunked_pool_output_matches_single_chunk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / 'extract.csv'
+            self.df.to_csv(source, index=False)
+            outputs = []
+            for chunk_size, workers in ((1000, 1), (37, 2)):
+                target = Path(tmp) / f'scored-{workers}.csv'
+                rows, valid = score_file(str(source), str(target), chunk_size=chunk_size, workers=workers)
+                self.assertEqual((rows, valid), (200, 198))
+                outputs.append(target.read_text())
+            self.assertEqual(outputs[0], outputs[1])
+
+    @unittest.skipUnless(pyarrow, 'pyarrow is not installed')
+    def test_parquet_schema_does_not_depend_on_the_chunk(self):
+        df = pd.read_csv(DIABETES_CSV).head(150)
+        df['clinic'] = 7
+        df.loc[50:99, 'Glucose'] = 400                # a chunk without a single valid row
+        df.loc[110, 'Insulin'] = None                 # int column read as float in its chunk
+        df = df.astype({'Age': object, 'clinic': object})
+        df.loc[120, 'Age'] = 'n/a'                    # ... and as object
+        df.loc[130, 'clinic'] = 'North'
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / 'extract.csv'
+            df.to_csv(source, index=False)
+            target, reference = Path(tmp) / 'scored.parquet', Path(tmp) / 'scored.csv'
+            rows, valid = score_file(str(source), str(target), chunk_size=50, workers=1)
+            score_file(str(source), str(reference), chunk_size=150, workers=1)
+
+            scored, expected = pd.read_parquet(target), pd.read_csv(reference)
+        self.assertEqual((rows, valid), (150, 98))
+        self.assertEqual(str(scored['Age'].dtype), 'float64')
+        self.assertTrue(pd.isna(scored['Age'][120]))
+        self.assertEqual(scored['clinic'].tolist(), expected['clinic'].astype(str).tolist())
+        self.assertEqual(scored['valid'].tolist(), expected['valid'].tolist())
+        pd.testing.assert_series_equal(scored['probability'], expected['probability'])
+        pd.testing.assert_series_equal(scored['risk_level'].fillna(''), expected['risk_level'].fillna(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from benchmarks.common import load_patients
+from benchmarks.suite import ROUTES, FlaskClientSender, compare, drive, summarize
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_mixed_workload_in_process(self):
+        app = create_app()
+        wall, by_route = drive(lambda: FlaskClientSender(app), load_patients(50), concurrency=2, total=40)
+        summary = summarize(wall, by_route)
+        self.assertEqual(summary['total']['requests'], 40)
+        for route in ROUTES:
+            if route in summary:
+                self.assertEqual(summary[route]['errors'], 0, route)
+                self.assertLessEqual(summary[route]['p50_ms'], summary[route]['p99_ms'])
+
+    def test_regressions_against_baseline(self):
+        baseline = {'inprocess': {'1': {
+            'predict': {'p50_ms': 1.0, 'p95_ms': 2.0},
+            'total': {'rps': 100.0},
+        }}}
+        within = {'inprocess': {'1': {
+            'predict': {'errors': 0, 'p50_ms': 1.2, 'p95_ms': 2.9},
+            'total': {'rps': 60.0},
+        }}}
+        self.assertEqual(compare(within, baseline, tolerance=0.5), [])
+
+        slower = {'inprocess': {'1': {
+            'predict': {'errors': 1, 'p50_ms': 1.2, 'p95_ms': 3.1},
+            'total': {'rps': 40.0},
+        }}}
+        problems = compare(slower, baseline, tolerance=0.5)
+        self.assertEqual(len(problems), 3)
+        self.assertTrue(any('p95_ms' in problem for problem in problems))
+        self.assertTrue(any('failed requests' in problem for problem in problems))
+        self.assertTrue(any('req/s' in problem for problem in problems))
+
+        # Levels without a baseline only fail on errors
+        self.assertEqual(compare(within, {}, tolerance=0.5), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import io
+import json
+import sys
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.model_manager import WARM_UP_PATIENTS
+from app.utils import REQUIRED_FIELDS
+
+
+def roster_csv(patients):
+    lines = ['patient_id,' + ','.join(REQUIRED_FIELDS)]
+    for i, patient in enumerate(patients):
+        lines.append(f'p{i},' + ','.join(str(patient[f]) for f in REQUIRED_FIELDS))
+    return '\n'.join(lines) + '\n'
+
+
+class TestBulkReports(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_csv_roster_to_zip(self):
+        body = roster_csv(WARM_UP_PATIENTS) + 'bad,1,2,3,,5,6,7,8\n'
+        response = self.client.post('/api/report/bulk', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/zip')
+
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertEqual(archive.namelist(), ['00001-p0.pdf', '00002-p1.pdf', '00003-p2.pdf', 'skipped.txt'])
+        self.assertTrue(archive.read('00001-p0.pdf').startswith(b'%PDF'))
+        self.assertEqual(archive.read('skipped.txt').decode(), 'row 4: invalid input data\n')
+
+    def test_ndjson_upload_to_combined_pdf(self):
+        body = '\n'.join(json.dumps(p) for p in WARM_UP_PATIENTS).encode()
+        response = self.client.post(
+            '/api/report/bulk?format=pdf',
+            data={'roster': (io.BytesIO(body), 'roster.ndjson')},
+            content_type='multipart/form-data',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b'%PDF'))
+        self.assertGreaterEqual(response.data.count(b'/Type /Page\n'), len(WARM_UP_PATIENTS))
+        response.close()
+
+    def test_combined_pdf_is_limited_to_max_rows(self):
+        body = roster_csv(WARM_UP_PATIENTS)
+        with mock.patch.dict('os.environ', {'BULK_PDF_MAX_ROWS': str(len(WARM_UP_PATIENTS) - 1)}):
+            response = self.client.post('/api/report/bulk?format=pdf', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json()['max_rows'], len(WARM_UP_PATIENTS) - 1)
+
+        # The ZIP is not limited
+        with mock.patch.dict('os.environ', {'BULK_PDF_MAX_ROWS': '1'}):
+            response = self.client.post('/api/report/bulk', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(response.data)).namelist()), len(WARM_UP_PATIENTS))
+
+    def test_unknown_output_format(self):
+        response = self.client.post('/api/report/bulk?format=docx', data='', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.catalog_snapshot import CatalogError, build_snapshot, load_snapshot
+from app.food_catalog import FOOD_DATA_PATH, load_catalog
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.frame = pd.read_csv(FOOD_DATA_PATH)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.csv = Path(tmp.name) / 'foods.csv'
+        self.snapshot = Path(tmp.name) / 'foods.snapshot'
+
+    def write_csv(self, frame):
+        frame.to_csv(self.csv, index=False)
+
+    def assertSameCatalog(self, actual, expected):
+        pd.testing.assert_frame_equal(actual.to_frame(), expected.to_frame())
+        self.assertEqual(actual.labels, expected.labels)
+        for kind in ('codes', 'integers'):
+            for column, values in getattr(expected, kind).items():
+                self.assertEqual(getattr(actual, kind)[column].dtype, values.dtype, column)
+                np.testing.assert_array_equal(getattr(actual, kind)[column], values)
+
+    def test_snapshot_matches_csv_and_is_mapped_read_only(self):
+        self.write_csv(self.frame)
+        self.assertEqual(build_snapshot(self.csv, self.snapshot), {'rows': 220, 'reused': 0, 'parsed': 220})
+        catalog = load_snapshot(self.snapshot, self.csv)
+        self.assertSameCatalog(catalog, load_catalog(self.csv))
+        self.assertFalse(catalog.codes['title'].flags.writeable)
+
+    def test_rebuild_only_parses_edited_rows(self):
+        self.write_csv(self.frame)
+        build_snapshot(self.csv, self.snapshot)
+
+        edited = self.frame.copy()
+        edited.loc[3, 'calories'] += 10
+        edited.loc[7, 'title'] = 'Ragi Dosa (150g)'
+        edited = pd.concat([edited.drop(index=11), edited.iloc[[0]].assign(region='Central')])
+        self.write_csv(edited)
+        stats = build_snapshot(self.csv, self.snapshot)
+        self.assertEqual((stats['parsed'], stats['reused']), (3, 217))
+
+        self.assertSameCatalog(load_snapshot(self.snapshot, self.csv), load_catalog(self.csv))
+
+    def test_stale_or_corrupt_snapshot_fails_loudly(self):
+        self.write_csv(self.frame)
+        build_snapshot(self.csv, self.snapshot)
+        self.write_csv(self.frame.iloc[:10])
+        with self.assertRaisesRegex(CatalogError, 'stale'):
+            load_snapshot(self.snapshot, self.csv)
+
+        build_snapshot(self.csv, self.snapshot)
+        data = self.snapshot.read_bytes()
+        self.snapshot.write_bytes(data[:-64])
+        with self.assertRaisesRegex(CatalogError, 'truncated'):
+            load_snapshot(self.snapshot, self.csv)
+        self.snapshot.write_bytes(b'not a snapshot')
+        with self.assertRaises(CatalogError):
+            load_snapshot(self.snapshot, self.csv)
+        with self.assertRaises(CatalogError):
+            load_snapshot(self.snapshot.with_name('missing'), self.csv)
+
+    def test_invalid_values_are_all_reported(self):
+        bad = self.frame.copy()
+        bad.loc[0, 'gi_index'] = 120
+        bad.loc[1, 'calories'] = -5
+        bad.loc[2, 'risk'] = 'Severe'
+        bad.loc[3, 'diet_type'] = 'Vegan'
+        bad['protein_g'] = bad['protein_g'].astype(object)
+        bad.loc[4, 'protein_g'] = 'lots'
+        self.write_csv(bad)
+        with self.assertRaises(CatalogError) as raised:
+            build_snapshot(self.csv, self.snapshot)
+        message = str(raised.exception)
+        self.assertIn('5 problems', message)
+        for expected in ('line 2: gi_index 120 is outside 0-100', 'line 3: calories -5',
+                         "line 4: risk 'Severe'", "line 5: diet_type 'Vegan'", "line 6: protein_g 'lots'"):
+            self.assertIn(expected, message)
+        self.assertFalse(self.snapshot.exists())
+
+        self.write_csv(self.frame.drop(columns=['risk']))
+        with self.assertRaisesRegex(CatalogError, r"missing columns \['risk'\]"):
+            build_snapshot(self.csv, self.snapshot)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.diet_recommender import calculate_meal_plan_nutrition, get_food_recommendations
+from app.food_catalog import CURATED, FOOD_DATA_PATH, INDIAN_FOOD, FoodCatalog, load_catalog
+from benchmarks import legacy
+
+
+class TestFoodCatalog(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.frame = pd.read_csv(FOOD_DATA_PATH)
+        cls.catalog = load_catalog()
+
+    def test_csv_round_trip(self):
+        pd.testing.assert_frame_equal(self.catalog.select(INDIAN_FOOD).to_frame(), self.frame, check_dtype=False)
+
+    def test_columns_use_small_dtypes(self):
+        for name, codes in self.catalog.codes.items():
+            with self.subTest(name=name):
+                self.assertLessEqual(codes.dtype.itemsize, 2)
+        for name, (values, scale) in self.catalog.decimals.items():
+            with self.subTest(name=name):
+                self.assertTrue(np.issubdtype(values.dtype, np.integer))
+                self.assertIsNotNone(scale)
+
+    def test_labels_are_sorted_and_shared(self):
+        titles = self.catalog.labels['title']
+        self.assertEqual(titles, sorted(titles))
+        self.assertEqual(self.catalog.strings('title', [0, 0]), [self.frame['title'][0]] * 2)
+
+    def test_curated_rows(self):
+        curated = self.catalog.select(CURATED)
+        self.assertEqual(len(curated) + len(self.frame), len(self.catalog))
+        self.assertTrue(all(source == CURATED for source in curated.strings('source')))
+
+    def test_food_recommendations_match_dict_implementation(self):
+        for is_high_risk in (False, True):
+            for glucose in (90, 120, 160):
+                with self.subTest(is_high_risk=is_high_risk, glucose=glucose):
+                    expected = legacy.get_food_recommendations(is_high_risk, glucose, 24.0, 40, 1800)
+                    actual = get_food_recommendations(is_high_risk, glucose, 24.0, 40, 1800)
+                    self.assertEqual(actual, expected)
+                    for meal, foods in actual.items():
+                        for food, original in zip(foods, expected[meal]):
+                            self.assertEqual({k: type(v) for k, v in food.items()},
+                                             {k: type(v) for k, v in original.items()})
+
+    def test_meal_plan_nutrition_from_foods_or_titles(self):
+        foods = get_food_recommendations(True, 160, 24.0, 40, 1800)['lunch']
+        expected = legacy.calculate_meal_plan_nutrition(foods)
+        self.assertEqual(calculate_meal_plan_nutrition(foods), expected)
+        self.assertEqual(calculate_meal_plan_nutrition([food['name'] for food in foods]), expected)
+        with self.assertRaises(KeyError):
+            calculate_meal_plan_nutrition(['No Such Dish'])
+
+    def test_empty_frame(self):
+        catalog = FoodCatalog.from_frame(self.frame.iloc[:0])
+        self.assertEqual(len(catalog), 0)
+        self.assertEqual(len(catalog.to_frame()), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.catalog_snapshot import CatalogError, build_snapshot
+from app.food_catalog import FOOD_DATA_PATH
+from app.food_recommender import FoodRecommender
+from benchmarks.legacy import LegacyFoodRecommender
+
+
+class TestFoodRecommender(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.recommender = FoodRecommender()
+        cls.legacy = LegacyFoodRecommender()
+        cls.patients = [{}] + [{'bmi': bmi} for bmi in (15.0, 18.4, 18.5, 24.0, 30.0, 30.1, 42.0)]
+    
+    def test_recommendations_match_pandas_implementation(self):
+        for diet in ('Vegetarian', 'Non-Vegetarian'):
+            for risk_level in ('Low', 'Moderate', 'High'):
+                for patient in self.patients:
+                    for count in (1, 10, 500):
+                        with self.subTest(diet=diet, risk_level=risk_level, patient=patient, count=count):
+                            self.assertEqual(
+                                self.recommender.get_recommendations(patient, risk_level, diet, count),
+                                self.legacy.get_recommendations(patient, risk_level, diet, count)
+                            )
+    
+    def test_encoded_meal_plan_matches_plan(self):
+        """Plans spliced from pre-rendered fragments should decode to the plan dict"""
+        for risk_level in ('Low', 'Moderate', 'High'):
+            for patient in self.patients:
+                with self.subTest(risk_level=risk_level, patient=patient):
+                    plan, plan_json = self.recommender.get_daily_meal_plan_encoded(patient, risk_level)
+                    self.assertEqual(json.loads(plan_json), plan)
+    
+    def test_meal_plans_are_cached_per_bmi_band(self):
+        recommender = FoodRecommender()
+        first = recommender.get_daily_meal_plan({'bmi': 24.0}, 'High')
+        second = recommender.get_daily_meal_plan({'bmi': 27.5}, 'High')
+        recommender.get_daily_meal_plan({'bmi': 31.0}, 'High')
+        
+        self.assertIs(first, second)
+        stats = recommender.plan_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+    
+    def test_plan_cache_is_bounded_and_cleared_on_reload(self):
+        recommender = FoodRecommender(plan_cache_size=2)
+        for risk_level in ('Low', 'Moderate', 'High'):
+            recommender.get_daily_meal_plan({'bmi': 24.0}, risk_level)
+        self.assertEqual(recommender.plan_cache.stats()['evictions'], 1)
+        
+        recommender.load_food_data()
+        self.assertEqual(len(recommender.plan_cache), 0)
+    
+    def test_reload_reads_an_edited_catalog(self):
+        recommender = FoodRecommender()
+        with tempfile.TemporaryDirectory() as tmp:
+            csv, snapshot = Path(tmp) / 'foods.csv', Path(tmp) / 'foods.snapshot'
+            shutil.copy(FOOD_DATA_PATH, csv)
+            with mock.patch('app.food_catalog.FOOD_DATA_PATH', csv), \
+                    mock.patch('app.catalog_snapshot.SNAPSHOT_PATH', snapshot):
+                recommender.load_food_data()
+                before = recommender.catalog_version
+                recommender.get_daily_meal_plan({'bmi': 24.0}, 'High')
+                
+                frame = pd.read_csv(csv)
+                frame.loc[0, 'calories'] += 10
+                frame.to_csv(csv, index=False)
+                with self.assertRaisesRegex(CatalogError, 'stale'):
+                    recommender.load_food_data()
+                
+                build_snapshot(csv, snapshot)
+                recommender.load_food_data()
+                self.assertNotEqual(recommender.catalog_version, before)
+                self.assertEqual(len(recommender.plan_cache), 0)
+        # Back on the shipped catalog
+        recommender.load_food_data()
+        self.assertEqual(recommender.catalog_version, before)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.food_catalog import FoodCatalog
+from app.food_recommender import FoodRecommender
+from app.food_search import FoodSearchIndex, tokenize
+from benchmarks.bench_meal_planner import scaled_catalog
+
+
+def scan(food_data, query='', region=None, diet_type=None, ranges=None):
+    """Rows matching a search, found by a linear pass over the catalog"""
+    words = tokenize(query)
+    rows = []
+    for row, food in enumerate(food_data.to_dict(orient='records')):
+        tokens = tokenize(f"{food['title']} {food['examples']}")
+        if not all(any(token.startswith(word) for token in tokens) for word in words):
+            continue
+        if region and food['region'].lower() != region.lower():
+            continue
+        if diet_type and food['diet_type'].lower() != diet_type.lower():
+            continue
+        if any((low is not None and food[column] < low) or (high is not None and food[column] > high)
+               for column, (low, high) in (ranges or {}).items()):
+            continue
+        rows.append(row)
+    return rows
+
+
+class TestFoodSearchIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.food_data = scaled_catalog(FoodRecommender().food_data, 1_500)
+        cls.index = FoodSearchIndex(FoodCatalog.from_frame(cls.food_data))
+
+    def test_matches_linear_scan(self):
+        queries = ['', 'moong', 'moong da', 'DAL', 'ri', 'curry fish', 'variation', '7', 'zzz', 'poha 3']
+        filters = [
+            {},
+            {'region': 'North'},
+            {'diet_type': 'vegetarian', 'ranges': {'gi_index': (None, 50)}},
+            {'ranges': {'calories': (150, 300), 'fiber_g': (1.0, None)}},
+            {'region': 'south', 'diet_type': 'Non-Vegetarian', 'ranges': {'gi_index': (40, 60)}},
+            {'region': 'Atlantis'},
+        ]
+        for query in queries:
+            for options in filters:
+                with self.subTest(query=query, **options):
+                    expected = scan(self.food_data, query, **options)
+                    total, rows = self.index.search(query, offset=0, limit=len(self.food_data), **options)
+                    self.assertEqual(total, len(expected))
+                    self.assertEqual(rows.tolist(), expected)
+
+    def test_paging(self):
+        total, first = self.index.search('dal', limit=7)
+        pages = [self.index.search('dal', offset=offset, limit=7)[1] for offset in range(0, total + 7, 7)]
+        self.assertEqual(first.tolist(), pages[0].tolist())
+        self.assertEqual(np.concatenate(pages).tolist(), scan(self.food_data, 'dal'))
+        self.assertEqual(len(pages[-1]), 0)
+
+    def test_autocomplete(self):
+        suggestions = self.index.autocomplete('Moong', limit=5)
+        self.assertEqual(len(suggestions), 5)
+        self.assertTrue(all(name.lower().startswith('moong') for name in suggestions))
+        self.assertEqual(suggestions, sorted(suggestions, key=str.lower))
+
+        # Names starting with the query come before other word matches
+        suggestions = self.index.autocomplete('dal', limit=50)
+        starts = [name.lower().startswith('dal') for name in suggestions]
+        self.assertEqual(starts, sorted(starts, reverse=True))
+        self.assertTrue(all(any(word.startswith('dal') for word in tokenize(name)) for name in suggestions))
+        self.assertEqual(self.index.autocomplete('  '), [])
+
+
+class TestFoodSearchRoutes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = create_app().test_client()
+
+    def test_search(self):
+        body = self.client.get('/api/foods/search?q=moong&diet=vegetarian&gi_max=60&limit=2').get_json()
+        self.assertGreater(body['total'], 2)
+        self.assertEqual(len(body['results']), 2)
+        for food in body['results']:
+            self.assertIn('Moong', food['title'])
+            self.assertLessEqual(food['gi_index'], 60)
+            self.assertEqual(food['diet_type'], 'Vegetarian')
+
+        self.assertEqual(self.client.get('/api/foods/search?limit=500').status_code, 400)
+        self.assertEqual(self.client.get('/api/foods/search?gi_min=low').status_code, 400)
+
+    def test_autocomplete(self):
+        body = self.client.get('/api/foods/autocomplete?q=moo').get_json()
+        self.assertIn('Moong Dal Khichdi', body['suggestions'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+
+
+class TestHealth(unittest.TestCase):
+    
+    def test_ready_only_after_warm_up(self):
+        client = create_app().test_client()
+        routes.ready = False
+        self.assertEqual(client.get('/api/ready').status_code, 503)
+        
+        client = create_app(warm_up=True).test_client()
+        self.assertEqual(client.get('/api/ready').status_code, 200)
+        self.assertTrue(client.get('/api/health').get_json()['ready'])
+    
+    def test_health_reports_meal_plan_cache(self):
+        client = create_app(warm_up=True).test_client()
+        stats = client.get('/api/health').get_json()['meal_plan_cache']
+        for counter in ('hits', 'misses', 'evictions', 'size'):
+            self.assertIn(counter, stats)
+
+if __name__ == '__main__':
+    unittest.main()
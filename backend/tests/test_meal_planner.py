@@ -0,0 +1,78 @@
+import sys
+import unittest
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.food_engine import PORTION_SUFFIX
+from app.food_recommender import FoodRecommender
+from app.meal_planner import MAX_PER_REGION, MEAL_SLOTS
+from app.utils import calculate_nutrition_needs
+from benchmarks.legacy import LegacyFoodRecommender
+
+MEALS = [meal for meal, _, _ in MEAL_SLOTS]
+
+
+class TestMealPlanner(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.recommender = FoodRecommender()
+        cls.legacy = LegacyFoodRecommender()
+        cls.patients = [
+            {'bmi': bmi, 'age': age, 'glucose': 120}
+            for bmi in (17.0, 24.0, 27.5, 35.0) for age in (25, 45, 70)
+        ]
+
+    def plans(self):
+        for diet in ('Vegetarian', 'Non-Vegetarian'):
+            for risk_level in ('Low', 'Moderate', 'High'):
+                for patient in self.patients:
+                    yield diet, risk_level, patient, self.recommender.get_daily_meal_plan(patient, risk_level, diet)
+
+    def test_no_dish_is_repeated(self):
+        for diet, risk_level, patient, plan in self.plans():
+            with self.subTest(diet=diet, risk_level=risk_level, patient=patient):
+                dishes = [PORTION_SUFFIX.sub('', food['title']) for meal in MEALS for food in plan[meal]]
+                self.assertEqual(len(dishes), len(set(dishes)))
+                # A slot stays short only when the catalog runs out of distinct dishes
+                if diet == 'Vegetarian':
+                    self.assertEqual([len(plan[meal]) for meal in MEALS], [count for _, count, _ in MEAL_SLOTS])
+
+    def test_foods_fit_their_meal_and_are_ordered_by_score(self):
+        for diet, risk_level, patient, plan in self.plans():
+            with self.subTest(diet=diet, risk_level=risk_level, patient=patient):
+                self.assertTrue(all(food['gi_index'] < 60 for food in plan['breakfast']))
+                self.assertTrue(all(200 <= food['calories'] <= 400 for food in plan['lunch']))
+                self.assertTrue(all(150 <= food['calories'] <= 350 for food in plan['dinner']))
+                self.assertTrue(all(food['calories'] < 200 for food in plan['snacks']))
+                for meal in MEALS:
+                    scores = [food['score'] for food in plan[meal]]
+                    self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_diversity_on_a_wide_catalog(self):
+        """The full vegetarian catalog has enough variety for every rule to hold"""
+        recommender = FoodRecommender()
+        recommender._get_suitable_food_risk = lambda risk_level: None
+        for patient in self.patients:
+            plan = recommender.get_daily_meal_plan(patient, 'Moderate')
+            with self.subTest(patient=patient):
+                regions = Counter(food['region'] for meal in MEALS for food in plan[meal])
+                self.assertLessEqual(max(regions.values()), MAX_PER_REGION)
+                for meal in MEALS:
+                    icons = [food['icon'] for food in plan[meal]]
+                    self.assertEqual(len(icons), len(set(icons)))
+
+    def test_closer_to_calorie_target_than_independent_selection(self):
+        error = legacy_error = 0
+        for diet, risk_level, patient, plan in self.plans():
+            target = calculate_nutrition_needs(patient['bmi'], patient['age'], patient['glucose'], False)['calories']
+            legacy_plan = self.legacy.get_daily_meal_plan(patient, risk_level, diet)
+            error += abs(plan['daily_nutrition']['calories'] - target)
+            legacy_error += abs(legacy_plan['daily_nutrition']['calories'] - target)
+        self.assertLess(error, legacy_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
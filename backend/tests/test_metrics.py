@@ -0,0 +1,84 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+from app.cache import LRUCache
+from app.metrics import MODEL_FALLBACKS, Registry
+from app.model_loader import predict_diabetes_batch
+from app.model_manager import WARM_UP_PATIENTS
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            latency.observe(('api.predict',), value)
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE diabetes_api_latency_seconds histogram', lines)
+        self.assertIn('diabetes_api_latency_seconds_bucket{endpoint="api.predict",le="0.1"} 2', lines)
+        self.assertIn('diabetes_api_latency_seconds_bucket{endpoint="api.predict",le="1.0"} 3', lines)
+        self.assertIn('diabetes_api_latency_seconds_bucket{endpoint="api.predict",le="+Inf"} 4', lines)
+        self.assertIn('diabetes_api_latency_seconds_count{endpoint="api.predict"} 4', lines)
+        self.assertIn('diabetes_api_latency_seconds_sum{endpoint="api.predict"} 2.65', lines)
+
+    def test_counters_gauges_and_caches(self):
+        registry = Registry()
+        requests = registry.counter('requests_total', 'Requests', ('status',))
+        in_flight = registry.gauge('in_flight', 'In flight')
+        requests.inc(('200',))
+        requests.inc(('200',), 2)
+        in_flight.inc()
+        in_flight.dec()
+        cache = LRUCache(maxsize=1)
+        cache.get('a')
+        cache.put('a', 1)
+        cache.get('a')
+        registry.add_cache('plans', cache)
+
+        lines = registry.render().splitlines()
+        self.assertIn('diabetes_api_requests_total{status="200"} 3', lines)
+        self.assertIn('diabetes_api_in_flight 0', lines)
+        self.assertIn('diabetes_api_cache_misses_total{cache="plans"} 1', lines)
+        self.assertIn('diabetes_api_cache_hit_ratio{cache="plans"} 0.5', lines)
+
+    def test_stage_timer_records_each_lap(self):
+        stages = Registry().histogram('stage_seconds', 'Stages', ('endpoint', 'stage'))
+        timer = stages.timer('predict')
+        timer.lap('validate')
+        timer.lap('model')
+        timer.lap('model')
+        self.assertEqual(stages.count(('predict', 'validate')), 1)
+        self.assertEqual(stages.count(('predict', 'model')), 2)
+
+    def test_rule_based_fallback_is_counted(self):
+        before = MODEL_FALLBACKS.value(('rule_based',))
+        predict_diabetes_batch(None, WARM_UP_PATIENTS)
+        self.assertEqual(MODEL_FALLBACKS.value(('rule_based',)), before + len(WARM_UP_PATIENTS))
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def test_predict_stages_and_requests_are_exported(self):
+        client = create_app().test_client()
+        before = routes.REQUEST_SECONDS.count(('api.predict',))
+        self.assertEqual(client.post('/api/predict', json=WARM_UP_PATIENTS[0]).status_code, 200)
+        self.assertEqual(routes.REQUEST_SECONDS.count(('api.predict',)), before + 1)
+
+        response = client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        for stage in ('validate', 'model', 'nutrition', 'meal_plan', 'encode'):
+            self.assertIn(f'diabetes_api_stage_duration_seconds_count{{endpoint="predict",stage="{stage}"}}', body)
+        self.assertIn('diabetes_api_requests_total{endpoint="api.predict",status="200"}', body)
+        self.assertIn('diabetes_api_cache_hits_total{cache="meal_plan"}', body)
+        # The scrape itself is still in flight while it renders
+        self.assertIn('diabetes_api_requests_in_flight{endpoint="api.metrics"} 1', body)
+
+if __name__ == '__main__':
+    unittest.main()
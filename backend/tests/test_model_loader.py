@@ -0,0 +1,105 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.model_loader import FEATURE_NAMES, CompiledForest, load_model, model_info, predict_diabetes_batch
+from app.model_registry import ModelRegistry, RegistryError
+from benchmarks.common import DIABETES_CSV, load_patients
+
+
+class TestCompiledForest(unittest.TestCase):
+    
+    @classmethod
+    def setUpClass(cls):
+        df = pd.read_csv(DIABETES_CSV)
+        cls.model = RandomForestClassifier(
+            n_estimators=25, random_state=42, max_depth=10, min_samples_split=5, min_samples_leaf=2
+        ).fit(df[FEATURE_NAMES], df['Outcome'])
+        cls.forest = CompiledForest.from_sklearn(cls.model)
+        
+        # Training rows plus random points well outside the training ranges
+        rng = np.random.default_rng(0)
+        cls.X = np.vstack([df[FEATURE_NAMES].to_numpy(), rng.uniform(0, 300, size=(2000, 8))])
+    
+    def test_probabilities_match_sklearn(self):
+        expected = self.model.predict_proba(pd.DataFrame(self.X, columns=FEATURE_NAMES))
+        actual = self.forest.predict_proba(self.X)
+        self.assertLessEqual(np.abs(expected - actual).max(), 1e-12)
+    
+    def test_single_row_matches_batch(self):
+        batch = self.forest.predict_proba(self.X[:50])
+        for i in range(50):
+            np.testing.assert_array_equal(self.forest.predict_proba(self.X[i:i + 1])[0], batch[i])
+    
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.forest.save(tmp)
+            loaded = CompiledForest.load(tmp, self.forest.max_depth)
+            self.assertIsInstance(loaded.threshold, np.memmap)
+            np.testing.assert_array_equal(loaded.predict_proba(self.X), self.forest.predict_proba(self.X))
+    
+    def test_accuracy_is_only_reported_when_measured(self):
+        self.assertIsNone(model_info(self.forest)['accuracy'])
+        self.assertIsNone(model_info(None)['accuracy'])
+        measured = CompiledForest.from_sklearn(self.model)
+        measured.manifest = {'training_accuracy': 0.81}
+        self.assertEqual(model_info(measured)['accuracy'], 0.81)
+    
+    def test_predictions_match_sklearn_model(self):
+        patients = load_patients(200)
+        compiled = predict_diabetes_batch(self.forest, patients)
+        reference = predict_diabetes_batch(self.model, patients)
+        self.assertEqual([int(p) for p, _ in compiled], [int(p) for p, _ in reference])
+        np.testing.assert_allclose([p for _, p in compiled], [p for _, p in reference], rtol=0, atol=1e-12)
+
+
+class TestModelRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmp.name)
+        df = pd.read_csv(DIABETES_CSV)
+        model = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0)
+        self.forest = CompiledForest.from_sklearn(model.fit(df[FEATURE_NAMES], df['Outcome']))
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_publish_and_load_latest(self):
+        first = self.registry.publish(self.forest, 0.81, DIABETES_CSV)
+        second = self.registry.publish(self.forest, 0.83, DIABETES_CSV)
+        
+        self.assertEqual(self.registry.versions(), [first, second])
+        latest = self.registry.load()
+        self.assertEqual(latest.version, second)
+        self.assertEqual(latest.manifest['training_accuracy'], 0.83)
+        self.assertEqual(latest.manifest['feature_names'], FEATURE_NAMES)
+        self.assertEqual(len(latest.manifest['dataset_sha256']), 64)
+        self.assertEqual(self.registry.load(first).version, first)
+        self.assertEqual(stat.S_IMODE(os.stat(self.registry.path / first).st_mode), 0o755)
+    
+    def test_pinned_missing_version_fails_loudly(self):
+        self.registry.publish(self.forest, 0.81, DIABETES_CSV)
+        with self.assertRaises(RegistryError):
+            self.registry.load('19990101-000000')
+    
+    def test_load_model_serves_registry_version(self):
+        version = self.registry.publish(self.forest, 0.8, DIABETES_CSV)
+        os.environ['MODEL_REGISTRY_DIR'] = self.tmp.name
+        try:
+            self.assertEqual(load_model().version, version)
+            self.assertEqual(load_model(version).version, version)
+        finally:
+            del os.environ['MODEL_REGISTRY_DIR']
+
+if __name__ == '__main__':
+    unittest.main()
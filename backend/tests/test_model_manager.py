@@ -0,0 +1,151 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+from app.model_loader import FEATURE_NAMES, CompiledForest, predict_diabetes
+from app.model_manager import WARM_UP_PATIENTS, ModelManager
+from app.model_registry import ModelRegistry
+from benchmarks.common import DIABETES_CSV
+
+
+class TestModelManager(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmp.name)
+        df = pd.read_csv(DIABETES_CSV)
+        self.forests = [
+            CompiledForest.from_sklearn(
+                RandomForestClassifier(n_estimators=5, max_depth=4, random_state=seed).fit(df[FEATURE_NAMES], df['Outcome'])
+            )
+            for seed in (0, 1)
+        ]
+        self.v1 = self.registry.publish(self.forests[0], 0.8, DIABETES_CSV)
+        self.manager = ModelManager(self.registry.load(), registry=self.registry)
+    
+    def tearDown(self):
+        self.manager.stop_watcher()
+        self.tmp.cleanup()
+    
+    def test_reload_swaps_to_latest(self):
+        self.assertFalse(self.manager.reload())
+        v2 = self.registry.publish(self.forests[1], 0.82, DIABETES_CSV)
+        
+        self.assertTrue(self.manager.reload())
+        stats = self.manager.stats()
+        self.assertEqual((stats['current_version'], stats['previous_version']), (v2, self.v1))
+        self.assertEqual(stats['reloads'], 1)
+        self.assertIsNotNone(stats['last_swap_us'])
+    
+    def test_requests_see_one_model_during_reloads(self):
+        v2 = self.registry.publish(self.forests[1], 0.82, DIABETES_CSV)
+        expected = {
+            version: predict_diabetes(self.registry.load(version), WARM_UP_PATIENTS[2])
+            for version in (self.v1, v2)
+        }
+        seen, errors = [], []
+        
+        def serve():
+            for _ in range(200):
+                model = self.manager.current
+                try:
+                    self.assertEqual(predict_diabetes(model, WARM_UP_PATIENTS[2]), expected[model.version])
+                    seen.append(model.version)
+                except Exception as e:
+                    errors.append(e)
+        
+        threads = [threading.Thread(target=serve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for version in (v2, self.v1, v2):
+            self.manager.reload(version)
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self.manager.version, v2)
+    
+    def test_watcher_follows_latest(self):
+        self.manager.start_watcher(interval=0.02)
+        v2 = self.registry.publish(self.forests[1], 0.82, DIABETES_CSV)
+        
+        deadline = time.time() + 5
+        while self.manager.version != v2 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.manager.version, v2)
+    
+    def test_watcher_is_quiet_without_published_versions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = ModelManager(None, registry=ModelRegistry(tmp))
+            with self.assertNoLogs('app.model_manager', 'WARNING'):
+                manager.start_watcher(interval=0.01)
+                time.sleep(0.1)
+                manager.stop_watcher()
+            self.assertEqual(manager.stats()['failed_reloads'], 0)
+    
+    def wait_for_version(self, manager, version):
+        deadline = time.time() + 5
+        while manager.version != version and time.time() < deadline:
+            time.sleep(0.02)
+        return manager.version
+
+    def test_watchers_follow_an_admin_pin(self):
+        v2 = self.registry.publish(self.forests[1], 0.82, DIABETES_CSV)
+        other = ModelManager(self.registry.load(), registry=self.registry)
+        self.addCleanup(other.stop_watcher)
+        for manager in (self.manager, other):
+            manager.start_watcher(interval=0.02)
+        self.assertEqual(self.wait_for_version(self.manager, v2), v2)
+
+        # Pinning an older version is neither undone by LATEST nor limited to one worker
+        self.registry.pin(self.v1)
+        self.assertEqual(self.wait_for_version(other, self.v1), self.v1)
+        time.sleep(0.1)
+        self.assertEqual((self.manager.version, other.version), (self.v1, self.v1))
+
+        self.registry.unpin()
+        self.assertEqual(self.wait_for_version(other, v2), v2)
+
+    def test_admin_endpoint_pins_a_published_version(self):
+        v2 = self.registry.publish(self.forests[1], 0.82, DIABETES_CSV)
+        client = create_app().test_client()
+        original, routes.model_manager = routes.model_manager, self.manager
+        try:
+            with mock.patch.dict('os.environ', {}, clear=False) as env:
+                env.pop('ADMIN_TOKEN', None)
+                self.assertEqual(client.post('/api/admin/reload-model', json={'version': self.v1}).status_code, 403)
+
+            with mock.patch.dict('os.environ', {'ADMIN_TOKEN': 'secret'}):
+                self.assertEqual(client.post('/api/admin/reload-model', json={'version': self.v1}).status_code, 403)
+                client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+
+                response = client.post('/api/admin/reload-model', json={'version': self.v1})
+                self.assertEqual(response.get_json()['reloaded'], False)
+                self.assertEqual(self.registry.pinned(), self.v1)
+
+                response = client.post('/api/admin/reload-model', json={'version': v2})
+                self.assertEqual(response.get_json()['current_version'], v2)
+                self.assertEqual(client.get('/api/health').get_json()['version'], v2)
+
+                for version in ('missing', '../registry', 42, ['x']):
+                    response = client.post('/api/admin/reload-model', json={'version': version})
+                    self.assertEqual(response.status_code, 404, version)
+                self.assertEqual(self.registry.pinned(), v2)
+
+                response = client.post('/api/admin/reload-model', json={})
+                self.assertIsNone(response.get_json()['admin_pin'])
+        finally:
+            routes.model_manager = original
+
+if __name__ == '__main__':
+    unittest.main()
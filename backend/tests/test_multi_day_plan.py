@@ -0,0 +1,135 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.food_recommender import FoodRecommender
+from app.meal_planner import MEAL_SLOTS, NO_REPEAT_DAYS
+from app.utils import calculate_nutrition_needs
+from benchmarks.bench_meal_planner import scaled_catalog
+
+MEALS = [meal for meal, _, _ in MEAL_SLOTS]
+PATIENT = {'bmi': 27.5, 'age': 45, 'glucose': 150}
+
+
+def wide_recommender(size=2_000):
+    """Recommender on a catalog with enough distinct dishes for a strict rotation"""
+    recommender = FoodRecommender()
+    recommender.set_food_data(scaled_catalog(recommender.food_data, size))
+    return recommender
+
+
+def dishes(day):
+    return {food['title'] for meal in MEALS for food in day[meal]}
+
+
+class TestMultiDayPlan(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.recommender = wide_recommender()
+
+    def test_no_repeats_within_the_window(self):
+        for risk_level in ('Low', 'Moderate', 'High'):
+            plan, _ = self.recommender.get_multi_day_plan(PATIENT, risk_level, 'Vegetarian', 14)
+            for day in range(len(plan['days'])):
+                for other in range(day + 1, min(day + NO_REPEAT_DAYS + 1, len(plan['days']))):
+                    with self.subTest(risk_level=risk_level, day=day, other=other):
+                        self.assertFalse(dishes(plan['days'][day]) & dishes(plan['days'][other]))
+
+    def test_shipped_catalog_does_not_repeat_on_consecutive_days(self):
+        plan, _ = FoodRecommender().get_multi_day_plan(PATIENT, 'High', 'Vegetarian', 7)
+        self.assertEqual(len(plan['days']), 7)
+        for day, following in zip(plan['days'], plan['days'][1:]):
+            self.assertFalse(dishes(day) & dishes(following))
+
+    def test_swap_recomputes_only_clashing_days(self):
+        plan, recomputed = self.recommender.get_multi_day_plan(PATIENT, 'High', 'Vegetarian', 10)
+        self.assertEqual(recomputed, [])
+        # Put day 6's lunch on day 5, which clashes with day 6 only
+        title = plan['days'][5]['lunch'][0]['title']
+        swapped, recomputed = self.recommender.get_multi_day_plan(
+            PATIENT, 'High', 'Vegetarian', 10, [{'day': 5, 'meal': 'lunch', 'index': 1, 'title': title}]
+        )
+        self.assertEqual(recomputed, [6])
+        self.assertIn(title, [food['title'] for food in swapped['days'][4]['lunch']])
+        self.assertNotIn(title, dishes(swapped['days'][5]))
+        for day in (0, 1, 2, 3, 6, 7, 8, 9):
+            self.assertEqual(swapped['days'][day], plan['days'][day])
+
+        # The cached plan is not modified by swaps
+        again, _ = self.recommender.get_multi_day_plan(PATIENT, 'High', 'Vegetarian', 10)
+        self.assertEqual(again, plan)
+
+    def test_swap_rejects_a_dish_the_day_already_has(self):
+        plan, _ = self.recommender.get_multi_day_plan(PATIENT, 'High', 'Vegetarian', 5)
+        lunch = plan['days'][1]['lunch']
+        with self.assertRaisesRegex(ValueError, 'already served on day 2'):
+            self.recommender.get_multi_day_plan(
+                PATIENT, 'High', 'Vegetarian', 5, [{'day': 2, 'meal': 'lunch', 'index': 1, 'title': lunch[0]['title']}]
+            )
+        # Swapping an item for itself is not a repeat
+        swapped, recomputed = self.recommender.get_multi_day_plan(
+            PATIENT, 'High', 'Vegetarian', 5, [{'day': 2, 'meal': 'lunch', 'index': 0, 'title': lunch[0]['title']}]
+        )
+        self.assertEqual((swapped['days'][1], recomputed), (plan['days'][1], []))
+
+    def test_default_swap_avoids_nearby_dishes(self):
+        plan, _ = self.recommender.get_multi_day_plan(PATIENT, 'Low', 'Vegetarian', 5)
+        swapped, recomputed = self.recommender.get_multi_day_plan(
+            PATIENT, 'Low', 'Vegetarian', 5, [{'day': 3, 'meal': 'dinner', 'index': 0}]
+        )
+        self.assertEqual(recomputed, [])
+        self.assertNotEqual(swapped['days'][2]['dinner'], plan['days'][2]['dinner'])
+        for other in (0, 1, 3, 4):
+            self.assertFalse(dishes(swapped['days'][2]) & dishes(plan['days'][other]))
+
+    def test_weekly_calories_closer_than_repeating_one_day(self):
+        error = daily_error = 0
+        for bmi in (17.0, 24.0, 27.5, 35.0):
+            for age in (25, 45, 70):
+                patient = {'bmi': bmi, 'age': age, 'glucose': 120}
+                target = calculate_nutrition_needs(bmi, age, 120, False)['calories'] * 7
+                plan, _ = self.recommender.get_multi_day_plan(patient, 'Moderate', 'Vegetarian', 7)
+                daily = self.recommender.get_daily_meal_plan(patient, 'Moderate', 'Vegetarian')
+                error += abs(plan['summary']['calories']['total'] - target)
+                daily_error += abs(daily['daily_nutrition']['calories'] * 7 - target)
+        self.assertLess(error, daily_error)
+
+
+class TestMealPlanRoute(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = create_app().test_client()
+        cls.patient = {
+            'pregnancies': 2, 'glucose': 150, 'bloodPressure': 80, 'skinThickness': 25,
+            'insulin': 100, 'bmi': 31.0, 'diabetesPedigreeFunction': 0.5, 'age': 52,
+        }
+
+    def test_plan_and_swap(self):
+        response = self.client.post('/api/meal-plan', json={**self.patient, 'days': 3})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual([day['day'] for day in body['days']], [1, 2, 3])
+        self.assertEqual(body['summary']['days'], 3)
+        self.assertEqual(body['recomputed_days'], [])
+
+        response = self.client.post('/api/meal-plan', json={
+            **self.patient, 'days': 3, 'swaps': [{'day': 2, 'meal': 'snacks', 'index': 0}],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.get_json()['days'][1]['snacks'], body['days'][1]['snacks'])
+
+    def test_invalid_requests(self):
+        for extra in ({'days': 0}, {'days': 400}, {'swaps': [{'day': 1}]},
+                      {'swaps': [{'day': 9, 'meal': 'lunch', 'index': 0}]},
+                      {'swaps': [{'day': 1, 'meal': 'lunch', 'index': 0, 'title': 'Not a food'}]}):
+            with self.subTest(extra=extra):
+                self.assertEqual(self.client.post('/api/meal-plan', json={**self.patient, **extra}).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+from app.model_loader import load_model, predict_diabetes
+from app.predict_batcher import BATCH_SIZE, BATCH_WAIT_SECONDS, PredictBatcher
+
+
+def patient(i):
+    return {'pregnancies': i % 10, 'glucose': 70 + 4 * i, 'bloodPressure': 60 + i % 30, 'skinThickness': 20,
+            'insulin': 80 + 3 * i, 'bmi': 18.0 + i * 0.5, 'diabetesPedigreeFunction': 0.2 + i * 0.02,
+            'age': 21 + i}
+
+
+class TestPredictBatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = load_model()
+
+    def predict_concurrently(self, batcher, calls):
+        """Run (model, data) calls from one thread each, released at once"""
+        results = [None] * len(calls)
+        barrier = threading.Barrier(len(calls))
+
+        def call(i):
+            barrier.wait()
+            results[i] = batcher.predict(*calls[i])
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(calls))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_batches_and_get_their_own_results(self):
+        batcher = PredictBatcher(window=0.05, max_batch=8)
+        observed = BATCH_SIZE.count()
+        calls = [(self.model, patient(i)) for i in range(32)]
+        results = self.predict_concurrently(batcher, calls)
+
+        self.assertEqual(results, [predict_diabetes(model, data) for model, data in calls])
+        stats = batcher.stats()
+        self.assertEqual(stats['rows'], 32)
+        self.assertLess(stats['batches'], 32)
+        self.assertLessEqual(stats['largest_batch'], 8)
+        self.assertEqual(BATCH_SIZE.count() - observed, stats['batches'])
+
+    def test_rows_are_scored_by_the_model_they_were_submitted_with(self):
+        # e.g. requests on both sides of a model reload
+        batcher = PredictBatcher(window=0.05)
+        calls = [(self.model if i % 2 else None, patient(i)) for i in range(6)]
+        results = self.predict_concurrently(batcher, calls)
+        self.assertEqual(results, [predict_diabetes(model, data) for model, data in calls])
+
+    def test_a_failing_batch_fails_its_callers(self):
+        batcher = PredictBatcher(window=0.01)
+        # Fewer results than rows, and an error raised outside the model call
+        with mock.patch('app.predict_batcher.predict_diabetes_batch', return_value=[]):
+            with self.assertRaisesRegex(RuntimeError, 'not scored'):
+                batcher.predict(self.model, patient(1))
+        with mock.patch.object(BATCH_WAIT_SECONDS, 'observe', side_effect=ValueError('boom')):
+            with self.assertRaisesRegex(ValueError, 'boom'):
+                batcher.predict(self.model, patient(2))
+        # The batch thread survives both
+        self.assertEqual(batcher.predict(self.model, patient(3)), predict_diabetes(self.model, patient(3)))
+
+    def test_predict_gives_up_after_the_timeout(self):
+        batcher = PredictBatcher(window=10, timeout=0.05)
+        with self.assertRaises(TimeoutError):
+            batcher.predict(self.model, patient(1))
+        self.assertTrue(batcher._pending[0][2].cancelled())
+
+    def test_predict_endpoint_through_the_batcher(self):
+        client = create_app().test_client()
+        expected = client.post('/api/predict', json=patient(5)).get_json()
+        self.assertIsNone(client.get('/api/health').get_json()['predict_batching'])
+
+        saved, routes.predict_batcher = routes.predict_batcher, PredictBatcher(window=0.001)
+        try:
+            self.assertEqual(client.post('/api/predict', json=patient(5)).get_json(), expected)
+            stats = client.get('/api/health').get_json()['predict_batching']
+            self.assertEqual((stats['batches'], stats['rows']), (1, 1))
+        finally:
+            routes.predict_batcher = saved
+        self.assertIn('diabetes_api_predict_batch_size_bucket{le="1"} ', client.get('/api/metrics').get_data(as_text=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app
+from app.model_manager import WARM_UP_PATIENTS
+from app.profiler import RequestProfiler
+
+
+def busy_view():
+    """Keeps the request thread in Python code for ~60 ms"""
+    deadline = time.perf_counter() + 0.06
+    while time.perf_counter() < deadline:
+        pass
+    return 'done'
+
+
+class TestRequestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        env = mock.patch.dict('os.environ', {'ADMIN_TOKEN': 'secret'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def client(self, **options):
+        profiler = RequestProfiler(output_dir=self.tmp.name, interval=0.001, **options)
+        app = create_app(profiler=profiler)
+        app.add_url_rule('/busy', 'busy', busy_view)
+        client = app.test_client()
+        client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+        return profiler, client
+
+    def test_slow_requests_are_kept(self):
+        profiler, client = self.client(slow_ms=40)
+        client.get('/busy')
+        client.get('/api/health')
+
+        profiles = profiler.profiles()
+        self.assertEqual([(p['endpoint'], p['reason']) for p in profiles], [('busy', 'slow')])
+        self.assertGreaterEqual(profiles[0]['duration_ms'], 40)
+        text = profiler.path(profiles[0]['name']).read_text()
+        stack, count = text.splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(stack.endswith('test_profiler.py:busy_view'))
+        self.assertGreater(int(count), 0)
+
+    def test_listed_endpoints_are_always_profiled(self):
+        profiler, client = self.client(endpoints=['api.predict'])
+        client.post('/api/predict', json=WARM_UP_PATIENTS[0])
+        client.get('/api/health')
+        self.assertEqual([p['endpoint'] for p in profiler.profiles()], ['api.predict'])
+
+    def test_nothing_is_tracked_when_not_picked(self):
+        profiler, client = self.client(sample_rate=0.0)
+        client.get('/busy')
+        self.assertEqual(profiler.profiles(), [])
+        self.assertEqual(profiler.stats()['active'], 0)
+
+    def test_only_the_newest_profiles_are_kept(self):
+        profiler, client = self.client(endpoints=['api.health'], max_profiles=2)
+        for _ in range(4):
+            client.get('/api/health')
+        self.assertEqual(len(profiler.profiles()), 2)
+
+    def test_admin_endpoints(self):
+        profiler, client = self.client(sample_rate=1.0)
+        client.get('/busy')
+        listing = client.get('/api/admin/profiles').get_json()
+        busy = [p for p in listing['profiles'] if p['endpoint'] == 'busy']
+        self.assertEqual(len(busy), 1)
+
+        profile = client.get(f"/api/admin/profiles/{busy[0]['name']}")
+        self.assertEqual(profile.status_code, 200)
+        self.assertIn('busy_view', profile.get_data(as_text=True))
+        merged = client.get('/api/admin/profiles/collapsed?endpoint=busy').get_data(as_text=True)
+        self.assertIn('busy_view', merged)
+        self.assertEqual(client.get('/api/admin/profiles/..%2Fetc').status_code, 404)
+
+    def test_other_files_in_the_directory_are_ignored(self):
+        profiler, client = self.client(endpoints=['api.health'])
+        client.get('/api/health')
+        for name in ('notes.collapsed', 'a-b.collapsed', '20260101T000000-x-1-api.health-5ms-slow.collapsed'):
+            (Path(self.tmp.name) / name).write_text('main 1\n')
+        listing = client.get('/api/admin/profiles')
+        self.assertEqual(listing.status_code, 200)
+        self.assertEqual([p['endpoint'] for p in listing.get_json()['profiles']], ['api.health'])
+        self.assertEqual(client.get('/api/admin/profiles/notes.collapsed').status_code, 404)
+
+    def test_default_directory_is_private(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch('app.profiler.DEFAULT_OUTPUT_DIR', Path(tmp) / 'profiles'):
+            profiler = RequestProfiler()
+            self.assertEqual(stat.S_IMODE(profiler.output_dir.stat().st_mode), 0o700)
+
+    def test_admin_endpoints_without_profiler(self):
+        client = create_app().test_client()
+        client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+        self.assertEqual(client.get('/api/admin/profiles').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
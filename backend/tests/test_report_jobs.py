@@ -0,0 +1,120 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+from app.model_manager import WARM_UP_PATIENTS
+from app.report_jobs import ReportJobQueue, report_key
+
+
+class TestReportJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_queue = routes.report_jobs
+        routes.report_jobs = ReportJobQueue(cache_dir=self.tmp.name, max_workers=1)
+        self.client = create_app().test_client()
+
+    def tearDown(self):
+        routes.report_jobs.shutdown()
+        routes.report_jobs = self.saved_queue
+        self.tmp.cleanup()
+
+    def test_job_renders_same_pdf_as_sync_endpoint(self):
+        patient = WARM_UP_PATIENTS[2]
+        response = self.client.post('/api/report/jobs', json=patient)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        status = self.client.get(f'/api/report/jobs/{job_id}?wait=30').get_json()
+        self.assertEqual(status['status'], 'done')
+        pdf = self.client.get(status['pdf_url'])
+        self.assertEqual(pdf.status_code, 200)
+        self.assertTrue(pdf.data.startswith(b'%PDF'))
+
+        sync = self.client.post('/api/report', json=patient)
+        self.assertEqual(sync.status_code, 200)
+        self.assertTrue(sync.data.startswith(b'%PDF'))
+
+    def test_identical_payloads_share_one_job(self):
+        first = self.client.post('/api/report/jobs', json=WARM_UP_PATIENTS[0]).get_json()
+        # Keys the report does not use do not change the job
+        second = self.client.post('/api/report/jobs', json={**WARM_UP_PATIENTS[0], 'note': 'x'}).get_json()
+        other = self.client.post('/api/report/jobs', json=WARM_UP_PATIENTS[1]).get_json()
+        self.assertEqual(first['job_id'], second['job_id'])
+        self.assertNotEqual(first['job_id'], other['job_id'])
+        self.assertEqual(routes.report_jobs.stats()['deduplicated'], 1)
+
+    def test_invalid_input_and_unknown_job(self):
+        self.assertEqual(self.client.post('/api/report/jobs', json={'age': 30}).status_code, 400)
+        self.assertEqual(self.client.get('/api/report/jobs/' + '0' * 64).status_code, 404)
+        self.assertEqual(self.client.get('/api/report/jobs/..%2Fetc/pdf').status_code, 404)
+
+    def test_other_workers_see_the_job(self):
+        # A second queue on the same cache directory stands in for another gunicorn worker
+        other = ReportJobQueue(cache_dir=self.tmp.name, max_workers=1)
+        job_id = self.client.post('/api/report/jobs', json=WARM_UP_PATIENTS[1]).get_json()['job_id']
+        self.assertIn(other.status(job_id), ('queued', 'running', 'done'))
+        self.assertEqual(other.wait(job_id, 30), 'done')
+
+        # A short wait on a job that is not finished returns its current state
+        job_id = routes.report_jobs.submit({'data': {}, 'prediction': 0, 'probability': [1, 0],
+                                            'nutrition': None, 'daily_meal_plan': {}})
+        self.assertIn(routes.report_jobs.wait(job_id, 0.001), ('queued', 'running', 'failed'))
+        self.assertEqual(other.wait(job_id, 30), 'failed')
+        self.assertTrue(other.error(job_id))
+
+    def test_cache_is_private(self):
+        job_id = self.client.post('/api/report/jobs', json=WARM_UP_PATIENTS[0]).get_json()['job_id']
+        self.assertEqual(routes.report_jobs.wait(job_id, 30), 'done')
+        self.assertEqual(stat.S_IMODE(os.stat(self.tmp.name).st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(routes.report_jobs.pdf_path(job_id).stat().st_mode), 0o600)
+
+    def test_cache_is_size_bounded(self):
+        queue = ReportJobQueue(cache_dir=self.tmp.name, cache_max_bytes=0)
+        path = queue.pdf_path(report_key({'a': 1}))
+        path.write_bytes(b'%PDF')
+        queue._enforce_cache_limit()
+        self.assertFalse(path.exists())
+        self.assertEqual(queue.stats()['evicted'], 1)
+
+    def test_eviction_skips_files_removed_by_another_worker(self):
+        queue = ReportJobQueue(cache_dir=self.tmp.name, cache_max_bytes=0)
+        gone, kept = (queue.pdf_path(report_key({'a': i})) for i in (1, 2))
+        gone.write_bytes(b'%PDF')
+        kept.write_bytes(b'%PDF')
+        # The glob still lists a PDF that another worker has just unlinked
+        with mock.patch.object(Path, 'glob', return_value=iter([gone, kept])):
+            gone.unlink()
+            queue._enforce_cache_limit()
+        self.assertFalse(kept.exists())
+        self.assertEqual(queue.stats()['evicted'], 1)
+
+    def test_failed_jobs_are_forgotten(self):
+        queue = routes.report_jobs
+        job_id = queue.submit({'data': {}, 'prediction': 0, 'probability': [1, 0],
+                               'nutrition': None, 'daily_meal_plan': {}})
+        self.assertEqual(queue.wait(job_id, 30), 'failed')
+        queue._enforce_cache_limit()
+        self.assertNotIn(job_id, queue._jobs)
+        self.assertEqual(queue.status(job_id), 'failed')
+        self.assertTrue(queue.error(job_id))
+
+        # A job the pool itself failed leaves no marker of its own
+        broken = Future()
+        broken.set_exception(RuntimeError('pool broken'))
+        broken_id = report_key({'broken': True})
+        queue._jobs[broken_id] = broken
+        queue._enforce_cache_limit()
+        self.assertEqual((queue.status(broken_id), queue.error(broken_id)), ('failed', 'pool broken'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from app import create_app, routes
+from app.model_loader import FEATURE_NAMES, CompiledForest, model_digest, model_info
+from app.response_cache import ResponseCache, response_key
+from benchmarks.common import DIABETES_CSV
+
+PATIENT = {
+    'pregnancies': 3, 'glucose': 120, 'bloodPressure': 70, 'skinThickness': 20,
+    'insulin': 79, 'bmi': 24.0, 'diabetesPedigreeFunction': 0.47, 'age': 33,
+}
+V1 = ('20260101-000000', 'a1a3fcac3945a2e1')
+V2 = ('20260201-000000', 'a1a3fcac3945a2e1')
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'responses.sqlite'
+
+    def test_key_covers_the_input_fields_and_versions_only(self):
+        key = response_key(PATIENT, V1)
+        self.assertEqual(response_key({'name': 'kiosk 4', **dict(reversed(PATIENT.items()))}, V1), key)
+        self.assertNotEqual(response_key({**PATIENT, 'age': 34}, V1), key)
+        self.assertNotEqual(response_key({**PATIENT, 'glucose': 120.0}, V1), key)
+        self.assertNotEqual(response_key(PATIENT, V2), key)
+
+    def test_retrained_models_without_a_version_get_new_keys(self):
+        df = pd.read_csv(DIABETES_CSV)
+        first, retrained = [
+            CompiledForest.from_sklearn(
+                RandomForestClassifier(n_estimators=3, max_depth=3, random_state=seed).fit(df[FEATURE_NAMES], df['Outcome'])
+            )
+            for seed in (0, 1)
+        ]
+        # Both report 'unversioned', like a legacy model.pkl retrained in place
+        self.assertEqual(model_info(first)['version'], model_info(retrained)['version'])
+        self.assertNotEqual(model_digest(first), model_digest(retrained))
+        self.assertEqual(model_digest(first), model_digest(first))
+        self.assertNotEqual(model_digest(None), model_digest(first))
+
+    def test_entries_expire_after_ttl(self):
+        cache = ResponseCache(ttl=0.05)
+        key, _ = cache.get(PATIENT, V1)
+        cache.put(key, '{"cached":1}')
+        self.assertEqual(cache.get(PATIENT, V1)[1], '{"cached":1}')
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(PATIENT, V1)[1])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 2, 1))
+
+    def test_shared_tier_serves_other_workers_and_drops_old_versions(self):
+        first, second = ResponseCache(path=self.path), ResponseCache(path=self.path)
+        key, _ = first.get(PATIENT, V1)
+        first.put(key, '{"v":1}')
+
+        self.assertEqual(second.get(PATIENT, V1)[1], '{"v":1}')
+        self.assertEqual(second.get(PATIENT, V1)[1], '{"v":1}')
+        self.assertEqual(second.stats()['shared_hits'], 1)
+
+        # The first lookup after a reload drops everything built under V1
+        self.assertIsNone(second.get(PATIENT, V2)[1])
+        self.assertEqual((second.stats()['invalidations'], len(second.memory)), (1, 0))
+        self.assertIsNone(ResponseCache(path=self.path).get(PATIENT, V1)[1])
+
+    def test_predict_endpoint_is_served_from_cache_until_the_model_changes(self):
+        client = create_app().test_client()
+        saved_cache, routes.predict_cache = routes.predict_cache, ResponseCache(maxsize=16)
+        saved_model = routes.model_manager.current
+        try:
+            first = client.post('/api/predict', json=PATIENT)
+            again = client.post('/api/predict', json={**PATIENT, 'source': 'retry'})
+            self.assertEqual(again.get_data(), first.get_data())
+            self.assertEqual(again.mimetype, 'application/json')
+            self.assertEqual(routes.predict_cache.stats()['hits'], 1)
+
+            routes.model_manager.current = None
+            rule_based = client.post('/api/predict', json=PATIENT).get_json()
+            self.assertEqual(routes.predict_cache.stats()['invalidations'], 1)
+            routes.predict_cache = None
+            self.assertEqual(rule_based, client.post('/api/predict', json=PATIENT).get_json())
+            self.assertNotEqual(rule_based, first.get_json())
+        finally:
+            routes.predict_cache = saved_cache
+            routes.model_manager.current = saved_model
+
+if __name__ == '__main__':
+    unittest.main()
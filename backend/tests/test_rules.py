@@ -0,0 +1,96 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import rules
+from app.model_loader import _emergency_prediction, predict_diabetes_batch
+from app.utils import calculate_bmi_category, calculate_glucose_category, calculate_nutrition_needs
+from benchmarks import legacy
+
+
+def dense_grid(low, high, step, boundaries):
+    """Evenly spaced values plus every boundary and its float neighbours"""
+    edges = np.array(boundaries, dtype=float)
+    values = np.concatenate([
+        np.arange(low, high + step, step),
+        edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf),
+    ])
+    return np.unique(values)
+
+
+class TestRuleParity(unittest.TestCase):
+    """The rule tables must agree with the scalar if/elif code they replaced"""
+
+    def test_categories(self):
+        bmi = dense_grid(0, 100, 0.05, [18.5, 25, 30])
+        self.assertEqual(list(rules.BMI_CATEGORY(bmi)), [legacy.calculate_bmi_category(b) for b in bmi.tolist()])
+        glucose = dense_grid(0, 300, 0.25, [70, 140, 199])
+        self.assertEqual(list(rules.GLUCOSE_CATEGORY(glucose)), [legacy.calculate_glucose_category(g) for g in glucose.tolist()])
+
+        for b in (18.5, 24.99, 25, 30, 30.01):
+            self.assertEqual(calculate_bmi_category(b), legacy.calculate_bmi_category(b))
+        for g in (69, 70, 140, 141, 199, 200):
+            self.assertEqual(calculate_glucose_category(g), legacy.calculate_glucose_category(g))
+
+    def test_risk_level(self):
+        probability = dense_grid(0, 1, 1e-4, [0.3, 0.6])
+        self.assertEqual(list(rules.RISK_LEVEL(probability)), [legacy.risk_level(p) for p in probability.tolist()])
+
+    def test_nutrition(self):
+        bmi, age = np.meshgrid(dense_grid(10, 50, 0.1, [18.5, 25, 30]), dense_grid(0, 120, 1, [30, 60]))
+        bmi, age = bmi.ravel(), age.ravel()
+        glucose = np.resize(dense_grid(130, 150, 0.5, [140]), len(bmi))
+        high_risk = np.arange(len(bmi)) % 3 == 0
+
+        calories, protein, carbs = rules.nutrition_targets(bmi, age, glucose, high_risk)
+        expected = [
+            legacy.calculate_nutrition_needs(*values)
+            for values in zip(bmi.tolist(), age.tolist(), glucose.tolist(), high_risk.tolist())
+        ]
+        self.assertEqual(calories.tolist(), [e['calories'] for e in expected])
+        self.assertEqual(protein.tolist(), [e['protein'] for e in expected])
+        self.assertEqual(carbs.tolist(), [e['carbs'] for e in expected])
+
+        for values in zip(bmi[::997].tolist(), age[::997].tolist(), glucose[::997].tolist(), high_risk[::997].tolist()):
+            result = calculate_nutrition_needs(*values)
+            self.assertEqual(result, legacy.calculate_nutrition_needs(*values))
+            self.assertTrue(all(type(v) is int for v in result.values()))
+
+    def test_risk_factors_and_fallback(self):
+        rng = np.random.default_rng(0)
+        n = 20_000
+        columns = {
+            'glucose': rng.choice(dense_grid(130, 150, 0.5, [140]), n),
+            'bmi': rng.choice(dense_grid(25, 35, 0.1, [30]), n),
+            'age': rng.choice(dense_grid(50, 70, 1, [60]), n),
+            'bloodPressure': rng.choice(dense_grid(80, 100, 1, [90]), n),
+            'diabetesPedigreeFunction': rng.choice(dense_grid(0.5, 1.5, 0.01, [1.0]), n),
+            'pregnancies': np.zeros(n), 'skinThickness': np.zeros(n), 'insulin': np.zeros(n),
+        }
+        patients = [dict(zip(columns, values)) for values in zip(*(c.tolist() for c in columns.values()))]
+
+        names = [rule.field for rule in rules.RISK_FACTORS]
+        matrix = rules.risk_factor_matrix(columns)
+        for patient, flags in zip(patients, matrix.tolist()):
+            expected = legacy.risk_factors(patient)
+            self.assertEqual(rules.risk_factors(patient), expected)
+            self.assertEqual([name for name, flag in zip(names, flags) if flag], expected)
+
+        self.assertEqual(predict_diabetes_batch(None, patients), [legacy.fallback_prediction(p) for p in patients])
+
+    def test_emergency_prediction(self):
+        for glucose in (139, 140, 140.01, 141):
+            for bmi in (29.9, 30, 30.01):
+                is_high_risk = glucose > 140 or bmi > 30
+                self.assertEqual(
+                    _emergency_prediction({'glucose': glucose, 'bmi': bmi}),
+                    ((1, [0.3, 0.7]) if is_high_risk else (0, [0.8, 0.2])),
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import serialization
+from app.serialization import RawJSON, dumps
+
+
+class TestSerialization(unittest.TestCase):
+    
+    def setUp(self):
+        self.payload = {
+            'risk_level': 'High',
+            'probability': [0.25, 0.75],
+            'nutrition': {'protein': 80, 'calories': 1600},
+            'title': 'Idli 🍚',
+        }
+    
+    def test_raw_json_is_spliced_verbatim(self):
+        text = dumps({'b': RawJSON('{"x":[1,2]}'), 'a': [RawJSON('true'), 1]})
+        self.assertEqual(text, '{"a":[true,1],"b":{"x":[1,2]}}')
+    
+    def test_encoders_agree(self):
+        """orjson and the stdlib fallback should produce the same document"""
+        fast = dumps(self.payload)
+        
+        orjson, serialization.orjson = serialization.orjson, None
+        try:
+            fallback = dumps(self.payload)
+        finally:
+            serialization.orjson = orjson
+        
+        self.assertEqual(fallback, json.dumps(self.payload, sort_keys=True, separators=(',', ':')))
+        self.assertEqual(json.loads(fast), json.loads(fallback))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import create_app, routes
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Seconds from interpreter start to a loaded app (best of 3): about twice
+# the 0.22 s it takes on one slow core, below the 0.55 s it took while
+# pandas and reportlab were imported eagerly. STARTUP_BUDGET overrides it.
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', 0.45))
+# Only needed by reports, the legacy pickled model or the CSV build path
+LAZY_MODULES = ['pandas', 'reportlab', 'sklearn']
+
+COLD_START = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))
+'''
+
+
+def cold_start():
+    """(seconds, imported modules) of a fresh interpreter building the app"""
+    result = subprocess.run([sys.executable, '-c', COLD_START], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+    measured = json.loads(result.stdout.splitlines()[-1])
+    return measured['seconds'], set(measured['modules'])
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_cold_start_budget(self):
+        runs = [cold_start() for _ in range(3)]
+        seconds = min(elapsed for elapsed, _ in runs)
+        self.assertLess(seconds, STARTUP_BUDGET, f"import + create_app took {seconds:.3f} s")
+        modules = runs[0][1]
+        for module in LAZY_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, modules)
+
+    def test_background_warm_up(self):
+        routes.ready = False
+        client = create_app(warm_up='background').test_client()
+        deadline = time.time() + 30
+        while client.get('/api/ready').status_code != 200 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(client.get('/api/health').get_json()['ready'])
+
+if __name__ == '__main__':
+    unittest.main()
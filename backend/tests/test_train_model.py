@@ -0,0 +1,77 @@
+import contextlib
+import importlib.util
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.model_loader import model_info
+from app.model_registry import ModelRegistry
+
+TRAIN_MODEL = Path(__file__).resolve().parents[2] / 'ml' / 'train_model.py'
+spec = importlib.util.spec_from_file_location('train_model', TRAIN_MODEL)
+train_model = sys.modules['train_model'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(train_model)
+
+SPACE = {'n_estimators': [5, 10], 'max_depth': [3]}
+
+
+class TestTrainModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = Path(self.tmp.name)
+        self.registry = ModelRegistry(self.root / 'registry')
+
+    def train(self, space=SPACE):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return train_model.train_diabetes_model(
+                n_jobs=2, folds=3, cache_dir=self.root / 'cache', model_dir=self.root / 'model',
+                registry=self.registry, space=space,
+            )
+
+    def test_reruns_only_evaluate_new_configurations(self):
+        self.train()
+        metrics = self.registry.manifest()['metrics']
+        self.assertEqual((metrics['candidates'], metrics['candidates_evaluated']), (2, 2))
+
+        self.train({**SPACE, 'max_depth': [3, 4]})
+        metrics = self.registry.manifest()['metrics']
+        self.assertEqual((metrics['candidates'], metrics['candidates_evaluated']), (4, 2))
+
+    def test_metrics_are_served_with_the_model(self):
+        _, accuracy = self.train()
+        info = model_info(self.registry.load())
+        self.assertEqual(info['accuracy'], round(accuracy, 4))
+        self.assertEqual(info['metrics']['cv_folds'], 3)
+        for key in ('cv_accuracy_mean', 'predict_latency_us', 'params'):
+            self.assertIn(key, info['metrics'])
+        self.assertTrue((self.root / 'model' / 'metrics.json').exists())
+
+    def test_only_eligible_candidates_are_timed_and_latency_is_not_cached(self):
+        timed = mock.Mock(wraps=train_model.serving_latency_us)
+        with mock.patch.object(train_model, 'serving_latency_us', timed):
+            self.train({'n_estimators': [5, 10], 'max_depth': [1, 6]})
+        cached = [json.loads(path.read_text()) for path in (self.root / 'cache').glob('cv-*/*.json')]
+        self.assertEqual(len(cached), 4)
+        self.assertFalse(any('predict_latency_us' in result for result in cached))
+        self.assertEqual(timed.call_count, len(train_model.eligible_candidates(cached)))
+        self.assertIn('predict_latency_us', self.registry.manifest()['metrics'])
+
+    def test_selection_trades_accuracy_for_latency(self):
+        results = [
+            {'params': {'n_estimators': 200}, 'cv_accuracy_mean': 0.78, 'predict_latency_us': 150.0},
+            {'params': {'n_estimators': 50}, 'cv_accuracy_mean': 0.775, 'predict_latency_us': 40.0},
+            {'params': {'n_estimators': 10}, 'cv_accuracy_mean': 0.74, 'predict_latency_us': 20.0},
+        ]
+        self.assertEqual(train_model.select_model(results, tolerance=0.01)['params'], {'n_estimators': 50})
+        self.assertEqual(train_model.select_model(results, tolerance=0.0)['params'], {'n_estimators': 200})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,13 @@
+"""WSGI entry point for production serving.
+
+The model, the food catalog and the meal plan cache are loaded and warmed up
+here, at import time. With gunicorn's preload_app (see gunicorn.conf.py) that
+happens once in the master process and the forked workers share those pages
+copy-on-write:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import configure_logging, create_app
+
+configure_logging()
+app = create_app(warm_up=True)
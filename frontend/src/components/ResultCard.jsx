@@ -9,14 +9,15 @@ const ResultCard = ({ prediction, inputData }) => {
   const isHighRisk = prediction.prediction === 1;
   const healthyProb = (prediction.probability[0] * 100).toFixed(1);
   const diabeticProb = (prediction.probability[1] * 100).toFixed(1);
-  const accuracy = (prediction.accuracy * 100).toFixed(1);
+  // null when the served model has no measured accuracy
+  const accuracy = prediction.accuracy == null ? null : (prediction.accuracy * 100).toFixed(1);
 
   useEffect(() => {
     const timer = setTimeout(() => {
       setAnimatedValues({
         healthy: parseFloat(healthyProb),
         diabetic: parseFloat(diabeticProb),
-        accuracy: parseFloat(accuracy)
+        accuracy: accuracy === null ? null : parseFloat(accuracy)
       });
     }, 500);
     return () => clearTimeout(timer);
@@ -239,7 +240,7 @@ const ResultCard = ({ prediction, inputData }) => {
                 transition={{ delay: 1 + index * 0.1, type: "spring", stiffness: 200 }}
                 className={`text-3xl font-bold mb-2 bg-gradient-to-r ${item.color} bg-clip-text text-transparent`}
               >
-                {item.value.toFixed(1)}%
+                {item.value === null ? 'n/a' : `${item.value.toFixed(1)}%`}
               </motion.div>
               
               <div className="text-sm font-semibold text-gray-700 mb-4">{item.label}</div>
@@ -248,7 +249,7 @@ const ResultCard = ({ prediction, inputData }) => {
               <div className="w-full bg-white/50 rounded-full h-3 overflow-hidden">
                 <motion.div
                   initial={{ width: 0, x: '-100%' }}
-                  animate={{ width: `${item.value}%`, x: 0 }}
+                  animate={{ width: `${item.value ?? 0}%`, x: 0 }}
                   transition={{ delay: 1.2 + index * 0.1, duration: 1.5, ease: "easeOut" }}
                   className={`h-full bg-gradient-to-r ${item.color} rounded-full relative`}
                 >